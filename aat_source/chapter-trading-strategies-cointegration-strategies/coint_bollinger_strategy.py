@@ -40,6 +40,10 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
         self.time = None
         self.latest_prices = np.full(len(self.tickers), -1.0)
         self.port_mkt_val = deque(maxlen=self.lookback)
+        self.port_mkt_val_shift = 0.0
+        self.port_mkt_val_sum = 0.0
+        self.port_mkt_val_sum_sq = 0.0
+        self.port_mkt_val_updates = 0
         self.invested = None
         self.bars_elapsed = 0
 
@@ -69,6 +73,36 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
                 if event.ticker == self.tickers[i]:
                     self.latest_prices[i] = price
 
+    def _append_port_mkt_val(self, value):
+        """
+        Appends the latest portfolio market value to the lookback
+        window, maintaining the running sum and sum of squares
+        of its deviations from a shift value, so that the mean
+        and standard deviation do not need to be recalculated
+        from scratch every bar.
+
+        Summing deviations rather than the raw market values
+        avoids the cancellation of E[x^2] - E[x]^2, and the sums
+        are recalculated exactly, about the window mean, once
+        every lookback bars so that rounding error cannot build up.
+        """
+        if len(self.port_mkt_val) == self.lookback:
+            oldest = self.port_mkt_val[0] - self.port_mkt_val_shift
+            self.port_mkt_val_sum -= oldest
+            self.port_mkt_val_sum_sq -= oldest * oldest
+        self.port_mkt_val.append(value)
+        value -= self.port_mkt_val_shift
+        self.port_mkt_val_sum += value
+        self.port_mkt_val_sum_sq += value * value
+
+        self.port_mkt_val_updates += 1
+        if self.port_mkt_val_updates % self.lookback == 0:
+            window = np.array(self.port_mkt_val)
+            self.port_mkt_val_shift = window.mean()
+            window -= self.port_mkt_val_shift
+            self.port_mkt_val_sum = window.sum()
+            self.port_mkt_val_sum_sq = window.dot(window)
+
     def go_long_units(self):
         """
         Go long the appropriate number of "units" of the 
@@ -144,14 +178,20 @@ class CointegrationBollingerBandsStrategy(AbstractStrategy):
             if all(self.latest_prices > -1.0):
                 # Calculate portfolio market value via dot product
                 # of ETF prices with portfolio weights
-                self.port_mkt_val.append(
+                self._append_port_mkt_val(
                     np.dot(self.latest_prices, self.weights)
                 )
                 # If there is enough data to form a full lookback
                 # window, then calculate zscore and carry out
                 # respective trades if thresholds are exceeded
                 if self.bars_elapsed > self.lookback:
-                    zscore = (
-                        self.port_mkt_val[-1] - np.mean(self.port_mkt_val)
-                    ) / np.std(self.port_mkt_val)
-                    self.zscore_trade(zscore, event)
+                    n = len(self.port_mkt_val)
+                    mean = self.port_mkt_val_sum / n
+                    var = self.port_mkt_val_sum_sq / n - mean * mean
+                    # The z-score is undefined for a flat window
+                    if var > 0.0:
+                        zscore = (
+                            self.port_mkt_val[-1] - 
+                            self.port_mkt_val_shift - mean
+                        ) / np.sqrt(var)
+                        self.zscore_trade(zscore, event)
@@ -33,25 +33,39 @@ class MovingAverageCrossStrategy(AbstractStrategy):
         self.invested = False
         self.sw_bars = deque(maxlen=self.short_window)
         self.lw_bars = deque(maxlen=self.long_window)
+        self.sw_sum = 0.0
+        self.lw_sum = 0.0
 
     def calculate_signals(self, event):
         # Applies SMA to first ticker
         ticker = self.tickers[0]
         if event.type == EventType.BAR and event.ticker == ticker:
             # Add latest adjusted closing price to the
-            # short and long window bars
+            # short and long window bars,
             price = event.adj_close_price/float(
                 PriceParser.PRICE_MULTIPLIER
             )
+            # while keeping running sums of both windows
+            if len(self.lw_bars) == self.long_window:
+                self.lw_sum -= self.lw_bars[0]
             self.lw_bars.append(price)
+            self.lw_sum += price
             if self.bars > self.long_window - self.short_window:
+                if len(self.sw_bars) == self.short_window:
+                    self.sw_sum -= self.sw_bars[0]
                 self.sw_bars.append(price)
+                self.sw_sum += price
+            # Recalculate both sums exactly once every long window
+            # of bars, so that rounding error cannot build up
+            if (self.bars + 1) % self.long_window == 0:
+                self.lw_sum = np.sum(self.lw_bars)
+                self.sw_sum = np.sum(self.sw_bars)
 
             # Enough bars are present for trading
             if self.bars > self.long_window:
                 # Calculate the simple moving averages
-                short_sma = np.mean(self.sw_bars)
-                long_sma = np.mean(self.lw_bars)
+                short_sma = self.sw_sum / len(self.sw_bars)
+                long_sma = self.lw_sum / len(self.lw_bars)
                 # Trading signals based on moving average cross
                 if short_sma > long_sma and not self.invested:
                     print("LONG: %s" % event.time)
@@ -6,24 +6,109 @@
 from __future__ import print_function
 
 import datetime
+import os
+import pickle
 import pprint
-try:
-    import Queue as queue
-except ImportError:
-    import queue
 import time
 
+import pandas as pd
+
+from data import StreamingDataHandler
+from event import MARKET, SIGNAL, ORDER, FILL
+from event_bus import DequeEventBus
+from execution import SimulatedExecutionHandler, LatencyExecutionHandler
+from profiling import BacktestProfiler
+from scheduler import EventScheduler
+
+
+class TradingStack(object):
+    """
+    Holds one strategy, together with the portfolio and execution
+    handler that trade its signals. A Backtest runs one or more
+    stacks over the same stream of market data, with each stack
+    having its own events bus so that its signals, orders and 
+    fills are only ever routed to its own components.
+    """
+
+    def __init__(
+        self, strategy, portfolio, execution_handler, 
+        strategy_params=None, execution_params=None
+    ):
+        """
+        Initialises the stack from the component classes. The 
+        components themselves are created by the Backtest.
+
+        Parameters:
+        strategy - (Class) Generates signals based on market data.
+        portfolio - (Class) Keeps track of portfolio positions.
+        execution_handler - (Class) Handles the orders/fills for trades.
+        strategy_params - Optional dictionary of keyword arguments 
+            for the strategy, e.g. its lookback windows.
+        execution_params - Optional dictionary of keyword arguments
+            for the execution handler, e.g. its latency.
+        """
+        self.strategy_cls = strategy
+        self.portfolio_cls = portfolio
+        self.execution_handler_cls = execution_handler
+        self.strategy_params = strategy_params or {}
+        self.execution_params = execution_params or {}
+
+        self.events = None
+        self.strategy = None
+        self.portfolio = None
+        self.execution_handler = None
+
+        self.signals = 0
+        self.orders = 0
+        self.fills = 0
+
+    def __str__(self):
+        params = ", ".join(
+            "%s=%s" % (k, self.strategy_params[k]) 
+            for k in sorted(self.strategy_params)
+        )
+        return "%s(%s)" % (self.strategy_cls.__name__, params)
+
+    def _handle_signal(self, event):
+        """
+        Passes a SignalEvent to the portfolio.
+        """
+        self.signals += 1
+        self.portfolio.update_signal(event)
+
+    def _handle_order(self, event):
+        """
+        Passes an OrderEvent to the execution handler.
+        """
+        self.orders += 1
+        self.execution_handler.execute_order(event)
+
+    def _handle_fill(self, event):
+        """
+        Passes a FillEvent to the portfolio.
+        """
+        self.fills += 1
+        self.portfolio.update_fill(event)
+
 
 class Backtest(object):
     """
     Enscapsulates the settings and components for carrying out
     an event-driven backtest.
+
+    Several strategies (e.g. parameter variants) can be tested 
+    in one pass over the data by passing a list of stacks. The 
+    data is then loaded once and every bar is passed to each 
+    stack in turn, with statistics reported per stack.
     """
 
     def __init__(
         self, csv_dir, symbol_list, initial_capital,
         heartbeat, start_date, data_handler, 
-        execution_handler, portfolio, strategy
+        execution_handler, portfolio, strategy,
+        event_bus=DequeEventBus, strategy_params=None,
+        execution_params=None, profile=False, profile_path=None,
+        checkpoint_path=None, checkpoint_interval=None, stacks=None
     ):
         """
         Initialises the backtest.
@@ -38,6 +123,21 @@ class Backtest(object):
         execution_handler - (Class) Handles the orders/fills for trades.
         portfolio - (Class) Keeps track of portfolio current and prior positions.
         strategy - (Class) Generates signals based on market data.
+        event_bus - (Class) The events bus, DequeEventBus for backtests 
+            or QueueEventBus for live trading.
+        strategy_params - Optional dictionary of keyword arguments 
+            for the strategy, e.g. its lookback windows.
+        execution_params - Optional dictionary of keyword arguments
+            for the execution handler, e.g. its latency.
+        profile - Whether to time each component and event type.
+        profile_path - Optional path to write the profile to as JSON.
+        checkpoint_path - Optional path to periodically save the
+            state of the backtest to, so that it can be resumed.
+        checkpoint_interval - The number of bars between checkpoints.
+        stacks - Optional list of (strategy, portfolio, 
+            execution_handler[, strategy_params[, execution_params]])
+            tuples to run over the same data, in place of the single
+            strategy, portfolio and execution handler.
         """
         self.csv_dir = csv_dir
         self.symbol_list = symbol_list
@@ -46,19 +146,78 @@ class Backtest(object):
         self.start_date = start_date
 
         self.data_handler_cls = data_handler
-        self.execution_handler_cls = execution_handler
-        self.portfolio_cls = portfolio
-        self.strategy_cls = strategy
+        if stacks is None:
+            stacks = [(
+                strategy, portfolio, execution_handler, 
+                strategy_params, execution_params
+            )]
+        self.stacks = [TradingStack(*stack) for stack in stacks]
 
-        self.events = queue.Queue()
+        self.event_bus_cls = event_bus
+        self.events = event_bus()
+        self.scheduler = EventScheduler()
         
-        self.signals = 0
-        self.orders = 0
-        self.fills = 0
-        self.num_strats = 1
+        self.num_strats = len(self.stacks)
+        self.events_dispatched = 0
+        self.run_time = 0.0
+        self.bars_processed = 0
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
        
         self._generate_trading_instances()
 
+        self.profiler = None
+        if profile or profile_path is not None:
+            self.profiler = BacktestProfiler()
+            self._instrument_components()
+        self.profile_path = profile_path
+
+    @property
+    def strategy(self):
+        """
+        The strategy of the first (or only) stack.
+        """
+        return self.stacks[0].strategy
+
+    @property
+    def portfolio(self):
+        """
+        The portfolio of the first (or only) stack.
+        """
+        return self.stacks[0].portfolio
+
+    @property
+    def execution_handler(self):
+        """
+        The execution handler of the first (or only) stack.
+        """
+        return self.stacks[0].execution_handler
+
+    @property
+    def signals(self):
+        return sum(stack.signals for stack in self.stacks)
+
+    @property
+    def orders(self):
+        return sum(stack.orders for stack in self.stacks)
+
+    @property
+    def fills(self):
+        return sum(stack.fills for stack in self.stacks)
+
+    def _get_max_lookback(self):
+        """
+        Returns the largest lookback declared by the strategies,
+        or None if any of them does not declare one.
+        """
+        lookbacks = [
+            stack.strategy_cls.get_max_lookback(**stack.strategy_params)
+            for stack in self.stacks
+        ]
+        if None in lookbacks:
+            return None
+        return max(lookbacks)
+
     def _generate_trading_instances(self):
         """
         Generates the trading instance objects from 
@@ -67,68 +226,281 @@ class Backtest(object):
         print(
             "Creating DataHandler, Strategy, Portfolio and ExecutionHandler"
         )
-        self.data_handler = self.data_handler_cls(self.events, self.csv_dir, self.symbol_list)
-        self.strategy = self.strategy_cls(self.data_handler, self.events)
-        self.portfolio = self.portfolio_cls(self.data_handler, self.events, self.start_date, 
-                                            self.initial_capital)
-        self.execution_handler = self.execution_handler_cls(self.events)
+        # Bounded data handlers only need to retain as many
+        # bars as the strategies declare that they look back over
+        data_handler_params = {}
+        lookback = self._get_max_lookback()
+        if (
+            lookback is not None and 
+            issubclass(self.data_handler_cls, StreamingDataHandler)
+        ):
+            data_handler_params['lookback'] = lookback
+        self.data_handler = self.data_handler_cls(
+            self.events, self.csv_dir, self.symbol_list, **data_handler_params
+        )
+
+        for i, stack in enumerate(self.stacks):
+            stack.events = self.event_bus_cls()
+            stack.strategy = stack.strategy_cls(
+                self.data_handler, stack.events, **stack.strategy_params
+            )
+            stack.portfolio = stack.portfolio_cls(
+                self.data_handler, stack.events, self.start_date, 
+                self.initial_capital
+            )
+            if len(self.stacks) > 1:
+                stack.portfolio.equity_csv = 'equity_%d.csv' % i
+
+            # Simulated executions are timestamped with the data 
+            # clock and may schedule fills for later bars
+            execution_params = dict(stack.execution_params)
+            if issubclass(stack.execution_handler_cls, SimulatedExecutionHandler):
+                execution_params['bars'] = self.data_handler
+            if issubclass(stack.execution_handler_cls, LatencyExecutionHandler):
+                execution_params['scheduler'] = self.scheduler
+            stack.execution_handler = stack.execution_handler_cls(
+                stack.events, **execution_params
+            )
+
+    def _instrument_components(self):
+        """
+        Replaces the hot-path methods of each component with
+        versions timed by the profiler.
+        """
+        self.profiler.instrument(self.data_handler, 'update_bars')
+        self.profiler.instrument(self.scheduler, 'release')
+        for i, stack in enumerate(self.stacks):
+            for obj, method_name in (
+                (stack.strategy, 'calculate_signals'),
+                (stack.portfolio, 'update_timeindex'),
+                (stack.portfolio, 'update_signal'),
+                (stack.portfolio, 'update_fill'),
+                (stack.execution_handler, 'execute_order')
+            ):
+                label = None
+                if len(self.stacks) > 1:
+                    label = "%s[%d].%s" % (type(obj).__name__, i, method_name)
+                self.profiler.instrument(obj, method_name, label=label)
+
+    def _register_handlers(self):
+        """
+        Registers the event handling methods with the events
+        buses, keyed by the integer event kind. The data handler
+        bus only carries MarketEvents, while the signals, orders
+        and fills of each stack are carried on its own bus.
+        """
+        handlers = [(self.events, MARKET, 'MARKET', self._handle_market)]
+        for stack in self.stacks:
+            handlers.extend([
+                (stack.events, SIGNAL, 'SIGNAL', stack._handle_signal),
+                (stack.events, ORDER, 'ORDER', stack._handle_order),
+                (stack.events, FILL, 'FILL', stack._handle_fill)
+            ])
+        for events, kind, name, handler in handlers:
+            if self.profiler is not None:
+                handler = self.profiler.wrap("%s event" % name, handler)
+            events.register(kind, handler)
+
+    def _handle_market(self, event):
+        """
+        Generates signals and updates the portfolio time index
+        of each stack on a new bar, and then handles the events
+        of that stack, including any fills released by the 
+        scheduler for this bar.
+        """
+        for stack in self.stacks:
+            stack.strategy.calculate_signals(event)
+            stack.portfolio.update_timeindex(event)
+            self.events_dispatched += stack.events.dispatch()
 
     def _run_backtest(self):
         """
         Executes the backtest.
         """
-        i = 0
-        while True:
-            i += 1
-            print(i)
+        self._register_handlers()
+        data_handler = self.data_handler
+        events = self.events
+        scheduler = self.scheduler
+        heartbeat = self.heartbeat
+
+        start = time.time()
+        while data_handler.continue_backtest:
             # Update the market bars
-            if self.data_handler.continue_backtest == True:
-                self.data_handler.update_bars()
-            else:
-                break
-
-            # Handle the events
-            while True:
-                try:
-                    event = self.events.get(False)
-                except queue.Empty:
-                    break
-                else:
-                    if event is not None:
-                        if event.type == 'MARKET':
-                            self.strategy.calculate_signals(event)
-                            self.portfolio.update_timeindex(event)
-
-                        elif event.type == 'SIGNAL':
-                            self.signals += 1                            
-                            self.portfolio.update_signal(event)
-
-                        elif event.type == 'ORDER':
-                            self.orders += 1
-                            self.execution_handler.execute_order(event)
-
-                        elif event.type == 'FILL':
-                            self.fills += 1
-                            self.portfolio.update_fill(event)
-
-            time.sleep(self.heartbeat)
+            data_handler.update_bars()
+
+            # Release any scheduled fills that are now due, 
+            # once there are bars to time and price them
+            if scheduler.heap and data_handler.continue_backtest:
+                scheduler.release(data_handler.get_current_datetime())
+
+            # Handle the events. The events of each stack are
+            # counted as they are dispatched by _handle_market
+            dispatched = events.dispatch()
+            self.events_dispatched += dispatched
+
+            if data_handler.continue_backtest:
+                self.bars_processed += 1
+                if (
+                    self.checkpoint_interval and 
+                    self.bars_processed % self.checkpoint_interval == 0
+                ):
+                    self.run_time += time.time() - start
+                    start = time.time()
+                    self.save_checkpoint(self.checkpoint_path)
+
+            # Only pause when a heartbeat is requested,
+            # e.g. when trading live
+            if heartbeat > 0.0:
+                time.sleep(heartbeat)
+        self.run_time += time.time() - start
+
+    def __getstate__(self):
+        """
+        Excludes the profiler from pickled checkpoints.
+        """
+        state = self.__dict__.copy()
+        state['profiler'] = None
+        return state
+
+    def save_checkpoint(self, path):
+        """
+        Pickles the full state of the backtest to a file: the data
+        handler cursor and lookback, the strategy, portfolio and 
+        execution handler state and any pending or scheduled 
+        events. CSV-backed bar stores are reloaded rather than 
+        saved. The file is written to a temporary file and renamed
+        into place, so a failed run leaves the last checkpoint 
+        intact.
+
+        Backtests with a thread-safe QueueEventBus or a live 
+        execution handler cannot be checkpointed.
+
+        Parameters:
+        path - The path of the checkpoint file.
+        """
+        if self.profiler is not None:
+            self.profiler.remove_instrumentation()
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+        finally:
+            if self.profiler is not None:
+                self._instrument_components()
+
+    @staticmethod
+    def load_checkpoint(path):
+        """
+        Restores a backtest from a checkpoint file, ready to be 
+        resumed with simulate_trading().
+
+        Parameters:
+        path - The path of the checkpoint file.
+        """
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def fork_checkpoint(path, strategy_params, stack=0):
+        """
+        Restores a backtest from a (e.g. warm-up) checkpoint with
+        different strategy parameters, so that several variants 
+        can be run on from the same point. Parameters that shape
+        the strategy's warmed-up state cannot be changed.
+
+        Parameters:
+        path - The path of the checkpoint file.
+        strategy_params - Dictionary of the parameters to change.
+        stack - The index of the stack whose strategy is changed.
+        """
+        backtest = Backtest.load_checkpoint(path)
+        trading_stack = backtest.stacks[stack]
+        trading_stack.strategy.set_params(**strategy_params)
+        trading_stack.strategy_params = dict(
+            trading_stack.strategy_params, **strategy_params
+        )
+        backtest.checkpoint_path = None
+        backtest.checkpoint_interval = None
+        return backtest
+
+    def events_per_second(self):
+        """
+        Returns the event throughput of the backtest so far.
+        """
+        if self.run_time == 0.0:
+            return 0.0
+        return self.events_dispatched / self.run_time
+
+    def profile_report(self):
+        """
+        Returns the profile of the run as a dictionary, or None
+        if the backtest is not being profiled.
+        """
+        if self.profiler is None:
+            return None
+        events = {
+            'MARKET': self.events_dispatched - self.signals - 
+                self.orders - self.fills,
+            'SIGNAL': self.signals, 
+            'ORDER': self.orders, 
+            'FILL': self.fills
+        }
+        return self.profiler.report(events=events, run_time=self.run_time)
+
+    def stack_stats(self):
+        """
+        Returns a DataFrame of the summary statistics of each 
+        stack, one row per strategy, from the incrementally 
+        tracked portfolio performance.
+        """
+        rows = []
+        for stack in self.stacks:
+            perf = stack.portfolio.performance
+            rows.append({
+                "strategy": str(stack),
+                "total_return": perf.total_return,
+                "sharpe_ratio": perf.sharpe_ratio(stack.portfolio.periods),
+                "max_drawdown": perf.max_drawdown,
+                "drawdown_duration": perf.max_duration,
+                "signals": stack.signals,
+                "orders": stack.orders,
+                "fills": stack.fills
+            })
+        return pd.DataFrame(rows).set_index("strategy")
 
     def _output_performance(self):
         """
         Outputs the strategy performance from the backtest.
         """
-        self.portfolio.create_equity_curve_dataframe()
+        for stack in self.stacks:
+            if len(self.stacks) > 1:
+                print("Stack: %s" % stack)
+            stack.portfolio.create_equity_curve_dataframe()
         
-        print("Creating summary stats...")
-        stats = self.portfolio.output_summary_stats()
+            print("Creating summary stats...")
+            stats = stack.portfolio.output_summary_stats()
         
-        print("Creating equity curve...")
-        print(self.portfolio.equity_curve.tail(10))
-        pprint.pprint(stats)
+            print("Creating equity curve...")
+            print(stack.portfolio.equity_curve.tail(10))
+            pprint.pprint(stats)
+
+            print("Signals: %s" % stack.signals)
+            print("Orders: %s" % stack.orders)
+            print("Fills: %s" % stack.fills)
+
+        if len(self.stacks) > 1:
+            print(self.stack_stats())
+        print(
+            "Events: %s (%0.0f events/sec)" % 
+            (self.events_dispatched, self.events_per_second())
+        )
 
-        print("Signals: %s" % self.signals)
-        print("Orders: %s" % self.orders)
-        print("Fills: %s" % self.fills)
+        if self.profiler is not None:
+            report = self.profile_report()
+            self.profiler.output_report(report)
+            if self.profile_path is not None:
+                self.profiler.dump_json(report, self.profile_path)
 
     def simulate_trading(self):
         """
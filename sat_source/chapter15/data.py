@@ -7,12 +7,121 @@ from __future__ import print_function
 
 from abc import ABCMeta, abstractmethod
 import datetime
+import heapq
+import itertools
+import json
 import os, os.path
 
 import numpy as np
 import pandas as pd
 
-from event import MarketEvent
+from event import MARKET_EVENT
+
+
+# The Yahoo CSV format, with the field used to calculate returns
+YAHOO_CSV_NAMES = [
+    'datetime', 'open', 'high', 'low', 'close', 'volume', 'adj_close'
+]
+
+
+def read_symbol_csv(csv_dir, symbol, names, chunksize=None):
+    """
+    Reads the 'symbol.csv' file from the CSV directory into a 
+    pandas DataFrame indexed on date, or an iterator of DataFrame
+    chunks if a chunksize is given. The rows are not sorted.
+
+    Parameters:
+    csv_dir - Absolute directory path to the CSV files.
+    symbol - The symbol string.
+    names - The column names, starting with the datetime.
+    chunksize - The optional number of rows per chunk.
+    """
+    return pd.io.parsers.read_csv(
+        os.path.join(csv_dir, '%s.csv' % symbol),
+        header=0, index_col=0, parse_dates=True,
+        names=names, chunksize=chunksize
+    )
+
+
+def _csv_cache_key(csv_path, names):
+    """
+    Returns the key identifying the cache of a CSV file: its
+    path, size and modification time, along with the column
+    names the file is read with.
+    """
+    stat = os.stat(csv_path)
+    return {
+        'csv_path': os.path.abspath(csv_path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'names': list(names)
+    }
+
+
+def _write_atomically(path, write):
+    """
+    Calls write(file) on a temporary file alongside 'path' and
+    then renames it into place, so that concurrent backtests
+    never observe a partially written cache.
+    """
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.rename(tmp_path, path)
+
+
+def read_cached_symbol_bars(csv_dir, symbol, names):
+    """
+    Reads the bars of 'symbol.csv' in ascending date order, via 
+    a binary cache written next to the CSV file on first use. 
+    Later reads memory-map the cache rather than parsing the 
+    CSV, so start-up is near instant. The mapped values are 
+    read-only, and callers which align or buffer them (such as
+    HistoricCSVDataHandler) work on their own copies.
+
+    The cache is a single (columns x bars) int64 .npy file. The 
+    first row holds the timestamps in nanoseconds and the other 
+    rows hold the float64 bar fields, one contiguous row per 
+    field. A JSON file alongside it holds the key of the CSV 
+    it was built from and it is rebuilt if that key changes.
+
+    Returns a (timestamps, values) tuple, with values being a
+    read-only (fields x bars) float64 array.
+
+    Parameters:
+    csv_dir - Absolute directory path to the CSV files.
+    symbol - The symbol string.
+    names - The column names, starting with the datetime.
+    """
+    csv_path = os.path.join(csv_dir, '%s.csv' % symbol)
+    cache_path = csv_path + '.cache.npy'
+    key_path = csv_path + '.cache.json'
+    key = _csv_cache_key(csv_path, names)
+
+    try:
+        with open(key_path) as f:
+            cached = json.load(f) == key
+    except (IOError, OSError, ValueError):
+        cached = False
+
+    if not cached:
+        df = read_symbol_csv(csv_dir, symbol, names).sort_index()
+        arr = np.empty((len(names), len(df)), dtype=np.int64)
+        arr[0] = np.asarray(
+            df.index.values, dtype='datetime64[ns]'
+        ).view(np.int64)
+        arr[1:].view(np.float64)[:] = df.values.astype(np.float64).T
+        try:
+            _write_atomically(cache_path, lambda f: np.save(f, arr))
+            _write_atomically(
+                key_path, lambda f: f.write(json.dumps(key).encode('utf-8'))
+            )
+        except (IOError, OSError):
+            # A read-only data directory simply goes uncached
+            pass
+    else:
+        arr = np.load(cache_path, mmap_mode='r')
+    return arr[0], arr[1:].view(np.float64)
 
 
 class DataHandler(object):
@@ -67,6 +176,51 @@ class DataHandler(object):
         """
         raise NotImplementedError("Should implement get_latest_bars_values()")
 
+    def get_latest_bar_value_vector(self, val_type):
+        """
+        Returns one of the Open, High, Low, Close, Volume or OI
+        values from the last bar of every symbol in the symbol
+        list, as a NumPy array in symbol list order.
+        """
+        return np.array([
+            self.get_latest_bar_value(s, val_type) 
+            for s in self.symbol_list
+        ])
+
+    def get_latest_bars_values_matrix(self, val_type, N=1):
+        """
+        Returns the last N bar values of every symbol in the 
+        symbol list as a (symbols x N) NumPy array, or N-k 
+        columns if less available. Symbols with fewer bars 
+        than others are padded with NaN on the left.
+        """
+        values = [
+            self.get_latest_bars_values(s, val_type, N=N) 
+            for s in self.symbol_list
+        ]
+        matrix = np.full(
+            (len(values), max([len(v) for v in values] + [0])), np.nan
+        )
+        for j, v in enumerate(values):
+            if len(v) > 0:
+                matrix[j, -len(v):] = v
+        return matrix
+
+    def is_latest_bar_padded(self, symbol):
+        """
+        Returns True if the latest bar of the symbol was not in
+        the data, but padded forward from an earlier bar. Data
+        handlers which do not pad their bars return False.
+        """
+        return False
+
+    def get_current_datetime(self):
+        """
+        Returns the datetime of the latest update, i.e. the
+        current time of the data "clock".
+        """
+        return self.get_latest_bar_datetime(self.symbol_list[0])
+
     @abstractmethod
     def update_bars(self):
         """
@@ -83,8 +237,22 @@ class HistoricCSVDataHandler(DataHandler):
     each requested symbol from disk and provide an interface
     to obtain the "latest" bar in a manner identical to a live
     trading interface. 
+
+    The bars are held in a columnar store: one (bars x symbols)
+    NumPy array per OHLCV field, with each symbol's column being
+    contiguous in memory. An integer cursor marks how many bars
+    have been "released" so far, so the latest bars values are
+    simply zero-copy slices of these arrays.
+
+    All symbols are aligned to the union of their dates, with 
+    missing bars padded forward. The bars present in the data
+    are recorded, so padded bars can be told apart.
     """
 
+    csv_names = YAHOO_CSV_NAMES
+    returns_field = 'adj_close'
+    use_csv_cache = True
+
     def __init__(self, events, csv_dir, symbol_list):
         """
         Initialises the historic data handler by requesting
@@ -101,131 +269,679 @@ class HistoricCSVDataHandler(DataHandler):
         self.events = events
         self.csv_dir = csv_dir
         self.symbol_list = symbol_list
+        self.symbol_index = dict(
+            (s, i) for i, s in enumerate(self.symbol_list)
+        )
 
-        self.symbol_data = {}
-        self.latest_symbol_data = {}
+        self.bar_datetimes = None
+        self.bar_data = {}
+        self.bar_present = None
         self.continue_backtest = True       
         self.bar_index = 0
 
         self._open_convert_csv_files()
 
-    def _open_convert_csv_files(self):
+    def _read_symbol_csv(self, symbol):
         """
-        Opens the CSV files from the data directory, converting
-        them into pandas DataFrames within a symbol dictionary.
+        Reads the CSV file for a single symbol into a pandas
+        DataFrame, indexed on date.
 
         For this handler it will be assumed that the data is
-        taken from Yahoo. Thus its format will be respected.
+        taken from Yahoo. Thus its format (csv_names) will be 
+        respected. Unless use_csv_cache is disabled the CSV is 
+        only parsed once, with later runs reading the binary 
+        cache instead.
         """
+        if not self.use_csv_cache:
+            return read_symbol_csv(
+                self.csv_dir, symbol, self.csv_names
+            ).sort_index()
+        timestamps, values = read_cached_symbol_bars(
+            self.csv_dir, symbol, self.csv_names
+        )
+        return pd.DataFrame(
+            values.T, columns=self.csv_names[1:],
+            index=pd.DatetimeIndex(
+                timestamps.view('datetime64[ns]'), name=self.csv_names[0]
+            )
+        )
+
+    def _add_derived_columns(self, df):
+        """
+        Adds any columns calculated from the raw bars, once
+        they have been aligned to the combined index.
+        """
+        df["returns"] = df[self.returns_field].pct_change()
+
+    def _open_convert_csv_files(self):
+        """
+        Opens the CSV files from the data directory and converts
+        them into one (bars x symbols) float64 array per field.
+        The arrays are Fortran-ordered so that the full history
+        of any single symbol is contiguous in memory.
+        """
+        symbol_frames = {}
         comb_index = None
         for s in self.symbol_list:
-            # Load the CSV file with no header information, indexed on date
-            self.symbol_data[s] = pd.io.parsers.read_csv(
-                os.path.join(self.csv_dir, '%s.csv' % s),
-                header=0, index_col=0, parse_dates=True,
-                names=[
-                    'datetime', 'open', 'high', 
-                    'low', 'close', 'volume', 'adj_close'
-                ]
-            ).sort()
+            symbol_frames[s] = self._read_symbol_csv(s)
 
             # Combine the index to pad forward values
             if comb_index is None:
-                comb_index = self.symbol_data[s].index
+                comb_index = symbol_frames[s].index
             else:
-                comb_index.union(self.symbol_data[s].index)
-
-            # Set the latest symbol_data to None
-            self.latest_symbol_data[s] = []
-
-        for s in self.symbol_list:
-            self.symbol_data[s] = self.symbol_data[s].reindex(
+                comb_index = comb_index.union(symbol_frames[s].index)
+
+        present = np.empty(
+            (len(comb_index), len(self.symbol_list)), dtype=bool, order='F'
+        )
+        for j, s in enumerate(self.symbol_list):
+            present[:, j] = comb_index.isin(symbol_frames[s].index)
+            symbol_frames[s] = symbol_frames[s].reindex(
                 index=comb_index, method='pad'
             )
-            self.symbol_data[s]["returns"] = self.symbol_data[s]["adj_close"].pct_change()
-            self.symbol_data[s] = self.symbol_data[s].iterrows()
+            self._add_derived_columns(symbol_frames[s])
+        present.flags.writeable = False
+        self.bar_present = present
+
+        fields = symbol_frames[self.symbol_list[0]].columns
+        for field in fields:
+            arr = np.empty(
+                (len(comb_index), len(self.symbol_list)),
+                dtype=np.float64, order='F'
+            )
+            for j, s in enumerate(self.symbol_list):
+                arr[:, j] = symbol_frames[s][field].values
+            # Strategies receive views onto these arrays, so
+            # guard the history against accidental writes
+            arr.flags.writeable = False
+            self.bar_data[field] = arr
+        self.bar_datetimes = comb_index
+
+    def _get_symbol_column(self, symbol):
+        """
+        Returns the column index of the symbol within the
+        bar arrays, raising a KeyError for unknown symbols.
+        """
+        try:
+            return self.symbol_index[symbol]
+        except KeyError:
+            print("That symbol is not available in the historical data set.")
+            raise
 
-    def _get_new_bar(self, symbol):
+    def _make_bar(self, i, j):
         """
-        Returns the latest bar from the data feed.
+        Creates a (datetime, bar) tuple for bar i of symbol
+        column j, in the same form as DataFrame.iterrows().
         """
-        for b in self.symbol_data[symbol]:
-            yield b
+        bar = pd.Series(
+            dict((f, self.bar_data[f][i, j]) for f in self.bar_data)
+        )
+        return (self.bar_datetimes[i], bar)
 
     def get_latest_bar(self, symbol):
         """
         Returns the last bar from the latest_symbol list.
         """
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print("That symbol is not available in the historical data set.")
-            raise
-        else:
-            return bars_list[-1]
+        j = self._get_symbol_column(symbol)
+        if self.bar_index == 0:
+            raise IndexError("No bars have been released yet.")
+        return self._make_bar(self.bar_index - 1, j)
 
     def get_latest_bars(self, symbol, N=1):
         """
         Returns the last N bars from the latest_symbol list,
         or N-k if less available.
         """
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print("That symbol is not available in the historical data set.")
-            raise
-        else:
-            return bars_list[-N:]
+        j = self._get_symbol_column(symbol)
+        return [
+            self._make_bar(i, j) for i in 
+            range(max(self.bar_index - N, 0), self.bar_index)
+        ]
 
     def get_latest_bar_datetime(self, symbol):
         """
         Returns a Python datetime object for the last bar.
         """
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print("That symbol is not available in the historical data set.")
-            raise
-        else:
-            return bars_list[-1][0]
+        self._get_symbol_column(symbol)
+        if self.bar_index == 0:
+            raise IndexError("No bars have been released yet.")
+        return self.bar_datetimes[self.bar_index - 1]
 
     def get_latest_bar_value(self, symbol, val_type):
         """
         Returns one of the Open, High, Low, Close, Volume or OI
-        values from the pandas Bar series object.
+        values from the latest bar, as a NumPy scalar.
         """
-        try:
-            bars_list = self.latest_symbol_data[symbol]
-        except KeyError:
-            print("That symbol is not available in the historical data set.")
-            raise
-        else:
-            return getattr(bars_list[-1][1], val_type)
+        j = self._get_symbol_column(symbol)
+        if self.bar_index == 0:
+            raise IndexError("No bars have been released yet.")
+        return self.bar_data[val_type][self.bar_index - 1, j]
+
+    def is_latest_bar_padded(self, symbol):
+        """
+        Returns True if the latest bar of the symbol was padded
+        forward from an earlier bar, rather than read from its
+        CSV file.
+        """
+        j = self._get_symbol_column(symbol)
+        if self.bar_index == 0:
+            raise IndexError("No bars have been released yet.")
+        return not self.bar_present[self.bar_index - 1, j]
+
+    def get_latest_bar_value_vector(self, val_type):
+        """
+        Returns one of the Open, High, Low, Close, Volume or OI
+        values from the latest bar of every symbol, as a read-only
+        view onto the current row of the store.
+        """
+        if self.bar_index == 0:
+            raise IndexError("No bars have been released yet.")
+        return self.bar_data[val_type][self.bar_index - 1]
 
     def get_latest_bars_values(self, symbol, val_type, N=1):
         """
         Returns the last N bar values from the 
         latest_symbol list, or N-k if less available.
+
+        The returned array is a read-only view onto the 
+        underlying store, rather than a copy.
+        """
+        j = self._get_symbol_column(symbol)
+        return self.bar_data[val_type][
+            max(self.bar_index - N, 0):self.bar_index, j
+        ]
+
+    def get_latest_bars_values_matrix(self, val_type, N=1):
+        """
+        Returns the last N bar values of every symbol as a 
+        read-only (symbols x N) view onto the store, or N-k 
+        columns if less available.
+        """
+        return self.bar_data[val_type][
+            max(self.bar_index - N, 0):self.bar_index
+        ].T
+
+    def get_all_bars_values(self, val_type):
+        """
+        Returns the full (bars x symbols) history of a field,
+        irrespective of the bar cursor. This "looks ahead" and
+        so is only intended for vectorised backtests.
+        """
+        return self.bar_data[val_type]
+
+    def save_bar_store(self, store_dir):
+        """
+        Writes the columnar store to NumPy .npy files in the 
+        store directory, one per field plus the bar datetimes,
+        symbols and the bars present in the data, so that
+        BarStoreDataHandler instances in other processes can
+        memory-map it rather than re-parse the CSV files.
+
+        Parameters:
+        store_dir - The directory to write the store files to.
+        """
+        np.save(
+            os.path.join(store_dir, 'symbols.npy'), 
+            np.array(self.symbol_list)
+        )
+        np.save(
+            os.path.join(store_dir, 'datetime.npy'),
+            np.asarray(self.bar_datetimes.values, dtype='datetime64[ns]')
+        )
+        np.save(os.path.join(store_dir, 'bar_present.npy'), self.bar_present)
+        for field, arr in self.bar_data.items():
+            np.save(os.path.join(store_dir, '%s.npy' % field), arr)
+
+    def __getstate__(self):
+        """
+        Excludes the bar store from pickled checkpoints, since it
+        can be reloaded from the CSV files (or their cache).
+        """
+        state = self.__dict__.copy()
+        state['bar_data'] = {}
+        state['bar_present'] = None
+        state['bar_datetimes'] = len(self.bar_datetimes)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Reloads the bar store when restoring from a checkpoint,
+        checking that the data has not changed in the meantime.
+        """
+        n_bars = state.pop('bar_datetimes')
+        self.__dict__.update(state)
+        self._open_convert_csv_files()
+        if len(self.bar_datetimes) != n_bars:
+            raise ValueError(
+                "The data has %s bars rather than the %s it was "
+                "checkpointed with." % (len(self.bar_datetimes), n_bars)
+            )
+
+    def update_bars(self):
+        """
+        Advances the bar cursor by one for all symbols in the 
+        symbol list and places a MarketEvent on the queue.
+        """
+        if self.bar_index < len(self.bar_datetimes):
+            self.bar_index += 1
+            self.events.put(MARKET_EVENT)
+        else:
+            self.continue_backtest = False
+
+
+class BarStoreDataHandler(HistoricCSVDataHandler):
+    """
+    BarStoreDataHandler memory-maps a columnar bar store written
+    by HistoricCSVDataHandler.save_bar_store, in place of parsing
+    the CSV files. The store is opened read-only and the bar
+    values are returned as views onto the mapped arrays, so the
+    workers of a parameter sweep read the same pages of market
+    data, unless a strategy copies the values it is given.
+
+    The csv_dir parameter is taken to be the store directory.
+    """
+
+    def _open_convert_csv_files(self):
+        """
+        Memory-maps the field arrays and the bars present, and
+        loads the bar datetimes from the store directory.
+        """
+        store_symbols = list(np.load(os.path.join(self.csv_dir, 'symbols.npy')))
+        if store_symbols != list(self.symbol_list):
+            raise ValueError(
+                "The bar store holds symbols %s, not %s." % 
+                (store_symbols, self.symbol_list)
+            )
+        self.bar_datetimes = pd.DatetimeIndex(
+            np.load(os.path.join(self.csv_dir, 'datetime.npy'))
+        )
+        self.bar_present = np.load(
+            os.path.join(self.csv_dir, 'bar_present.npy'), mmap_mode='r'
+        )
+        for filename in os.listdir(self.csv_dir):
+            field, ext = os.path.splitext(filename)
+            if ext == '.npy' and \
+                field not in ('symbols', 'datetime', 'bar_present'):
+                self.bar_data[field] = np.load(
+                    os.path.join(self.csv_dir, filename), mmap_mode='r'
+                )
+
+
+class StreamingDataHandler(DataHandler):
+    """
+    StreamingDataHandler is a base class for data handlers that
+    release bars one timestamp at a time without holding the full
+    history in memory. Only the last 'lookback' bars of each 
+    symbol are retained, so memory use is constant regardless of
+    the length of the run.
+
+    The bars are kept in fixed-capacity NumPy ring buffers, one
+    per symbol and field. Each buffer is twice the lookback long
+    and every value is written to both halves, so that the last
+    N values are always a contiguous slice and can be returned
+    as a view without copying.
+
+    Symbols need not share timestamps. Every symbol's latest bar
+    remains current until it is replaced, which forward fills
+    ragged data lazily rather than padding it onto a combined 
+    index up front.
+    """
+
+    def __init__(self, events, symbol_list, fields, lookback=1000):
+        """
+        Parameters:
+        events - The Event Queue.
+        symbol_list - A list of symbol strings.
+        fields - The list of bar field names, e.g. 'close'.
+        lookback - The maximum number of bars retained per symbol.
+        """
+        self.events = events
+        self.symbol_list = symbol_list
+        self.symbol_index = dict(
+            (s, i) for i, s in enumerate(self.symbol_list)
+        )
+        self.fields = list(fields)
+        self.field_index = dict(
+            (f, i) for i, f in enumerate(self.fields)
+        )
+        self.lookback = lookback
+
+        # (symbols x fields x 2*lookback) bars, with timestamps
+        # as integer nanoseconds, the next write position and
+        # the number of bars currently held for each symbol
+        self.bar_buffers = np.full(
+            (len(self.symbol_list), len(self.fields), 2 * lookback), np.nan
+        )
+        self.datetime_buffers = np.zeros(
+            (len(self.symbol_list), 2 * lookback), dtype=np.int64
+        )
+        self.buffer_pos = np.zeros(len(self.symbol_list), dtype=np.int64)
+        self.buffer_len = np.zeros(len(self.symbol_list), dtype=np.int64)
+        self.symbol_rows = np.arange(len(self.symbol_list))
+
+        self.current_datetime = None
+        self.continue_backtest = True
+
+    def _get_symbol_column(self, symbol):
+        """
+        Returns the row index of the symbol within the ring
+        buffers, raising a KeyError for unknown symbols.
         """
         try:
-            bars_list = self.get_latest_bars(symbol, N)
+            return self.symbol_index[symbol]
         except KeyError:
             print("That symbol is not available in the historical data set.")
             raise
+
+    def _latest_slice(self, j, N):
+        """
+        Returns the buffer slice holding the last N bars of 
+        symbol row j, or N-k if less available.
+        """
+        end = self.buffer_pos[j] + self.lookback
+        return slice(end - min(N, self.buffer_len[j]), end)
+
+    def _latest_position(self, j):
+        """
+        Returns the buffer position of the latest bar of symbol 
+        row j, raising an IndexError if it has not traded yet.
+        """
+        if self.buffer_len[j] == 0:
+            raise IndexError("No bars have been released yet.")
+        return self.buffer_pos[j] + self.lookback - 1
+
+    def _make_bar(self, j, p):
+        """
+        Creates a (datetime, bar) tuple for buffer position p
+        of symbol row j, in the same form as DataFrame.iterrows().
+        """
+        return (
+            pd.Timestamp(self.datetime_buffers[j, p]),
+            pd.Series(self.bar_buffers[j, :, p].copy(), index=self.fields)
+        )
+
+    def _push_bar(self, j, ts, values):
+        """
+        Writes a bar to both halves of the ring buffers of symbol
+        row j, overwriting the oldest bar once the lookback is full.
+
+        Parameters:
+        j - The symbol row index.
+        ts - The bar timestamp as integer nanoseconds.
+        values - The bar values, ordered as the fields list.
+        """
+        p = self.buffer_pos[j]
+        upper = p + self.lookback
+        self.bar_buffers[j, :, p] = values
+        self.bar_buffers[j, :, upper] = values
+        self.datetime_buffers[j, p] = ts
+        self.datetime_buffers[j, upper] = ts
+        self.buffer_pos[j] = (p + 1) % self.lookback
+        if self.buffer_len[j] < self.lookback:
+            self.buffer_len[j] += 1
+
+    def get_latest_bar(self, symbol):
+        """
+        Returns the last bar from the latest_symbol list.
+        """
+        j = self._get_symbol_column(symbol)
+        return self._make_bar(j, self._latest_position(j))
+
+    def get_latest_bars(self, symbol, N=1):
+        """
+        Returns the last N bars from the latest_symbol list,
+        or N-k if less available.
+        """
+        j = self._get_symbol_column(symbol)
+        latest = self._latest_slice(j, N)
+        return [
+            self._make_bar(j, p) for p in range(latest.start, latest.stop)
+        ]
+
+    def get_latest_bar_datetime(self, symbol):
+        """
+        Returns a Python datetime object for the last bar
+        of the symbol, which may precede the current datetime
+        if the symbol has not traded at the latest timestamp.
+        """
+        j = self._get_symbol_column(symbol)
+        return pd.Timestamp(self.datetime_buffers[j, self._latest_position(j)])
+
+    def get_latest_bar_value(self, symbol, val_type):
+        """
+        Returns one of the Open, High, Low, Close, Volume or OI
+        values from the latest bar, as a NumPy scalar.
+        """
+        j = self._get_symbol_column(symbol)
+        return self.bar_buffers[
+            j, self.field_index[val_type], self._latest_position(j)
+        ]
+
+    def get_latest_bar_value_vector(self, val_type):
+        """
+        Returns one of the Open, High, Low, Close, Volume or OI
+        values from the latest bar of every symbol, as a NumPy
+        array in symbol list order. Symbols that have not 
+        traded yet are NaN, as their buffers are unwritten.
+        """
+        if self.current_datetime is None:
+            raise IndexError("No bars have been released yet.")
+        return self.bar_buffers[
+            self.symbol_rows, self.field_index[val_type],
+            self.buffer_pos + self.lookback - 1
+        ]
+
+    def get_latest_bars_values(self, symbol, val_type, N=1):
+        """
+        Returns the last N bar values from the 
+        latest_symbol list, or N-k if less available.
+
+        The returned array is a read-only contiguous view onto 
+        the ring buffer, which is only valid until the next call 
+        to update_bars. Take a copy to keep the values for longer.
+        """
+        j = self._get_symbol_column(symbol)
+        values = self.bar_buffers[
+            j, self.field_index[val_type], self._latest_slice(j, N)
+        ]
+        values.flags.writeable = False
+        return values
+
+    def get_latest_bars_values_matrix(self, val_type, N=1):
+        """
+        Returns the last N bar values of every symbol as a
+        (symbols x N) NumPy array, gathered from the ring buffers
+        in one indexing operation, or N-k columns if less 
+        available. Symbols with fewer bars than others are padded
+        with NaN on the left, as their buffers are unwritten.
+        """
+        N = min(N, self.buffer_len.max())
+        cols = (self.buffer_pos + self.lookback)[:, np.newaxis] + np.arange(-N, 0)
+        return self.bar_buffers[
+            self.symbol_rows[:, np.newaxis], self.field_index[val_type], cols
+        ]
+
+    def get_current_datetime(self):
+        """
+        Returns the timestamp of the latest MarketEvent.
+        """
+        if self.current_datetime is None:
+            raise IndexError("No bars have been released yet.")
+        return self.current_datetime
+
+
+class HistoricCSVMergeDataHandler(StreamingDataHandler):
+    """
+    HistoricCSVMergeDataHandler streams the CSV files of each
+    requested symbol in chunks and merges them in timestamp 
+    order with a heap, i.e. a k-way merge of already sorted
+    streams. One MarketEvent is generated per distinct 
+    timestamp across all symbols.
+
+    Memory use is bounded by the lookback and the chunk size,
+    rather than by the length of the history, so it is suited
+    to long and ragged intraday data sets.
+    """
+
+    csv_names = YAHOO_CSV_NAMES
+    returns_field = 'adj_close'
+    use_csv_cache = True
+
+    def __init__(
+        self, events, csv_dir, symbol_list, 
+        lookback=1000, chunksize=10000
+    ):
+        """
+        Initialises the merging data handler by requesting
+        the location of the CSV files and a list of symbols.
+
+        Parameters:
+        events - The Event Queue.
+        csv_dir - Absolute directory path to the CSV files.
+        symbol_list - A list of symbol strings.
+        lookback - The maximum number of bars retained per symbol.
+        chunksize - The number of bars read at a time.
+        """
+        super(HistoricCSVMergeDataHandler, self).__init__(
+            events, symbol_list, self._get_bar_fields(), lookback=lookback
+        )
+        self.csv_dir = csv_dir
+        self.chunksize = chunksize
+        self.bars_released = np.zeros(len(self.symbol_list), dtype=np.int64)
+        self._open_symbol_streams()
+
+    def _open_symbol_streams(self):
+        """
+        Opens the bar stream of every symbol, skipping any bars 
+        already released, and pushes the next bar of each onto
+        the heap.
+        """
+        self.symbol_streams = [
+            self._symbol_bar_stream(s) for s in self.symbol_list
+        ]
+        self.bar_heap = []
+        for j, stream in enumerate(self.symbol_streams):
+            for i in range(self.bars_released[j]):
+                next(stream)
+            self._push_next_bar(j)
+
+    def __getstate__(self):
+        """
+        Excludes the open streams from pickled checkpoints. They
+        are reopened at the released position on restoring.
+        """
+        state = self.__dict__.copy()
+        del state['symbol_streams']
+        del state['bar_heap']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Reopens the symbol streams when restoring a checkpoint.
+        """
+        self.__dict__.update(state)
+        self._open_symbol_streams()
+
+    def _get_bar_fields(self):
+        """
+        Returns the list of fields of the bars that are released,
+        i.e. the CSV columns followed by the returns.
+        """
+        return self.csv_names[1:] + ['returns']
+
+    def _read_chunks(self, symbol):
+        """
+        Generates (timestamps, values) chunks of a symbol's bars
+        in ascending date order, with the timestamps as integer
+        nanoseconds and the values as a (bars x fields) array.
+
+        The binary cache is sliced directly, if enabled. Otherwise
+        the CSV is parsed a chunk at a time, except for files that 
+        are stored newest first (as Yahoo files are), which cannot
+        be streamed and are instead read and sorted in full.
+        """
+        if self.use_csv_cache:
+            timestamps, values = read_cached_symbol_bars(
+                self.csv_dir, symbol, self.csv_names
+            )
+            for i in range(0, len(timestamps), self.chunksize):
+                yield (
+                    timestamps[i:i + self.chunksize],
+                    values[:, i:i + self.chunksize].T
+                )
+            return
+
+        chunks = read_symbol_csv(
+            self.csv_dir, symbol, self.csv_names, 
+            chunksize=self.chunksize
+        )
+        first = next(chunks, None)
+        if first is None:
+            return
+        if np.any(np.diff(first.index.values) < np.timedelta64(0)):
+            chunks = [read_symbol_csv(
+                self.csv_dir, symbol, self.csv_names
+            ).sort_index()]
         else:
-            return np.array([getattr(b[1], val_type) for b in bars_list])
+            chunks = itertools.chain([first], chunks)
+        for chunk in chunks:
+            yield (
+                np.asarray(
+                    chunk.index.values, dtype='datetime64[ns]'
+                ).view(np.int64),
+                chunk.values.astype(np.float64)
+            )
+
+    def _symbol_bar_stream(self, symbol):
+        """
+        Generates (timestamp, values) tuples for a single symbol,
+        with the timestamp as integer nanoseconds. The returns 
+        are calculated across chunk boundaries.
+        """
+        k = self.csv_names.index(self.returns_field) - 1
+        last_ts = None
+        last_price = np.nan
+        for ts, values in self._read_chunks(symbol):
+            if len(ts) == 0:
+                continue
+            if np.any(np.diff(ts) < 0) or (
+                last_ts is not None and ts[0] < last_ts
+            ):
+                raise ValueError(
+                    "The bars of %s are not in ascending date order." % symbol
+                )
+            price = values[:, k]
+            prev_price = np.concatenate([[last_price], price[:-1]])
+            returns = price / prev_price - 1.0
+            rows = np.column_stack([values, returns])
+            last_ts = ts[-1]
+            last_price = price[-1]
+            for i in range(len(ts)):
+                yield ts[i], rows[i]
+
+    def _push_next_bar(self, j):
+        """
+        Pushes the next bar of symbol column j onto the heap,
+        if its stream is not yet exhausted.
+        """
+        bar = next(self.symbol_streams[j], None)
+        if bar is not None:
+            heapq.heappush(self.bar_heap, (bar[0], j, bar[1]))
 
     def update_bars(self):
         """
-        Pushes the latest bar to the latest_symbol_data structure
-        for all symbols in the symbol list.
+        Pops every bar sharing the earliest pending timestamp from
+        the heap, appends them to the lookback of their symbols 
+        and places a single MarketEvent on the queue.
         """
-        for s in self.symbol_list:
-            try:
-                bar = next(self._get_new_bar(s))
-            except StopIteration:
-                self.continue_backtest = False
-            else:
-                if bar is not None:
-                    self.latest_symbol_data[s].append(bar)
-        self.events.put(MarketEvent())
+        if not self.bar_heap:
+            self.continue_backtest = False
+            return
+        ts = self.bar_heap[0][0]
+        while self.bar_heap and self.bar_heap[0][0] == ts:
+            _, j, values = heapq.heappop(self.bar_heap)
+            self._push_bar(j, ts, values)
+            self.bars_released[j] += 1
+            self._push_next_bar(j)
+        self.current_datetime = pd.Timestamp(ts)
+        self.events.put(MARKET_EVENT)
@@ -6,26 +6,54 @@
 from __future__ import print_function
 
 
+# Integer event kinds, used by the event bus to index its 
+# handler table rather than comparing the type strings
+MARKET, SIGNAL, ORDER, FILL = range(4)
+EVENT_KINDS = (MARKET, SIGNAL, ORDER, FILL)
+
+
 class Event(object):
     """
     Event is base class providing an interface for all subsequent 
     (inherited) events, that will trigger further events in the 
     trading infrastructure.   
+
+    Events are slotted rather than backed by an instance dict,
+    since a backtest creates one or more of them for every bar.
+    The 'type' strings are kept as class attributes for code
+    that compares them, but the integer 'kind' is faster.
     """
-    pass
+
+    __slots__ = ()
 
 
 class MarketEvent(Event):
     """
     Handles the event of receiving a new market update with 
     corresponding bars.
+
+    A MarketEvent carries no data and cannot be modified, so a
+    single instance is shared: MarketEvent() always returns it.
     """
 
-    def __init__(self):
+    __slots__ = ()
+
+    kind = MARKET
+    type = 'MARKET'
+
+    _instance = None
+
+    def __new__(cls):
         """
-        Initialises the MarketEvent.
+        Returns the shared MarketEvent, creating it on first use.
         """
-        self.type = 'MARKET'
+        if cls._instance is None:
+            cls._instance = super(MarketEvent, cls).__new__(cls)
+        return cls._instance
+
+
+# The shared MarketEvent, for data handlers to put on the queue
+MARKET_EVENT = MarketEvent()
 
 
 class SignalEvent(Event):
@@ -33,6 +61,13 @@ class SignalEvent(Event):
     Handles the event of sending a Signal from a Strategy object.
     This is received by a Portfolio object and acted upon.
     """
+
+    __slots__ = (
+        'strategy_id', 'symbol', 'datetime', 'signal_type', 'strength'
+    )
+
+    kind = SIGNAL
+    type = 'SIGNAL'
     
     def __init__(self, strategy_id, symbol, datetime, signal_type, strength):
         """
@@ -47,7 +82,6 @@ class SignalEvent(Event):
             quantity at the portfolio level. Useful for pairs strategies.
         """
         self.strategy_id = strategy_id
-        self.type = 'SIGNAL'
         self.symbol = symbol
         self.datetime = datetime
         self.signal_type = signal_type
@@ -61,6 +95,11 @@ class OrderEvent(Event):
     quantity and a direction.
     """
 
+    __slots__ = ('symbol', 'order_type', 'quantity', 'direction')
+
+    kind = ORDER
+    type = 'ORDER'
+
     def __init__(self, symbol, order_type, quantity, direction):
         """
         Initialises the order type, setting whether it is
@@ -77,7 +116,6 @@ class OrderEvent(Event):
         quantity - Non-negative integer for quantity.
         direction - 'BUY' or 'SELL' for long or short.
         """
-        self.type = 'ORDER'
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
@@ -105,6 +143,14 @@ class FillEvent(Event):
     the cost.
     """
 
+    __slots__ = (
+        'timeindex', 'symbol', 'exchange', 'quantity', 
+        'direction', 'fill_cost', 'commission'
+    )
+
+    kind = FILL
+    type = 'FILL'
+
     def __init__(self, timeindex, symbol, exchange, quantity, 
                  direction, fill_cost, commission=None):
         """
@@ -125,7 +171,6 @@ class FillEvent(Event):
         fill_cost - The holdings value in dollars.
         commission - An optional commission sent from IB.
         """
-        self.type = 'FILL'
         self.timeindex = timeindex
         self.symbol = symbol
         self.exchange = exchange
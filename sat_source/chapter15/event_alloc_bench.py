@@ -0,0 +1,238 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# event_alloc_bench.py
+
+from __future__ import print_function
+
+import datetime
+import sys
+import time
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import event
+from backtest import Backtest
+from execution import SimulatedExecutionHandler
+from hft_data import HistoricCSVDataHandlerHFT
+from hft_portfolio import PortfolioHFT
+from intraday_mr import IntradayOLSMRStrategy
+
+
+def make_dict_event_class(cls):
+    """
+    Returns a copy of a slotted event class backed by an
+    instance dict, as the events were originally, with the
+    same methods, 'type' and 'kind'.
+    """
+    slots = getattr(cls, '__slots__', ())
+    attrs = dict(
+        (k, v) for k, v in cls.__dict__.items()
+        if k not in slots and k not in ('__slots__', '__new__', '_instance')
+    )
+    return type(cls.__name__, (object,), attrs)
+
+
+class DictEvents(object):
+    """
+    Context manager replacing the SignalEvent, OrderEvent and
+    FillEvent classes, wherever they have been imported, with
+    dict-backed copies for the duration of a with block.
+    """
+
+    classes = (event.SignalEvent, event.OrderEvent, event.FillEvent)
+
+    def __enter__(self):
+        self.patched = []
+        for cls in self.classes:
+            dict_cls = make_dict_event_class(cls)
+            for module in list(sys.modules.values()):
+                if getattr(module, cls.__name__, None) is cls:
+                    setattr(module, cls.__name__, dict_cls)
+                    self.patched.append((module, cls))
+        return self
+
+    def __exit__(self, *exc_info):
+        for module, cls in self.patched:
+            setattr(module, cls.__name__, cls)
+        return False
+
+
+def run_backtest(
+    csv_dir, symbol_list, start_date, data_handler, portfolio,
+    strategy, initial_capital, dict_events, trace_memory=False
+):
+    """
+    Runs the backtest with dict-backed events, including a new
+    MarketEvent per bar, or with the slotted events and shared
+    MarketEvent, returning the Backtest, its run time and the
+    peak memory allocated while running (in bytes, or None).
+    """
+    backtest = Backtest(
+        csv_dir, symbol_list, initial_capital, 0.0,
+        start_date, data_handler, SimulatedExecutionHandler,
+        portfolio, strategy
+    )
+
+    # Both runs place the MarketEvents through the same wrapper,
+    # which allocates a new one per bar for the dict-backed run
+    append = backtest.events.events.append
+    if dict_events:
+        market_event_cls = make_dict_event_class(event.MarketEvent)
+        backtest.events.put = lambda e: append(market_event_cls())
+    else:
+        backtest.events.put = lambda e: append(e)
+
+    trace = trace_memory and tracemalloc is not None
+    if trace:
+        tracemalloc.start()
+    start = time.time()
+    if dict_events:
+        with DictEvents():
+            backtest._run_backtest()
+    else:
+        backtest._run_backtest()
+    run_time = time.time() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return backtest, run_time, peak
+
+
+# Constructor arguments of a typical event of each kind
+EVENT_ARGS = [
+    ("Market", event.MarketEvent, ()),
+    ("Signal", event.SignalEvent, (
+        1, 'AREX', datetime.datetime(2007, 11, 8), 'LONG', 1.0
+    )),
+    ("Order", event.OrderEvent, ('AREX', 'MKT', 100, 'BUY')),
+    ("Fill", event.FillEvent, (
+        datetime.datetime(2007, 11, 8), 'AREX', 'ARCA', 100, 'BUY', None
+    ))
+]
+
+
+def measure_event_footprint(cls, args, n=10000):
+    """
+    Returns the memory (in bytes) and the number of memory
+    blocks allocated per event, from tracemalloc snapshots
+    taken before and after creating n events of the class,
+    which are kept alive. Returns (None, None) without
+    tracemalloc.
+    """
+    if tracemalloc is None:
+        return None, None
+    events = [None] * n
+    tracemalloc.start()
+    exclude = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    before = tracemalloc.take_snapshot().filter_traces(exclude)
+    for i in range(n):
+        events[i] = cls(*args)
+    after = tracemalloc.take_snapshot().filter_traces(exclude)
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(st.size_diff for st in stats)
+    blocks = sum(st.count_diff for st in stats)
+    return size / float(n), blocks / float(n)
+
+
+def benchmark_event_footprint(counts):
+    """
+    Prints the memory and blocks allocated per event of each
+    kind, dict-backed and slotted, and their totals for the
+    given numbers of events of each kind in EVENT_ARGS order.
+    """
+    totals = [0.0, 0.0]
+    for (name, cls, args), count in zip(EVENT_ARGS, counts):
+        footprints = []
+        for i, event_cls in enumerate((make_dict_event_class(cls), cls)):
+            size, blocks = measure_event_footprint(event_cls, args)
+            if size is None:
+                return
+            totals[i] += count * size
+            footprints.append("%0.1f bytes in %0.2f blocks" % (size, blocks))
+        print(
+            "%s event: dict %s, slotted %s" % 
+            (name, footprints[0], footprints[1])
+        )
+    print(
+        "Allocated by the backtest's events: dict %0.1f KiB, "
+        "slotted %0.1f KiB" % (totals[0] / 1024.0, totals[1] / 1024.0)
+    )
+
+
+def benchmark_event_allocation(
+    csv_dir, symbol_list, start_date, data_handler,
+    portfolio, strategy, initial_capital=100000.0, repeats=3
+):
+    """
+    Runs the backtest with dict-backed events and with slotted
+    events, printing the best run time of each and the peak
+    memory allocated by a further, traced, run, followed by the
+    memory allocated per event and in total by the events of
+    the backtest.
+
+    The events are a small part of the work of each bar and
+    are freed once dispatched, so the run times and peaks of
+    the whole backtest differ far less than the memory the
+    events allocate over the run.
+
+    Parameters:
+    csv_dir - The hard root to the CSV data directory.
+    symbol_list - The list of symbol strings.
+    start_date - The start datetime of the strategy.
+    data_handler - (Class) Handles the market data feed.
+    portfolio - (Class) Keeps track of portfolio positions.
+    strategy - (Class) Generates signals based on market data.
+    initial_capital - The starting capital for the portfolio.
+    repeats - The number of timed runs of each.
+    """
+    results = []
+    for name, dict_events in (
+        ("Dict events", True), ("Slotted events", False)
+    ):
+        args = (
+            csv_dir, symbol_list, start_date, data_handler,
+            portfolio, strategy, initial_capital, dict_events
+        )
+        run_time = min(run_backtest(*args)[1] for i in range(repeats))
+        backtest, _, peak = run_backtest(*args, trace_memory=True)
+        results.append((name, run_time, peak))
+        print(
+            "%s: Signals: %s, Orders: %s, Fills: %s, Total: %0.2f" % (
+                name, backtest.signals, backtest.orders, backtest.fills,
+                backtest.portfolio.current_holdings['total']
+            )
+        )
+        if peak is None:
+            print("%s: %0.4fs" % (name, run_time))
+        else:
+            print(
+                "%s: %0.4fs, peak %0.1f KiB" %
+                (name, run_time, peak / 1024.0)
+            )
+    print("Speed-up: %0.2fx" % (results[0][1] / results[1][1]))
+    if tracemalloc is not None:
+        print("Memory reduction: %0.2fx" % (results[0][2] / float(results[1][2])))
+
+    market = (
+        backtest.events_dispatched - backtest.signals -
+        backtest.orders - backtest.fills
+    )
+    benchmark_event_footprint(
+        (market, backtest.signals, backtest.orders, backtest.fills)
+    )
+    return results
+
+
+if __name__ == "__main__":
+    csv_dir = '/path/to/your/iqfeed/csv/file'  # CHANGE THIS!
+
+    print("intraday_mr.py: IntradayOLSMRStrategy")
+    benchmark_event_allocation(
+        csv_dir, ['AREX', 'WLL'], datetime.datetime(2007, 11, 8, 10, 41, 0),
+        HistoricCSVDataHandlerHFT, PortfolioHFT, IntradayOLSMRStrategy
+    )
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# event_bus.py
+
+from __future__ import print_function
+
+from abc import ABCMeta, abstractmethod
+from collections import deque
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from event import EVENT_KINDS
+
+
+class EventBus(object):
+    """
+    EventBus is an abstract base class providing an interface for
+    the events "queue" shared by the DataHandler, Strategy, 
+    Portfolio and ExecutionHandler objects.
+
+    Components place events onto the bus with put(), exactly as
+    they would with a queue.Queue. The Backtest registers one 
+    handler per integer event kind and then calls dispatch() to
+    process every pending event, including any events placed 
+    onto the bus by the handlers themselves.
+    """
+
+    __metaclass__ = ABCMeta
+
+    def __init__(self):
+        """
+        Initialises an empty handler table, indexed by event kind.
+        """
+        self.handlers = [None] * len(EVENT_KINDS)
+
+    def register(self, kind, handler):
+        """
+        Registers the handler to be called for events of a kind.
+
+        Parameters:
+        kind - The integer event kind, e.g. event.MARKET.
+        handler - A callable taking the event as its only argument.
+        """
+        self.handlers[kind] = handler
+
+    def __getstate__(self):
+        """
+        Excludes the handlers from pickled checkpoints, as they
+        are registered again when the backtest is resumed.
+        """
+        state = self.__dict__.copy()
+        state['handlers'] = [None] * len(EVENT_KINDS)
+        return state
+
+    @abstractmethod
+    def put(self, event):
+        """
+        Places an event onto the bus.
+        """
+        raise NotImplementedError("Should implement put()")
+
+    @abstractmethod
+    def dispatch(self):
+        """
+        Dispatches events to their handlers until the bus is 
+        empty, returning the number of events dispatched.
+        """
+        raise NotImplementedError("Should implement dispatch()")
+
+
+class DequeEventBus(EventBus):
+    """
+    DequeEventBus is a lock-free event bus for single-threaded
+    backtests, backed by a plain collections.deque. Events are
+    dispatched through the handler table without any exception
+    handling or string comparisons on the hot path.
+    """
+
+    def __init__(self):
+        """
+        Initialises the bus with an empty deque.
+        """
+        super(DequeEventBus, self).__init__()
+        self.events = deque()
+
+        # Bind the deque method directly to skip a Python-level
+        # call for every event placed onto the bus
+        self.put = self.events.append
+
+    def __getstate__(self):
+        """
+        Excludes the bound put method from pickled checkpoints.
+        """
+        state = super(DequeEventBus, self).__getstate__()
+        del state['put']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Rebinds the put method to the restored deque.
+        """
+        self.__dict__.update(state)
+        self.put = self.events.append
+
+    def put(self, event):
+        """
+        Places an event onto the bus.
+        """
+        self.events.append(event)
+
+    def dispatch(self):
+        """
+        Dispatches events to their handlers until the bus is 
+        empty, returning the number of events dispatched.
+        """
+        events = self.events
+        popleft = events.popleft
+        handlers = self.handlers
+        dispatched = 0
+        while events:
+            event = popleft()
+            if event is not None:
+                handlers[event.kind](event)
+                dispatched += 1
+        return dispatched
+
+
+class QueueEventBus(EventBus):
+    """
+    QueueEventBus is a thread-safe event bus backed by a 
+    queue.Queue, for live trading where events may be placed
+    onto the bus from other threads, e.g. brokerage callbacks.
+    """
+
+    def __init__(self):
+        """
+        Initialises the bus with an empty queue.Queue.
+        """
+        super(QueueEventBus, self).__init__()
+        self.events = queue.Queue()
+
+    def put(self, event):
+        """
+        Places an event onto the bus.
+        """
+        self.events.put(event)
+
+    def dispatch(self):
+        """
+        Dispatches events to their handlers until the queue is 
+        empty, returning the number of events dispatched.
+        """
+        dispatched = 0
+        while True:
+            try:
+                event = self.events.get(False)
+            except queue.Empty:
+                break
+            else:
+                if event is not None:
+                    self.handlers[event.kind](event)
+                    dispatched += 1
+        return dispatched
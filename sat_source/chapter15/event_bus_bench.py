@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# event_bus_bench.py
+
+from __future__ import print_function
+
+import datetime
+
+from backtest import Backtest
+from data import HistoricCSVDataHandler
+from event_bus import DequeEventBus, QueueEventBus
+from execution import SimulatedExecutionHandler
+from hft_data import HistoricCSVDataHandlerHFT
+from hft_portfolio import PortfolioHFT
+from intraday_mr import IntradayOLSMRStrategy
+from mac import MovingAverageCrossStrategy
+from portfolio import Portfolio
+
+
+def benchmark_event_bus(
+    csv_dir, symbol_list, start_date, data_handler, 
+    portfolio, strategy, initial_capital=100000.0
+):
+    """
+    Runs the same backtest with the thread-safe QueueEventBus
+    and the lock-free DequeEventBus, returning the events per
+    second achieved by each.
+
+    Parameters:
+    csv_dir - The hard root to the CSV data directory.
+    symbol_list - The list of symbol strings.
+    start_date - The start datetime of the strategy.
+    data_handler - (Class) Handles the market data feed.
+    portfolio - (Class) Keeps track of portfolio positions.
+    strategy - (Class) Generates signals based on market data.
+    initial_capital - The starting capital for the portfolio.
+    """
+    results = []
+    for event_bus in (QueueEventBus, DequeEventBus):
+        backtest = Backtest(
+            csv_dir, symbol_list, initial_capital, 0.0, 
+            start_date, data_handler, SimulatedExecutionHandler,
+            portfolio, strategy, event_bus=event_bus
+        )
+        backtest._run_backtest()
+        results.append(
+            (event_bus.__name__, backtest.events_dispatched, 
+             backtest.run_time, backtest.events_per_second())
+        )
+
+    for name, events, run_time, eps in results:
+        print(
+            "%s: %s events in %0.3fs, %0.0f events/sec" % 
+            (name, events, run_time, eps)
+        )
+    print("Speed-up: %0.2fx" % (results[1][3] / results[0][3]))
+    return results
+
+
+if __name__ == "__main__":
+    daily_csv_dir = '/path/to/your/daily/csv/file'  # CHANGE THIS!
+    hft_csv_dir = '/path/to/your/iqfeed/csv/file'  # CHANGE THIS!
+
+    print("mac.py: MovingAverageCrossStrategy")
+    benchmark_event_bus(
+        daily_csv_dir, ['AAPL'], datetime.datetime(1990, 1, 1, 0, 0, 0),
+        HistoricCSVDataHandler, Portfolio, MovingAverageCrossStrategy
+    )
+
+    print("intraday_mr.py: IntradayOLSMRStrategy")
+    benchmark_event_bus(
+        hft_csv_dir, ['AREX', 'WLL'], datetime.datetime(2007, 11, 8, 10, 41, 0),
+        HistoricCSVDataHandlerHFT, PortfolioHFT, IntradayOLSMRStrategy
+    )
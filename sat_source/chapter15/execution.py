@@ -12,7 +12,9 @@ try:
 except ImportError:
     import queue
 
-from event import FillEvent, OrderEvent
+import pandas as pd
+
+from event import ORDER, FillEvent, OrderEvent
 
 
 class ExecutionHandler(object):
@@ -53,15 +55,27 @@ class SimulatedExecutionHandler(ExecutionHandler):
     handler.
     """
     
-    def __init__(self, events):
+    def __init__(self, events, bars=None):
         """
         Initialises the handler, setting the event queues
         up internally.
 
         Parameters:
         events - The Queue of Event objects.
+        bars - The optional DataHandler, whose data clock is 
+            used to timestamp the fills rather than wall time.
         """
         self.events = events
+        self.bars = bars
+
+    def _get_fill_datetime(self):
+        """
+        Returns the current datetime of the data clock, or
+        the wall clock if there is no DataHandler.
+        """
+        if self.bars is None:
+            return datetime.datetime.utcnow()
+        return self.bars.get_current_datetime()
 
     def execute_order(self, event):
         """
@@ -71,9 +85,102 @@ class SimulatedExecutionHandler(ExecutionHandler):
         Parameters:
         event - Contains an Event object with order information.
         """
-        if event.type == 'ORDER':
+        if event.kind == ORDER:
             fill_event = FillEvent(
-                datetime.datetime.utcnow(), event.symbol,
+                self._get_fill_datetime(), event.symbol,
                 'ARCA', event.quantity, event.direction, None
             )
             self.events.put(fill_event)
+
+
+class LatencyExecutionHandler(SimulatedExecutionHandler):
+    """
+    The latency execution handler models orders that take time
+    to reach the market and that may only be partially filled.
+
+    Each order is scheduled with the EventScheduler to arrive
+    'latency' after the data clock time it was placed at, and so
+    fills on the first bar at or after that time (never on the
+    bar that generated it). If a participation rate is given, 
+    at most that fraction of each bar's volume is filled and the
+    remainder is worked on the following bars, with a FillEvent
+    for each partial fill.
+
+    The fills are timestamped with the data clock and priced by
+    the portfolio at the bar they are released on.
+    """
+
+    volume_field = 'volume'
+
+    def __init__(
+        self, events, bars=None, scheduler=None, 
+        latency=datetime.timedelta(0), participation=None
+    ):
+        """
+        Initialises the handler.
+
+        Parameters:
+        events - The Queue of Event objects.
+        bars - The DataHandler providing the data clock and volumes.
+        scheduler - The EventScheduler released by the Backtest.
+        latency - The datetime.timedelta before an order arrives.
+        participation - The optional maximum fraction of each
+            bar's volume that may be filled, e.g. 0.1.
+        """
+        super(LatencyExecutionHandler, self).__init__(events, bars=bars)
+        if bars is None or scheduler is None:
+            raise ValueError(
+                "LatencyExecutionHandler requires a DataHandler and an "
+                "EventScheduler."
+            )
+        self.scheduler = scheduler
+        self.latency = latency
+        self.participation = participation
+
+    def _get_fill_quantity(self, symbol, now, remaining):
+        """
+        Returns the quantity of an order that can be filled on
+        the current bar, limited by the participation rate. A 
+        symbol that has no bar at the current time is not traded,
+        including when the data handler has padded its last bar
+        forward to the current time.
+        """
+        if self.participation is None:
+            return remaining
+        if self.bars.get_latest_bar_datetime(symbol) != now or \
+            self.bars.is_latest_bar_padded(symbol):
+            return 0
+        volume = self.bars.get_latest_bar_value(symbol, self.volume_field)
+        return min(remaining, int(self.participation * volume))
+
+    def _work_order(self, now, order, remaining):
+        """
+        Fills as much of the remaining order quantity as possible
+        at the current bar and reschedules any remainder for the
+        next bar.
+        """
+        quantity = self._get_fill_quantity(order.symbol, now, remaining)
+        if quantity > 0:
+            self.events.put(FillEvent(
+                now, order.symbol, 'ARCA', quantity, order.direction, None
+            ))
+        if remaining > quantity:
+            # Due one nanosecond later, i.e. on the next release
+            self.scheduler.schedule(
+                pd.Timestamp(now) + pd.Timedelta(1), self._work_order, 
+                order, remaining - quantity
+            )
+
+    def execute_order(self, event):
+        """
+        Schedules the order to be worked once the latency has 
+        elapsed on the data clock.
+
+        Parameters:
+        event - Contains an Event object with order information.
+        """
+        if event.kind == ORDER:
+            self.scheduler.schedule(
+                self._get_fill_datetime() + self.latency, 
+                self._work_order, event, event.quantity
+            )
@@ -6,13 +6,13 @@
 from __future__ import print_function
 
 import datetime
-import time
+import threading
 
 from ib.ext.Contract import Contract
 from ib.ext.Order import Order
 from ib.opt import ibConnection, message
 
-from event import FillEvent, OrderEvent
+from event import ORDER, FillEvent, OrderEvent
 from execution import ExecutionHandler
 
 
@@ -21,8 +21,18 @@ class IBExecutionHandler(ExecutionHandler):
     Handles order execution via the Interactive Brokers
     API, for use against accounts when trading live
     directly.
+
+    Orders are submitted back-to-back without waiting for
+    TWS. The acknowledgements (openOrder) and fills 
+    (orderStatus) are tracked asynchronously by the reply
+    handler, which runs on the connection's reader thread,
+    so the events queue must be thread-safe (a Queue or the
+    AsyncioEventBus of a LiveTradingSession).
     """
 
+    # Printing every server reply limits the order throughput
+    print_replies = True
+
     def __init__(
         self, events, order_routing="SMART", currency="USD"
     ):
@@ -31,12 +41,17 @@ class IBExecutionHandler(ExecutionHandler):
 
         Parameters:
         events - The Queue of Event objects.
+        order_routing - The exchange to route the orders to.
+        currency - The currency of the orders.
         """
         self.events = events
         self.order_routing = order_routing
         self.currency = currency
         self.fill_dict = {}
 
+        # Guards fill_dict, which is shared with the reader thread
+        self.fill_lock = threading.Condition()
+
         self.tws_conn = self.create_tws_connection()
         self.order_id = self.create_initial_order_id()
         self.register_handlers()
@@ -48,17 +63,21 @@ class IBExecutionHandler(ExecutionHandler):
 
     def _reply_handler(self, msg):
         """Handles of server replies"""
-        # Handle open order orderId processing
-        if msg.typeName == "openOrder" and \
-            msg.orderId == self.order_id and \
-            not self.fill_dict.has_key(msg.orderId):
-            self.create_fill_dict_entry(msg)
-        # Handle Fills
-        if msg.typeName == "orderStatus" and \
-            msg.status == "Filled" and \
-            self.fill_dict[msg.orderId]["filled"] == False:
-            self.create_fill(msg)
-        print("Server Response: %s, %s\n" % (msg.typeName, msg))
+        with self.fill_lock:
+            # Only the orders sent by execute_order are tracked,
+            # so replies about other clients' orders are ignored
+            fd = self.fill_dict.get(getattr(msg, "orderId", None))
+            if fd is not None:
+                # Handle open order acknowledgements
+                if msg.typeName == "openOrder":
+                    fd["acknowledged"] = True
+                # Handle Fills
+                if msg.typeName == "orderStatus" and \
+                    msg.status == "Filled" and \
+                    fd["filled"] == False:
+                    self.create_fill(msg)
+        if self.print_replies:
+            print("Server Response: %s, %s\n" % (msg.typeName, msg))
 
     def create_tws_connection(self):
         """
@@ -134,6 +153,7 @@ class IBExecutionHandler(ExecutionHandler):
             "symbol": msg.contract.m_symbol,
             "exchange": msg.contract.m_exchange,
             "direction": msg.order.m_action,
+            "acknowledged": False,
             "filled": False
         }
 
@@ -161,23 +181,47 @@ class IBExecutionHandler(ExecutionHandler):
         # Make sure that multiple messages don't create
         # additional fills.
         self.fill_dict[msg.orderId]["filled"] = True
+        self.fill_lock.notify_all()
 
         # Place the fill event onto the event queue
-        self.events.put(fill_event)
+        self.events.put(fill)
+
+    def outstanding_orders(self):
+        """
+        Returns the number of orders submitted this session
+        that have not yet been filled.
+        """
+        with self.fill_lock:
+            return sum(
+                1 for fd in self.fill_dict.values() if not fd["filled"]
+            )
+
+    def wait_for_fills(self, timeout=None):
+        """
+        Blocks until every order submitted has been filled, or 
+        the timeout (in seconds) has elapsed. Returns True if 
+        there are no outstanding orders.
+        """
+        with self.fill_lock:
+            return self.fill_lock.wait_for(
+                lambda: all(fd["filled"] for fd in self.fill_dict.values()),
+                timeout
+            )
 
     def execute_order(self, event):
         """
         Creates the necessary InteractiveBrokers order object
         and submits it to IB via their API.
 
-        The results are then queried in order to generate a
-        corresponding Fill object, which is placed back on
-        the event queue.
+        The order is recorded in the Fill Dictionary before it
+        is sent and the method returns at once. Its Fill object
+        is placed onto the event queue by the reply handler 
+        when TWS reports it as filled.
 
         Parameters:
         event - Contains an Event object with order information.
         """
-        if event.type == 'ORDER':
+        if event.kind == ORDER:
             # Prepare the parameters for the asset order
             asset = event.symbol
             asset_type = "STK"
@@ -198,14 +242,21 @@ class IBExecutionHandler(ExecutionHandler):
                 order_type, quantity, direction
             )
 
+            # Track the order before sending it, as the replies
+            # may arrive before placeOrder returns
+            with self.fill_lock:
+                self.fill_dict[self.order_id] = {
+                    "symbol": asset,
+                    "exchange": self.order_routing,
+                    "direction": direction,
+                    "acknowledged": False,
+                    "filled": False
+                }
+
             # Use the connection to the send the order to IB
             self.tws_conn.placeOrder(
                 self.order_id, ib_contract, ib_order
             )
 
-            # NOTE: This following line is crucial.
-            # It ensures the order goes through!
-            time.sleep(1)
-
             # Increment the order ID for this session
             self.order_id += 1
@@ -0,0 +1,248 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# ib_execution_bench.py
+
+from __future__ import print_function
+
+import socket
+import threading
+import time
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+try:
+    import SocketServer as socketserver
+except ImportError:
+    import socketserver
+
+from ib.ext.Contract import Contract
+from ib.ext.Order import Order
+
+from event import FILL, OrderEvent
+from ib_execution import IBExecutionHandler
+
+
+class TWSStandInHandler(socketserver.StreamRequestHandler):
+    """
+    Replies to each order line sent by a TWSStandInConnection
+    with an openOrder acknowledgement and the Submitted and 
+    Filled order statuses, repeating the latter as TWS does.
+    """
+
+    def handle(self):
+        """Replies to the orders on the connection."""
+        for line in self.rfile:
+            fields = line.decode("ascii").rstrip("\n").split("|")
+            if fields[0] != "placeOrder":
+                continue
+            order_id, symbol, sec_type, exchange, currency, \
+                action, quantity, order_type = fields[1:]
+            replies = [
+                ("openOrder", order_id, symbol, exchange, action, 
+                    quantity, order_type),
+                ("orderStatus", order_id, "Submitted", "0", "0.0"),
+                ("orderStatus", order_id, "Filled", quantity, 
+                    str(self.server.fill_price)),
+                ("orderStatus", order_id, "Filled", quantity, 
+                    str(self.server.fill_price))
+            ]
+            self.wfile.write("".join(
+                "|".join(r) + "\n" for r in replies
+            ).encode("ascii"))
+            self.wfile.flush()
+
+
+class TWSStandInServer(socketserver.ThreadingTCPServer):
+    """
+    A local socket server standing in for Trader Workstation,
+    which fills every order immediately at a fixed price. It 
+    is used to measure the order throughput of the execution
+    handler without a brokerage account.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, fill_price=100.0):
+        """
+        Parameters:
+        host - The interface to listen on.
+        port - The port to listen on, or 0 for any free port.
+        fill_price - The average fill price reported for orders.
+        """
+        socketserver.ThreadingTCPServer.__init__(
+            self, (host, port), TWSStandInHandler
+        )
+        self.fill_price = fill_price
+
+    def start(self):
+        """
+        Serves on a background thread, returning the address.
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.server_address
+
+
+class StandInMessage(object):
+    """
+    A server reply with the attributes of the corresponding
+    IbPy message.
+    """
+
+    def __init__(self, typeName, **fields):
+        self.typeName = typeName
+        self.__dict__.update(fields)
+
+    def __str__(self):
+        return "<%s %s>" % (self.typeName, self.__dict__)
+
+
+class TWSStandInConnection(object):
+    """
+    Provides the subset of the ibConnection interface used by
+    IBExecutionHandler, talking to a TWSStandInServer. As with
+    ibConnection, the replies are read and passed to the 
+    registered handlers on a separate reader thread.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.handlers = []
+
+    def connect(self):
+        """Connects and starts the reader thread."""
+        self.sock = socket.create_connection((self.host, self.port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = threading.Thread(target=self._read_replies)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def disconnect(self):
+        """Closes the connection."""
+        self.sock.close()
+
+    def register(self, handler, *type_names):
+        """Registers a handler for the given message types."""
+        self.handlers.append((handler, set(type_names)))
+
+    def registerAll(self, handler):
+        """Registers a handler for all messages."""
+        self.handlers.append((handler, None))
+
+    def placeOrder(self, order_id, contract, order):
+        """Sends an order to the server without waiting."""
+        self.sock.sendall(("|".join([
+            "placeOrder", str(order_id), contract.m_symbol, 
+            contract.m_secType, contract.m_exchange, 
+            contract.m_currency, order.m_action, 
+            str(order.m_totalQuantity), order.m_orderType
+        ]) + "\n").encode("ascii"))
+
+    def _parse_reply(self, fields):
+        """
+        Creates the message object for a line of reply fields.
+        """
+        if fields[0] == "openOrder":
+            contract = Contract()
+            contract.m_symbol = fields[2]
+            contract.m_exchange = fields[3]
+            order = Order()
+            order.m_action = fields[4]
+            order.m_totalQuantity = int(fields[5])
+            order.m_orderType = fields[6]
+            return StandInMessage(
+                "openOrder", orderId=int(fields[1]), 
+                contract=contract, order=order
+            )
+        return StandInMessage(
+            "orderStatus", orderId=int(fields[1]), status=fields[2],
+            filled=int(fields[3]), avgFillPrice=float(fields[4])
+        )
+
+    def _read_replies(self):
+        """Passes each reply to the registered handlers."""
+        for line in self.sock.makefile("rb"):
+            msg = self._parse_reply(line.decode("ascii").rstrip("\n").split("|"))
+            for handler, type_names in self.handlers:
+                if type_names is None or msg.typeName in type_names:
+                    handler(msg)
+
+
+class StandInIBExecutionHandler(IBExecutionHandler):
+    """
+    IBExecutionHandler connected to a TWSStandInServer rather
+    than to Trader Workstation.
+    """
+
+    print_replies = False
+
+    def __init__(self, events, address, **kwargs):
+        """
+        Parameters:
+        events - The Queue of Event objects.
+        address - The (host, port) of the TWSStandInServer.
+        """
+        self.address = address
+        super(StandInIBExecutionHandler, self).__init__(events, **kwargs)
+
+    def create_tws_connection(self):
+        """Connects to the TWSStandInServer."""
+        tws_conn = TWSStandInConnection(*self.address)
+        tws_conn.connect()
+        return tws_conn
+
+
+def benchmark_order_throughput(num_orders=1000, symbol_list=('AREX', 'WLL')):
+    """
+    Submits num_orders market orders through an IBExecutionHandler
+    connected to a local TWS stand-in and prints the orders per 
+    second submitted and filled, against the one order per second
+    of the previous fixed sleep after each order.
+
+    Parameters:
+    num_orders - The number of orders to submit.
+    symbol_list - The symbols to alternate the orders between.
+    """
+    server = TWSStandInServer()
+    events = queue.Queue()
+    handler = StandInIBExecutionHandler(events, server.start())
+
+    orders = [
+        OrderEvent(
+            symbol_list[i % len(symbol_list)], 'MKT', 100, 
+            'BUY' if i % 2 == 0 else 'SELL'
+        ) for i in range(num_orders)
+    ]
+
+    start = time.time()
+    for order in orders:
+        handler.execute_order(order)
+    submit_time = time.time() - start
+    if not handler.wait_for_fills(timeout=60.0):
+        raise RuntimeError(
+            "%s orders were not filled" % handler.outstanding_orders()
+        )
+    fill_time = time.time() - start
+
+    fills = 0
+    while not events.empty():
+        if events.get().kind == FILL:
+            fills += 1
+    handler.tws_conn.disconnect()
+    server.shutdown()
+    server.server_close()
+
+    print("Orders: %s, Fills: %s" % (num_orders, fills))
+    print("Submitted: %0.1f orders/sec" % (num_orders / submit_time))
+    print("Filled: %0.1f orders/sec" % (num_orders / fill_time))
+    print("Fixed sleep: %0.1f orders/sec" % 1.0)
+    return num_orders / submit_time, num_orders / fill_time
+
+
+if __name__ == "__main__":
+    benchmark_order_throughput()
@@ -0,0 +1,527 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# indicators.py
+
+from __future__ import print_function
+
+from collections import deque
+
+import numpy as np
+
+
+class RollingOLS(object):
+    """
+    RollingOLS maintains an ordinary least squares regression of
+    y on x (without an intercept, as with statsmodels sm.OLS(y, x))
+    over a rolling window of the most recent observations.
+
+    Rather than refitting the whole window on every bar it keeps 
+    the windowed sufficient statistics (sums of x, y, x^2, y^2 
+    and xy), adding the newest observation and evicting the oldest.
+    The hedge ratio and the z-score of the latest residual (the 
+    "spread") are then available in constant time per bar.
+
+    To stop floating point error accumulating from the repeated 
+    add/evict updates, the sums are recalculated exactly from the
+    window once every window length of updates, which keeps the
+    amortised cost constant.
+    """
+
+    def __init__(self, window):
+        """
+        Initialises the rolling regression.
+
+        Parameters:
+        window - The number of observations in the regression.
+        """
+        self.window = window
+        self.x = np.zeros(window)
+        self.y = np.zeros(window)
+        self.pos = 0
+        self.count = 0
+        self.missing = 0
+        self.updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        """
+        Sets the windowed sums to zero.
+        """
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_yy = 0.0
+        self.sum_xy = 0.0
+
+    def _add(self, x, y, sign):
+        """
+        Adds (sign=1) or evicts (sign=-1) an observation from 
+        the windowed sums. Missing observations are only counted.
+        """
+        if x != x or y != y:
+            self.missing += sign
+        else:
+            self.sum_x += sign * x
+            self.sum_y += sign * y
+            self.sum_xx += sign * x * x
+            self.sum_yy += sign * y * y
+            self.sum_xy += sign * x * y
+
+    def _resync(self):
+        """
+        Recalculates the windowed sums exactly from the window.
+        """
+        valid = ~(np.isnan(self.x) | np.isnan(self.y))
+        x = self.x[valid]
+        y = self.y[valid]
+        self.sum_x = x.sum()
+        self.sum_y = y.sum()
+        self.sum_xx = x.dot(x)
+        self.sum_yy = y.dot(y)
+        self.sum_xy = x.dot(y)
+        self.missing = len(valid) - valid.sum()
+
+    def update(self, x, y):
+        """
+        Adds the latest observation to the window, evicting 
+        the oldest if the window is full.
+
+        Parameters:
+        x - The latest value of the independent variable.
+        y - The latest value of the dependent variable.
+        """
+        x = float(x)
+        y = float(y)
+        if self.count == self.window:
+            self._add(self.x[self.pos], self.y[self.pos], -1)
+        else:
+            self.count += 1
+        self._add(x, y, 1)
+        self.x[self.pos] = x
+        self.y[self.pos] = y
+        self.pos = (self.pos + 1) % self.window
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resync()
+
+    def is_ready(self):
+        """
+        Returns True once the window is full.
+        """
+        return self.count == self.window
+
+    @property
+    def hedge_ratio(self):
+        """
+        The OLS slope coefficient of y on x over the window.
+        """
+        if self.missing > 0 or self.sum_xx == 0.0:
+            return np.nan
+        return self.sum_xy / self.sum_xx
+
+    def zscore(self):
+        """
+        Returns the z-score of the latest spread y - beta*x 
+        relative to the mean and (population) standard deviation
+        of the spread over the window.
+        """
+        n = self.count
+        beta = self.hedge_ratio
+        last = self.pos - 1
+        spread_last = self.y[last] - beta * self.x[last]
+        mean = (self.sum_y - beta * self.sum_x) / n
+        sum_sq = self.sum_yy - 2.0 * beta * self.sum_xy + \
+            beta * beta * self.sum_xx
+        var = sum_sq / n - mean * mean
+        # The z-score is undefined for a flat spread
+        if not var > 0.0:
+            return np.nan
+        return (spread_last - mean) / np.sqrt(var)
+
+
+class EMA(object):
+    """
+    Exponential moving average, vectorised across a number of
+    series. The smoothing factor is 2/(span+1) and the average is
+    seeded with the first value, as with pandas ewm(span=span, 
+    adjust=False). Missing values leave the average unchanged.
+    """
+
+    def __init__(self, span, n_series=1):
+        """
+        Initialises the unseeded average.
+
+        Parameters:
+        span - The span (in bars) of the average.
+        n_series - The number of series updated together.
+        """
+        self.span = span
+        self.n_series = n_series
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = np.full(n_series, np.nan)
+
+    def update(self, values):
+        """
+        Updates the average with the latest value of every 
+        series and returns it.
+
+        Parameters:
+        values - The latest values, one per series.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.n_series)
+        ema = self.alpha * values + (1.0 - self.alpha) * self.value
+        ema = np.where(np.isnan(self.value), values, ema)
+        self.value = np.where(np.isnan(values), self.value, ema)
+        return self.value
+
+    def warm_up(self, history):
+        """
+        Initialises the average from a (bars x series) array
+        of historical values, oldest first.
+        """
+        history = np.asarray(history, dtype=np.float64)
+        for values in history.reshape(len(history), -1):
+            self.update(values)
+        return self.value
+
+
+class RollingIndicator(object):
+    """
+    RollingIndicator is a base class for streaming indicators 
+    calculated over a rolling window of the most recent bars.
+
+    Each indicator is vectorised across a number of series (e.g.
+    one per symbol): update() takes an array with the latest value
+    of every series and costs O(1) per series, rather than 
+    re-scanning the lookback window. The window itself is kept in
+    a fixed-size (window x series) ring buffer, so that evicted 
+    values can be removed from the running state.
+
+    As with np.mean, a series is NaN while its window contains a
+    missing value. Until the window is full the indicator is 
+    calculated over the bars available so far.
+    """
+
+    def __init__(self, window, n_series=1):
+        """
+        Initialises the empty window.
+
+        Parameters:
+        window - The number of bars in the rolling window.
+        n_series - The number of series updated together.
+        """
+        self.window = window
+        self.n_series = n_series
+        self.buffer = np.zeros((window, n_series))
+        self.pos = 0
+        self.count = 0
+        self.updates = 0
+        self.missing = np.zeros(n_series, dtype=np.int64)
+
+    def _add(self, values, valid):
+        """
+        Adds the (valid) values to the running state.
+        """
+        pass
+
+    def _evict(self, values, valid):
+        """
+        Removes the (valid) values from the running state.
+        """
+        pass
+
+    def _resync(self):
+        """
+        Recalculates the running state exactly from the window.
+        """
+        pass
+
+    def update(self, values):
+        """
+        Adds the latest value of every series to the window,
+        evicting the oldest if the window is full, and returns
+        the updated indicator value.
+
+        Parameters:
+        values - The latest values, one per series.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(self.n_series)
+        if self.count == self.window:
+            old = self.buffer[self.pos]
+            old_valid = ~np.isnan(old)
+            self.missing -= ~old_valid
+            self._evict(old, old_valid)
+        else:
+            self.count += 1
+
+        valid = ~np.isnan(values)
+        self.missing += ~valid
+        self._add(values, valid)
+        self.buffer[self.pos] = values
+        self.pos = (self.pos + 1) % self.window
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._resync()
+        return self.value
+
+    def warm_up(self, history):
+        """
+        Initialises the indicator from a (bars x series) array
+        of historical values, oldest first. Only the bars which
+        fall within the window are needed.
+
+        Parameters:
+        history - The historical values, one column per series.
+        """
+        history = np.asarray(history, dtype=np.float64)
+        for values in history.reshape(len(history), -1)[-self.window:]:
+            self.update(values)
+        return self.value
+
+    def window_values(self):
+        """
+        Returns the (count x series) values in the window, 
+        oldest first.
+        """
+        if self.count < self.window:
+            return self.buffer[:self.count]
+        return np.roll(self.buffer, -self.pos, axis=0)
+
+    def is_ready(self):
+        """
+        Returns True once the window is full.
+        """
+        return self.count == self.window
+
+    @property
+    def value(self):
+        """
+        The current value of the indicator for each series.
+        """
+        raise NotImplementedError("Should implement value")
+
+
+class SMA(RollingIndicator):
+    """
+    Simple moving average, maintained as a running windowed sum.
+
+    The exact recalculation sums the window oldest first, which
+    is the order the running sum was built in. Two averages of
+    the same bars (e.g. a short and long window before either 
+    has filled) are therefore identical, as with np.mean.
+    """
+
+    def __init__(self, window, n_series=1):
+        super(SMA, self).__init__(window, n_series)
+        self.sum = np.zeros(n_series)
+
+    def _add(self, values, valid):
+        self.sum += np.where(valid, values, 0.0)
+
+    def _evict(self, values, valid):
+        self.sum -= np.where(valid, values, 0.0)
+
+    def _resync(self):
+        values = self.window_values()
+        self.sum = np.cumsum(
+            np.where(np.isnan(values), 0.0, values), axis=0
+        )[-1]
+
+    @property
+    def value(self):
+        if self.count == 0:
+            return np.full(self.n_series, np.nan)
+        return np.where(self.missing > 0, np.nan, self.sum / self.count)
+
+
+class RollingStd(SMA):
+    """
+    Rolling standard deviation, maintained as running windowed
+    sums of the values and their squares. The default of ddof=0
+    is the population standard deviation, as with np.std.
+    """
+
+    def __init__(self, window, n_series=1, ddof=0):
+        super(RollingStd, self).__init__(window, n_series)
+        self.ddof = ddof
+        self.sum_sq = np.zeros(n_series)
+
+    def _add(self, values, valid):
+        super(RollingStd, self)._add(values, valid)
+        self.sum_sq += np.where(valid, values * values, 0.0)
+
+    def _evict(self, values, valid):
+        super(RollingStd, self)._evict(values, valid)
+        self.sum_sq -= np.where(valid, values * values, 0.0)
+
+    def _resync(self):
+        super(RollingStd, self)._resync()
+        values = self.window_values()
+        self.sum_sq = np.cumsum(
+            np.where(np.isnan(values), 0.0, values * values), axis=0
+        )[-1]
+
+    @property
+    def mean(self):
+        """
+        The rolling mean of each series.
+        """
+        return super(RollingStd, self).value
+
+    @property
+    def value(self):
+        if self.count <= self.ddof:
+            return np.full(self.n_series, np.nan)
+        mean = self.mean
+        var = (self.sum_sq - self.count * mean * mean) / (self.count - self.ddof)
+        return np.sqrt(np.maximum(var, 0.0))
+
+
+class RollingZScore(RollingStd):
+    """
+    Rolling z-score of the latest value of each series relative
+    to the mean and standard deviation of its window.
+    """
+
+    @property
+    def value(self):
+        latest = self.buffer[self.pos - 1]
+        std = super(RollingZScore, self).value
+        # The z-score is undefined for a flat window
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zscore = (latest - self.mean) / std
+        return np.where(std > 0.0, zscore, np.nan)
+
+
+class RollingCovariance(RollingIndicator):
+    """
+    Rolling covariance between pairs of series, x[i] and y[i],
+    maintained as running windowed sums of x, y and xy. The 
+    default of ddof=0 matches np.cov(x, y, ddof=0).
+
+    update() and warm_up() take the x and y values separately.
+    """
+
+    def __init__(self, window, n_series=1, ddof=0):
+        super(RollingCovariance, self).__init__(window, 2 * n_series)
+        self.n_pairs = n_series
+        self.ddof = ddof
+        self.sum_x = np.zeros(n_series)
+        self.sum_y = np.zeros(n_series)
+        self.sum_xy = np.zeros(n_series)
+
+    def _sums(self, values, valid):
+        n = self.n_pairs
+        x = np.where(valid[:n] & valid[n:], values[:n], 0.0)
+        y = np.where(valid[:n] & valid[n:], values[n:], 0.0)
+        return x, y, x * y
+
+    def _add(self, values, valid):
+        x, y, xy = self._sums(values, valid)
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += xy
+
+    def _evict(self, values, valid):
+        x, y, xy = self._sums(values, valid)
+        self.sum_x -= x
+        self.sum_y -= y
+        self.sum_xy -= xy
+
+    def _resync(self):
+        values = self.window_values()
+        valid = ~np.isnan(values)
+        x, y, xy = self._sums(values.T, valid.T)
+        self.sum_x = x.sum(axis=1)
+        self.sum_y = y.sum(axis=1)
+        self.sum_xy = xy.sum(axis=1)
+
+    def update(self, x, y):
+        """
+        Adds the latest x and y values of every pair to the
+        window and returns the updated covariances.
+
+        Parameters:
+        x - The latest x values, one per pair.
+        y - The latest y values, one per pair.
+        """
+        values = np.concatenate([
+            np.asarray(x, dtype=np.float64).reshape(self.n_pairs),
+            np.asarray(y, dtype=np.float64).reshape(self.n_pairs)
+        ])
+        return super(RollingCovariance, self).update(values)
+
+    def warm_up(self, x_history, y_history):
+        """
+        Initialises the covariances from (bars x pairs) arrays
+        of historical x and y values, oldest first.
+        """
+        x_history = np.asarray(x_history, dtype=np.float64)
+        y_history = np.asarray(y_history, dtype=np.float64)
+        n = len(x_history)
+        x_history = x_history.reshape(n, -1)[-self.window:]
+        y_history = y_history.reshape(n, -1)[-self.window:]
+        for x, y in zip(x_history, y_history):
+            self.update(x, y)
+        return self.value
+
+    @property
+    def value(self):
+        n = self.n_pairs
+        if self.count <= self.ddof:
+            return np.full(n, np.nan)
+        missing = (self.missing[:n] + self.missing[n:]) > 0
+        cov = (self.sum_xy - self.sum_x * self.sum_y / self.count) / \
+            (self.count - self.ddof)
+        return np.where(missing, np.nan, cov)
+
+
+class RollingMax(RollingIndicator):
+    """
+    Rolling maximum, maintained with one monotonic deque of 
+    window positions per series. Each value is pushed and popped
+    at most once, giving amortised O(1) updates per series.
+    """
+
+    def __init__(self, window, n_series=1):
+        super(RollingMax, self).__init__(window, n_series)
+        self.deques = [deque() for i in range(n_series)]
+        self.current = np.full(n_series, np.nan)
+
+    def _better(self, a, b):
+        """
+        Returns True if value a supersedes value b in the deque.
+        """
+        return a >= b
+
+    def _add(self, values, valid):
+        # The running update count identifies each bar, so bars
+        # older than the window are expired from the deque front
+        t = self.updates
+        oldest = t - self.window
+        for i, dq in enumerate(self.deques):
+            if dq and dq[0][0] <= oldest:
+                dq.popleft()
+            if valid[i]:
+                v = values[i]
+                while dq and self._better(v, dq[-1][1]):
+                    dq.pop()
+                dq.append((t, v))
+            self.current[i] = dq[0][1] if dq else np.nan
+
+    @property
+    def value(self):
+        return np.where(self.missing > 0, np.nan, self.current)
+
+
+class RollingMin(RollingMax):
+    """
+    Rolling minimum, maintained with one monotonic deque of 
+    window positions per series.
+    """
+
+    def _better(self, a, b):
+        return a <= b
@@ -9,10 +9,10 @@ import datetime
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
+from indicators import RollingOLS
 from strategy import Strategy
-from event import SignalEvent
+from event import MARKET, SignalEvent
 from backtest import Backtest
 from hft_data import HistoricCSVDataHandlerHFT
 from hft_portfolio import PortfolioHFT
@@ -29,6 +29,11 @@ class IntradayOLSMRStrategy(Strategy):
     (for the high threshold) or an exit signal pair are generated (for the
     low threshold).
     """
+
+    # The regression is streamed, so only the latest bar is read
+    max_lookback = 1
+
+    state_params = ('ols_window',)
     
     def __init__(
         self, bars, events, ols_window=100, 
@@ -50,6 +55,7 @@ class IntradayOLSMRStrategy(Strategy):
 
         self.pair = ('AREX', 'WLL')
         self.datetime = datetime.datetime.utcnow()
+        self.ols = RollingOLS(self.ols_window)
 
         self.long_market = False
         self.short_market = False
@@ -106,37 +112,34 @@ class IntradayOLSMRStrategy(Strategy):
 
         Calculates the hedge ratio between the pair of tickers. 
         We use OLS for this, althought we should ideall use CADF.
+        The rolling regression is updated with the latest bar 
+        only, rather than refitted over the whole window.
         """
-        # Obtain the latest window of values for each 
+        # Obtain the latest values for each 
         # component of the pair of tickers
-        y = self.bars.get_latest_bars_values(
-            self.pair[0], "close", N=self.ols_window
-        )
-        x = self.bars.get_latest_bars_values(
-            self.pair[1], "close", N=self.ols_window
-        )
-
-        if y is not None and x is not None:
-            # Check that all window periods are available
-            if len(y) >= self.ols_window and len(x) >= self.ols_window:
-                # Calculate the current hedge ratio using  OLS
-                self.hedge_ratio = sm.OLS(y, x).fit().params[0]
-
-                # Calculate the current z-score of the residuals
-                spread = y - self.hedge_ratio * x
-                zscore_last = ((spread - spread.mean())/spread.std())[-1]
-
-                # Calculate signals and add to events queue
-                y_signal, x_signal = self.calculate_xy_signals(zscore_last)
-                if y_signal is not None and x_signal is not None:
-                    self.events.put(y_signal)
-                    self.events.put(x_signal)
+        y = self.bars.get_latest_bar_value(self.pair[0], "close")
+        x = self.bars.get_latest_bar_value(self.pair[1], "close")
+        self.ols.update(x, y)
+
+        # Check that all window periods are available
+        if self.ols.is_ready():
+            # Calculate the current hedge ratio using OLS
+            self.hedge_ratio = self.ols.hedge_ratio
+
+            # Calculate the current z-score of the residuals
+            zscore_last = self.ols.zscore()
+
+            # Calculate signals and add to events queue
+            y_signal, x_signal = self.calculate_xy_signals(zscore_last)
+            if y_signal is not None and x_signal is not None:
+                self.events.put(y_signal)
+                self.events.put(x_signal)
 
     def calculate_signals(self, event):
         """
         Calculate the SignalEvents based on market data.
         """
-        if event.type == 'MARKET':
+        if event.kind == MARKET:
             self.calculate_signals_for_pairs()
 
 
@@ -0,0 +1,399 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# live.py
+
+from __future__ import print_function
+
+import asyncio
+import datetime
+import pprint
+import threading
+
+import numpy as np
+import pandas as pd
+
+from backtest import TradingStack
+from data import HistoricCSVDataHandler, StreamingDataHandler
+from event import MARKET, SIGNAL, ORDER, FILL, MARKET_EVENT, FillEvent
+from event_bus import DequeEventBus
+from execution import SimulatedExecutionHandler
+
+
+class AsyncioEventBus(DequeEventBus):
+    """
+    AsyncioEventBus is the events bus of a LiveTradingSession. 
+    Events placed onto it from the event loop thread are simply
+    appended, while events placed from other threads (such as 
+    brokerage API callbacks) are handed over to the loop with
+    call_soon_threadsafe. Either way the session's dispatcher is
+    woken up, so nothing polls or sleeps waiting for events.
+    """
+
+    def __init__(self):
+        """
+        Initialises the bus, which is bound to an event loop
+        once the session starts.
+        """
+        super(AsyncioEventBus, self).__init__()
+        # Restore the put method, which needs to check the thread
+        del self.put
+        self.loop = None
+        self.loop_thread = None
+        self.wakeup = None
+
+    def bind(self, loop):
+        """
+        Binds the bus to the running event loop.
+        """
+        self.loop = loop
+        self.loop_thread = threading.current_thread()
+        self.wakeup = asyncio.Event()
+        if self.events:
+            self.wakeup.set()
+
+    def _put_in_loop(self, event):
+        """
+        Appends an event and wakes up the dispatcher.
+        """
+        self.events.append(event)
+        self.wakeup.set()
+
+    def put(self, event):
+        """
+        Places an event onto the bus, from any thread.
+        """
+        if self.loop is None:
+            self.events.append(event)
+        elif threading.current_thread() is self.loop_thread:
+            self._put_in_loop(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put_in_loop, event)
+
+
+class LiveDataHandler(StreamingDataHandler):
+    """
+    LiveDataHandler receives bars pushed to it by a data feed,
+    retaining the latest 'lookback' bars of each symbol in the
+    ring buffers of StreamingDataHandler, so strategies see the
+    same interface as in a backtest.
+    """
+
+    def __init__(self, events, symbol_list, fields, lookback=1000):
+        """
+        Parameters:
+        events - The Event Queue.
+        symbol_list - A list of symbol strings.
+        fields - The list of bar field names provided by the feed.
+        lookback - The maximum number of bars retained per symbol.
+        """
+        super(LiveDataHandler, self).__init__(
+            events, symbol_list, fields, lookback=lookback
+        )
+
+    def push_bars(self, dt, bars):
+        """
+        Appends the bars of the symbols that have updated and 
+        places a MarketEvent on the queue.
+
+        Parameters:
+        dt - The datetime of the bars.
+        bars - Dictionary of symbol to a dictionary of the
+            field values, e.g. {'AAPL': {'close': 101.5, ...}}.
+        """
+        ts = pd.Timestamp(dt)
+        for symbol, bar in bars.items():
+            values = [bar.get(f, np.nan) for f in self.fields]
+            self._push_bar(self.symbol_index[symbol], ts.value, values)
+        self.current_datetime = ts
+        self.events.put(MARKET_EVENT)
+
+    def update_bars(self):
+        """
+        Bars are pushed by the feed rather than pulled, so 
+        there is nothing to do here.
+        """
+        pass
+
+
+class FakeDataFeed(object):
+    """
+    FakeDataFeed replays historic bars as though they were
+    arriving from a live feed, for testing live trading sessions
+    end-to-end without a market data subscription. 
+
+    The bars are loaded with a historic data handler (by default
+    HistoricCSVDataHandler) and streamed one timestamp at a time,
+    'interval' seconds apart. An interval of zero still yields to
+    the event loop between bars, so orders and fills interleave 
+    with the market data as they would live.
+    """
+
+    def __init__(
+        self, csv_dir, symbol_list, 
+        data_handler=HistoricCSVDataHandler, interval=0.0
+    ):
+        """
+        Parameters:
+        csv_dir - Absolute directory path to the CSV files.
+        symbol_list - A list of symbol strings.
+        data_handler - (Class) The historic data handler to load with.
+        interval - The seconds between successive bars.
+        """
+        self.symbol_list = symbol_list
+        self.interval = interval
+        self.bars = data_handler(None, csv_dir, symbol_list)
+        self.fields = sorted(self.bars.bar_data.keys())
+
+    async def stream(self):
+        """
+        Asynchronously generates (datetime, bars) tuples, where 
+        bars is a dictionary of symbol to field values.
+        """
+        values = dict(
+            (f, self.bars.get_all_bars_values(f)) for f in self.fields
+        )
+        for i, dt in enumerate(self.bars.bar_datetimes):
+            await asyncio.sleep(self.interval)
+            yield dt, dict(
+                (s, dict((f, values[f][i, j]) for f in self.fields))
+                for j, s in enumerate(self.symbol_list)
+            )
+
+
+class FakeBrokerExecutionHandler(SimulatedExecutionHandler):
+    """
+    FakeBrokerExecutionHandler stands in for a brokerage 
+    connection in a LiveTradingSession. Each order is "sent" 
+    without blocking and filled asynchronously after 'latency'
+    seconds, timestamped with the data clock, just as the fills
+    of a real broker arrive via callbacks. With no latency the 
+    orders are filled immediately, as by SimulatedExecutionHandler.
+    """
+
+    def __init__(self, events, bars=None, latency=0.0):
+        """
+        Parameters:
+        events - The Queue of Event objects.
+        bars - The DataHandler providing the data clock.
+        latency - The seconds between an order and its fill.
+        """
+        super(FakeBrokerExecutionHandler, self).__init__(events, bars=bars)
+        self.latency = latency
+        self.pending = set()
+
+    async def _fill_order(self, order):
+        """
+        Fills an order once the latency has elapsed.
+        """
+        await asyncio.sleep(self.latency)
+        self.events.put(FillEvent(
+            self._get_fill_datetime(), order.symbol, 'ARCA', 
+            order.quantity, order.direction, None
+        ))
+
+    def execute_order(self, event):
+        """
+        Sends the order to the fake broker and returns at once.
+
+        Parameters:
+        event - Contains an Event object with order information.
+        """
+        if event.kind == ORDER and self.latency <= 0:
+            super(FakeBrokerExecutionHandler, self).execute_order(event)
+        elif event.kind == ORDER:
+            task = asyncio.ensure_future(self._fill_order(event))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def join(self):
+        """
+        Waits until every order sent so far has been filled.
+        """
+        while self.pending:
+            await asyncio.gather(*list(self.pending))
+
+
+class LiveTradingSession(object):
+    """
+    Runs a strategy, portfolio and execution handler live on an
+    asyncio event loop. Market data, fills and timers are all 
+    awaited concurrently, so there are no fixed sleeps: a bar is
+    handled as soon as it arrives, while orders are in flight.
+
+    The components are the same Strategy, Portfolio and 
+    ExecutionHandler classes used in backtests. The execution 
+    handler must not block, and may report its fills from 
+    another thread, as the events bus is thread-safe.
+
+    Requires Python 3.7 or later, for asyncio.run.
+    """
+
+    def __init__(
+        self, symbol_list, initial_capital, start_date, feed,
+        execution_handler, portfolio, strategy, strategy_params=None,
+        execution_params=None, lookback=None, timers=None
+    ):
+        """
+        Initialises the live trading session.
+
+        Parameters:
+        symbol_list - The list of symbol strings.
+        initial_capital - The starting capital for the portfolio.
+        start_date - The start datetime of the strategy.
+        feed - The data feed, with a 'fields' list and an async 
+            stream() generator of (datetime, bars) tuples.
+        execution_handler - (Class) Handles the orders/fills for trades.
+        portfolio - (Class) Keeps track of portfolio positions.
+        strategy - (Class) Generates signals based on market data.
+        strategy_params - Optional dictionary of keyword arguments 
+            for the strategy.
+        execution_params - Optional dictionary of keyword arguments
+            for the execution handler.
+        lookback - The bars retained per symbol, by default the 
+            strategy's declared maximum lookback (or 1000).
+        timers - Optional list of (seconds, callback) tuples, with
+            each callback(session) being called every interval.
+        """
+        self.symbol_list = symbol_list
+        self.feed = feed
+        self.timers = timers or []
+
+        self.events = AsyncioEventBus()
+        self.stack = TradingStack(
+            strategy, portfolio, execution_handler, 
+            strategy_params, execution_params
+        )
+        if lookback is None:
+            lookback = strategy.get_max_lookback(
+                **self.stack.strategy_params
+            ) or 1000
+        self.data_handler = LiveDataHandler(
+            self.events, symbol_list, feed.fields, lookback=lookback
+        )
+
+        stack = self.stack
+        stack.events = self.events
+        stack.strategy = strategy(
+            self.data_handler, self.events, **stack.strategy_params
+        )
+        stack.portfolio = portfolio(
+            self.data_handler, self.events, start_date, initial_capital
+        )
+        execution_params = dict(stack.execution_params)
+        if issubclass(execution_handler, SimulatedExecutionHandler):
+            execution_params['bars'] = self.data_handler
+        stack.execution_handler = execution_handler(
+            self.events, **execution_params
+        )
+
+        self.bars_received = 0
+        self.events_dispatched = 0
+        self._register_handlers()
+
+    def _register_handlers(self):
+        """
+        Registers the event handling methods with the events bus.
+        """
+        self.events.register(MARKET, self._handle_market)
+        self.events.register(SIGNAL, self.stack._handle_signal)
+        self.events.register(ORDER, self.stack._handle_order)
+        self.events.register(FILL, self.stack._handle_fill)
+
+    def _handle_market(self, event):
+        """
+        Generates signals and updates the portfolio time index
+        on a new bar.
+        """
+        self.stack.strategy.calculate_signals(event)
+        self.stack.portfolio.update_timeindex(event)
+
+    async def _dispatcher(self):
+        """
+        Dispatches the events on the bus whenever it is woken.
+        """
+        wakeup = self.events.wakeup
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            self.events_dispatched += self.events.dispatch()
+
+    async def _market_data(self):
+        """
+        Pushes each bar from the feed to the data handler and
+        dispatches the events it generates.
+        """
+        async for dt, bars in self.feed.stream():
+            self.data_handler.push_bars(dt, bars)
+            self.bars_received += 1
+            # Handle the bar fully before accepting the next one
+            self.events_dispatched += self.events.dispatch()
+
+    async def _timer(self, interval, callback):
+        """
+        Calls back every interval seconds.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            callback(self)
+
+    async def run(self):
+        """
+        Trades until the feed is exhausted and every order sent
+        has been filled.
+        """
+        self.events.bind(asyncio.get_running_loop())
+        background = [asyncio.ensure_future(self._dispatcher())]
+        background.extend(
+            asyncio.ensure_future(self._timer(interval, callback))
+            for interval, callback in self.timers
+        )
+        try:
+            await self._market_data()
+            join = getattr(self.stack.execution_handler, 'join', None)
+            if join is not None:
+                await join()
+            self.events_dispatched += self.events.dispatch()
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    def trade(self):
+        """
+        Runs the session on a new event loop and outputs the
+        portfolio performance.
+        """
+        asyncio.run(self.run())
+        self._output_performance()
+
+    def _output_performance(self):
+        """
+        Outputs the strategy performance of the session.
+        """
+        portfolio = self.stack.portfolio
+        portfolio.create_equity_curve_dataframe()
+        stats = portfolio.output_summary_stats()
+        print(portfolio.equity_curve.tail(10))
+        pprint.pprint(stats)
+        print("Bars: %s" % self.bars_received)
+        print("Signals: %s" % self.stack.signals)
+        print("Orders: %s" % self.stack.orders)
+        print("Fills: %s" % self.stack.fills)
+
+
+if __name__ == "__main__":
+    from mac import MovingAverageCrossStrategy
+    from portfolio import Portfolio
+
+    csv_dir = '/path/to/your/csv/file'  # CHANGE THIS!
+    symbol_list = ['AAPL']
+
+    # Trade the MAC strategy against a fake feed and broker
+    feed = FakeDataFeed(csv_dir, symbol_list)
+    session = LiveTradingSession(
+        symbol_list, 100000.0, datetime.datetime(1990, 1, 1, 0, 0, 0),
+        feed, FakeBrokerExecutionHandler, Portfolio, 
+        MovingAverageCrossStrategy, execution_params={'latency': 0.001}
+    )
+    session.trade()
@@ -9,23 +9,33 @@ import datetime
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
-from strategy import Strategy
-from event import SignalEvent
+from indicators import SMA
+from strategy import BatchStrategy
 from backtest import Backtest
 from data import HistoricCSVDataHandler
 from execution import SimulatedExecutionHandler
 from portfolio import Portfolio
+from vectorized_backtest import VectorizedStrategy
 
 
-class MovingAverageCrossStrategy(Strategy):
+class MovingAverageCrossStrategy(BatchStrategy):
     """
     Carries out a basic Moving Average Crossover strategy with a
     short/long simple weighted moving average. Default short/long
     windows are 100/400 periods respectively.
+
+    This is the reference BatchStrategy: the signals for all of
+    the symbols are calculated in one call per bar.
     """
 
+    batch_fields = ('adj_close',)
+
+    state_params = ('short_window', 'long_window')
+
+    # The averages are streamed, so only the latest bar is read
+    batch_lookback = 1
+
     def __init__(
         self, bars, events, short_window=100, long_window=400
     ):
@@ -38,60 +48,106 @@ class MovingAverageCrossStrategy(Strategy):
         short_window - The short moving average lookback.
         long_window - The long moving average lookback.
         """
-        self.bars = bars
-        self.symbol_list = self.bars.symbol_list
-        self.events = events
+        super(MovingAverageCrossStrategy, self).__init__(bars, events)
         self.short_window = short_window
         self.long_window = long_window
 
-        # Set to True if a symbol is in the market
-        self.bought = self._calculate_initial_bought()
+        # Streaming averages across all symbols, so the
+        # lookback windows are not re-scanned on every bar
+        self.short_sma = SMA(self.short_window, len(self.symbol_list))
+        self.long_sma = SMA(self.long_window, len(self.symbol_list))
 
-    def _calculate_initial_bought(self):
+    def calculate_batch_signals(self, bars):
         """
-        Adds keys to the bought dictionary for all symbols
-        and sets them to 'OUT'.
+        Goes long the symbols whose short SMA crosses above the
+        long SMA and exits them once it crosses back below.
+
+        Parameters
+        bars - Dictionary holding the (symbols x 1) matrix of the
+            latest adjusted closes.
         """
-        bought = {}
-        for s in self.symbol_list:
-            bought[s] = 'OUT'
-        return bought
+        prices = bars['adj_close'][:, -1]
+        short_smas = self.short_sma.update(prices)
+        long_smas = self.long_sma.update(prices)
+
+        directions = self.directions.copy()
+        directions[short_smas > long_smas] = 1
+        directions[short_smas < long_smas] = 0
+        return directions
 
-    def calculate_signals(self, event):
+
+class MovingAverageCrossVectorizedStrategy(VectorizedStrategy):
+    """
+    Vectorised form of the MovingAverageCrossStrategy, for use
+    with the VectorizedBacktest. It calculates the same short/long
+    simple moving averages (over the bars available so far, up to
+    the window length) and holds a long position of 100 units, the
+    quantity used by Portfolio.generate_naive_order, while the 
+    short SMA is above the long SMA.
+    """
+
+    def __init__(self, bars, short_window=100, long_window=400):
         """
-        Generates a new set of signals based on the MAC
-        SMA with the short window crossing the long window
-        meaning a long entry and vice versa for a short entry.    
+        Initialises the vectorised Moving Average Cross Strategy.
 
-        Parameters
-        event - A MarketEvent object. 
+        Parameters:
+        bars - The DataHandler object that provides bar information
+        short_window - The short moving average lookback.
+        long_window - The long moving average lookback.
+        """
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.short_window = short_window
+        self.long_window = long_window
+        self.quantity = 100
+
+    def _trailing_mean(self, prices, window):
+        """
+        Calculates the mean of the trailing window of each bar,
+        or of all bars so far if fewer are available. As with
+        np.mean, a window containing any NaN values is NaN.
+        """
+        n_bars, n_symbols = prices.shape
+        missing = np.isnan(prices)
+        sums = np.zeros((n_bars + 1, n_symbols))
+        sums[1:] = np.cumsum(np.where(missing, 0.0, prices), axis=0)
+        nans = np.zeros((n_bars + 1, n_symbols))
+        nans[1:] = np.cumsum(missing, axis=0)
+
+        end = np.arange(1, n_bars + 1)
+        start = np.maximum(end - window, 0)
+        means = (sums[end] - sums[start]) / (end - start)[:, np.newaxis]
+        means[(nans[end] - nans[start]) > 0] = np.nan
+        return means
+
+    def generate_positions(self):
+        """
+        Returns the (bars x symbols) target positions. Enters
+        long when the short SMA crosses above the long SMA and
+        exits when it crosses below, otherwise holding the 
+        previous position.
         """
-        if event.type == 'MARKET':
-            for s in self.symbol_list:
-                bars = self.bars.get_latest_bars_values(
-                    s, "adj_close", N=self.long_window
-                )
-                bar_date = self.bars.get_latest_bar_datetime(s)
-                if bars is not None and bars != []:
-                    short_sma = np.mean(bars[-self.short_window:])
-                    long_sma = np.mean(bars[-self.long_window:])
-
-                    symbol = s
-                    dt = datetime.datetime.utcnow()
-                    sig_dir = ""
-
-                    if short_sma > long_sma and self.bought[s] == "OUT":
-                        print("LONG: %s" % bar_date)
-                        sig_dir = 'LONG'
-                        signal = SignalEvent(1, symbol, dt, sig_dir, 1.0)
-                        self.events.put(signal)
-                        self.bought[s] = 'LONG'
-                    elif short_sma < long_sma and self.bought[s] == "LONG":
-                        print("SHORT: %s" % bar_date)
-                        sig_dir = 'EXIT'
-                        signal = SignalEvent(1, symbol, dt, sig_dir, 1.0)
-                        self.events.put(signal)
-                        self.bought[s] = 'OUT'
+        prices = self.bars.get_all_bars_values("adj_close")
+        short_sma = self._trailing_mean(prices, self.short_window)
+        long_sma = self._trailing_mean(prices, self.long_window)
+
+        # 1 (LONG) or 0 (OUT) where the SMAs differ, else NaN,
+        # with a leading OUT state prior to the first bar
+        n_bars, n_symbols = prices.shape
+        state = np.empty((n_bars + 1, n_symbols))
+        state[0] = 0.0
+        state[1:] = np.where(
+            short_sma > long_sma, 1.0, 
+            np.where(short_sma < long_sma, 0.0, np.nan)
+        )
+
+        # Forward fill the state across the NaN (hold) bars
+        rows = np.where(
+            np.isnan(state), 0, np.arange(n_bars + 1)[:, np.newaxis]
+        )
+        rows = np.maximum.accumulate(rows, axis=0)
+        state = state[rows, np.arange(n_symbols)]
+        return self.quantity * state[1:]
 
 
 if __name__ == "__main__":
@@ -27,25 +27,135 @@ def create_drawdowns(pnl):
     as well as the duration of the drawdown. Requires that the 
     pnl_returns is a pandas Series.
 
+    The calculation is vectorised: the high water mark is a 
+    running maximum and the duration is the number of bars
+    since the drawdown was last zero.
+
     Parameters:
     pnl - A pandas Series representing period percentage returns.
 
     Returns:
     drawdown, duration - Highest peak-to-trough drawdown and duration.
     """
+    idx = pnl.index
+    values = np.asarray(pnl, dtype=np.float64)
+    bars = np.arange(len(values))
 
     # Calculate the cumulative returns curve 
-    # and set up the High Water Mark
-    hwm = [0]
+    # and set up the High Water Mark, starting from
+    # zero and ignoring any missing values
+    hwm = np.zeros(len(values))
+    hwm[1:] = values[1:]
+    hwm = np.fmax.accumulate(hwm)
 
-    # Create the drawdown and duration series
-    idx = pnl.index
-    drawdown = pd.Series(index = idx)
-    duration = pd.Series(index = idx)
-
-    # Loop over the index range
-    for t in range(1, len(idx)):
-        hwm.append(max(hwm[t-1], pnl[t]))
-        drawdown[t]= (hwm[t]-pnl[t])
-        duration[t]= (0 if drawdown[t] == 0 else duration[t-1]+1)
+    # Create the drawdown series, undefined for the first bar
+    drawdown = hwm - values
+    drawdown[:1] = np.nan
+
+    # The duration counts the bars since the drawdown was
+    # last zero, and is undefined until it first is
+    at_hwm = np.zeros(len(values), dtype=bool)
+    at_hwm[1:] = drawdown[1:] == 0
+    last_hwm = np.maximum.accumulate(np.where(at_hwm, bars, -1))
+    duration = np.where(last_hwm >= 0, bars - last_hwm, np.nan)
+
+    drawdown = pd.Series(drawdown, index=idx)
+    duration = pd.Series(duration, index=idx)
     return drawdown, drawdown.max(), duration.max()
+
+
+class PerformanceTracker(object):
+    """
+    PerformanceTracker updates the statistics of an equity curve
+    incrementally, in constant time and memory per bar, so that
+    they can be inspected while a backtest (or live session) is 
+    still running.
+
+    The period returns, equity curve and drawdowns follow the 
+    same conventions as Portfolio.create_equity_curve_dataframe 
+    and create_drawdowns, so the final values agree with the 
+    post-backtest statistics. The mean and variance of the 
+    returns are maintained with Welford's algorithm.
+    """
+
+    def __init__(self):
+        """
+        Initialises the tracker prior to the first bar.
+        """
+        self.bars = 0
+        self.last_total = np.nan
+        self.equity = 1.0
+
+        # Running moments of the (non-missing) returns
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        # Drawdown state, undefined until the second bar
+        self.hwm = 0.0
+        self.drawdown = np.nan
+        self.max_drawdown = np.nan
+        self.duration = np.nan
+        self.max_duration = np.nan
+
+    def update(self, total):
+        """
+        Updates the statistics with the total portfolio value
+        of the latest bar.
+
+        Parameters:
+        total - The total value (cash plus holdings) of the portfolio.
+        """
+        ret = total / self.last_total - 1.0
+        self.last_total = total
+        self.bars += 1
+        if self.bars == 1:
+            return
+
+        if ret == ret:
+            # Welford's online update of the mean and variance
+            self.count += 1
+            delta = ret - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (ret - self.mean)
+
+            # The cumulative product skips missing returns
+            self.equity *= (1.0 + ret)
+            equity = self.equity
+        else:
+            equity = np.nan
+
+        if equity > self.hwm:
+            self.hwm = equity
+        self.drawdown = self.hwm - equity
+        if self.drawdown == 0:
+            self.duration = 0
+        else:
+            self.duration += 1
+
+        # Maxima ignore missing values, as Series.max() does
+        if self.drawdown == self.drawdown and \
+            not self.drawdown <= self.max_drawdown:
+            self.max_drawdown = self.drawdown
+        if self.duration == self.duration and \
+            not self.duration <= self.max_duration:
+            self.max_duration = self.duration
+
+    @property
+    def total_return(self):
+        """
+        The total return of the equity curve so far.
+        """
+        return self.equity - 1.0
+
+    def sharpe_ratio(self, periods=252):
+        """
+        The Sharpe ratio of the returns so far, based on a 
+        benchmark of zero, as per create_sharpe_ratio.
+
+        Parameters:
+        periods - Daily (252), Hourly (252*6.5), Minutely(252*6.5*60) etc.
+        """
+        if self.count == 0:
+            return np.nan
+        return np.sqrt(periods) * self.mean / np.sqrt(self.m2 / self.count)
@@ -15,8 +15,10 @@ except ImportError:
 import numpy as np
 import pandas as pd
 
-from event import FillEvent, OrderEvent
-from performance import create_sharpe_ratio, create_drawdowns
+from event import FILL, SIGNAL, FillEvent, OrderEvent
+from performance import (
+    create_sharpe_ratio, create_drawdowns, PerformanceTracker
+)
 
 
 class Portfolio(object):
@@ -49,35 +51,52 @@ class Portfolio(object):
         self.bars = bars
         self.events = events
         self.symbol_list = self.bars.symbol_list
+        self.symbol_index = dict(
+            (s, i) for i, s in enumerate(self.symbol_list)
+        )
         self.start_date = start_date
         self.initial_capital = initial_capital
-        
-        self.all_positions = self.construct_all_positions()
-        self.current_positions = dict( (k,v) for k, v in [(s, 0) for s in self.symbol_list] )
+        self.price_field = "adj_close"
+        self.periods = 252
+        self.equity_csv = 'equity.csv'
 
-        self.all_holdings = self.construct_all_holdings()
+        self.current_positions = np.zeros(len(self.symbol_list), dtype=np.int64)
         self.current_holdings = self.construct_current_holdings()
 
+        # Running statistics, updated with every ledger record
+        self.performance = PerformanceTracker()
+
+        self.ledger_capacity = 1024
+        self.ledger_size = 0
+        self.ledger_datetimes = []
+        self.construct_all_positions()
+        self.construct_all_holdings()
+        self._append_ledger_row(
+            self.start_date, self.current_positions,
+            np.zeros(len(self.symbol_list))
+        )
+
     def construct_all_positions(self):
         """
-        Constructs the positions list using the start_date
-        to determine when the time index will begin.
+        Preallocates the positions ledger, a (bars x symbols) 
+        array of the quantity held of each symbol.
         """
-        d = dict( (k,v) for k, v in [(s, 0) for s in self.symbol_list] )
-        d['datetime'] = self.start_date
-        return [d]
+        self.positions_ledger = np.zeros(
+            (self.ledger_capacity, len(self.symbol_list))
+        )
 
     def construct_all_holdings(self):
         """
-        Constructs the holdings list using the start_date
-        to determine when the time index will begin.
+        Preallocates the holdings ledger, a (bars x symbols + 3)
+        array of the market value of each symbol followed by 
+        the cash, commission and total columns.
         """
-        d = dict( (k,v) for k, v in [(s, 0.0) for s in self.symbol_list] )
-        d['datetime'] = self.start_date
-        d['cash'] = self.initial_capital
-        d['commission'] = 0.0
-        d['total'] = self.initial_capital
-        return [d]
+        self.holdings_columns = self.symbol_list + [
+            'cash', 'commission', 'total'
+        ]
+        self.holdings_ledger = np.zeros(
+            (self.ledger_capacity, len(self.holdings_columns))
+        )
 
     def construct_current_holdings(self):
         """
@@ -90,6 +109,58 @@ class Portfolio(object):
         d['total'] = self.initial_capital
         return d
 
+    @property
+    def all_positions(self):
+        """
+        The filled rows of the positions ledger.
+        """
+        return self.positions_ledger[:self.ledger_size]
+
+    @property
+    def all_holdings(self):
+        """
+        The filled rows of the holdings ledger.
+        """
+        return self.holdings_ledger[:self.ledger_size]
+
+    def _grow_ledger(self):
+        """
+        Doubles the capacity of the positions and holdings
+        ledgers, giving amortised constant time appends.
+        """
+        self.ledger_capacity *= 2
+        for name in ('positions_ledger', 'holdings_ledger'):
+            old = getattr(self, name)
+            new = np.zeros((self.ledger_capacity, old.shape[1]))
+            new[:self.ledger_size] = old[:self.ledger_size]
+            setattr(self, name, new)
+
+    def _append_ledger_row(self, dt, positions, prices):
+        """
+        Appends a record of the positions and their market 
+        value at the given prices to the ledgers.
+
+        Parameters:
+        dt - The datetime of the record.
+        positions - The array of quantities held per symbol.
+        prices - The array of prices per symbol.
+        """
+        if self.ledger_size == self.ledger_capacity:
+            self._grow_ledger()
+        i = self.ledger_size
+        n = len(self.symbol_list)
+
+        self.positions_ledger[i] = positions
+        row = self.holdings_ledger[i]
+        np.multiply(positions, prices, out=row[:n])
+        row[n] = self.current_holdings['cash']
+        row[n+1] = self.current_holdings['commission']
+        row[n+2] = self.current_holdings['cash'] + positions.dot(prices)
+
+        self.ledger_datetimes.append(dt)
+        self.ledger_size += 1
+        self.performance.update(row[n+2])
+
     def update_timeindex(self, event):
         """
         Adds a new record to the positions matrix for the current 
@@ -98,36 +169,14 @@ class Portfolio(object):
 
         Makes use of a MarketEvent from the events queue.
         """
-        latest_datetime = self.bars.get_latest_bar_datetime(self.symbol_list[0])
+        latest_datetime = self.bars.get_current_datetime()
 
-        # Update positions
-        # ================
-        dp = dict( (k,v) for k, v in [(s, 0) for s in self.symbol_list] )
-        dp['datetime'] = latest_datetime
-
-        for s in self.symbol_list:
-            dp[s] = self.current_positions[s]
-
-        # Append the current positions
-        self.all_positions.append(dp)
-
-        # Update holdings
-        # ===============
-        dh = dict( (k,v) for k, v in [(s, 0) for s in self.symbol_list] )
-        dh['datetime'] = latest_datetime
-        dh['cash'] = self.current_holdings['cash']
-        dh['commission'] = self.current_holdings['commission']
-        dh['total'] = self.current_holdings['cash']
-
-        for s in self.symbol_list:
-            # Approximation to the real value
-            market_value = self.current_positions[s] * \
-                self.bars.get_latest_bar_value(s, "adj_close")
-            dh[s] = market_value
-            dh['total'] += market_value
-
-        # Append the current holdings
-        self.all_holdings.append(dh)
+        # Approximation to the real value, marking all 
+        # positions to market with a single dot product
+        prices = self.bars.get_latest_bar_value_vector(self.price_field)
+        self._append_ledger_row(
+            latest_datetime, self.current_positions, prices
+        )
 
     # ======================
     # FILL/POSITION HANDLING
@@ -149,7 +198,8 @@ class Portfolio(object):
             fill_dir = -1
 
         # Update positions list with new quantities
-        self.current_positions[fill.symbol] += fill_dir*fill.quantity
+        self.current_positions[self.symbol_index[fill.symbol]] += \
+            fill_dir*fill.quantity
 
     def update_holdings_from_fill(self, fill):
         """
@@ -168,7 +218,7 @@ class Portfolio(object):
 
         # Update holdings list with new quantities
         fill_cost = self.bars.get_latest_bar_value(
-            fill.symbol, "adj_close"
+            fill.symbol, self.price_field
         )
         cost = fill_dir * fill_cost * fill.quantity
         self.current_holdings[fill.symbol] += cost
@@ -181,7 +231,7 @@ class Portfolio(object):
         Updates the portfolio current positions and holdings 
         from a FillEvent.
         """
-        if event.type == 'FILL':
+        if event.kind == FILL:
             self.update_positions_from_fill(event)
             self.update_holdings_from_fill(event)
 
@@ -201,7 +251,7 @@ class Portfolio(object):
         strength = signal.strength
 
         mkt_quantity = 100
-        cur_quantity = self.current_positions[symbol]
+        cur_quantity = self.current_positions[self.symbol_index[symbol]]
         order_type = 'MKT'
 
         if direction == 'LONG' and cur_quantity == 0:
@@ -210,9 +260,9 @@ class Portfolio(object):
             order = OrderEvent(symbol, order_type, mkt_quantity, 'SELL')   
     
         if direction == 'EXIT' and cur_quantity > 0:
-            order = OrderEvent(symbol, order_type, abs(cur_quantity), 'SELL')
+            order = OrderEvent(symbol, order_type, int(abs(cur_quantity)), 'SELL')
         if direction == 'EXIT' and cur_quantity < 0:
-            order = OrderEvent(symbol, order_type, abs(cur_quantity), 'BUY')
+            order = OrderEvent(symbol, order_type, int(abs(cur_quantity)), 'BUY')
         return order
 
     def update_signal(self, event):
@@ -220,7 +270,7 @@ class Portfolio(object):
         Acts on a SignalEvent to generate new orders 
         based on the portfolio logic.
         """
-        if event.type == 'SIGNAL':
+        if event.kind == SIGNAL:
             order_event = self.generate_naive_order(event)
             self.events.put(order_event)
 
@@ -230,11 +280,14 @@ class Portfolio(object):
 
     def create_equity_curve_dataframe(self):
         """
-        Creates a pandas DataFrame from the all_holdings
-        list of dictionaries.
+        Creates a pandas DataFrame wrapping the filled rows of 
+        the holdings ledger, without copying them.
         """
-        curve = pd.DataFrame(self.all_holdings)
-        curve.set_index('datetime', inplace=True)
+        curve = pd.DataFrame(
+            self.all_holdings, columns=self.holdings_columns,
+            index=pd.Index(self.ledger_datetimes, name='datetime'),
+            copy=False
+        )
         curve['returns'] = curve['total'].pct_change()
         curve['equity_curve'] = (1.0+curve['returns']).cumprod()
         self.equity_curve = curve
@@ -243,11 +296,11 @@ class Portfolio(object):
         """
         Creates a list of summary statistics for the portfolio.
         """
-        total_return = self.equity_curve['equity_curve'][-1]
+        total_return = self.equity_curve['equity_curve'].iloc[-1]
         returns = self.equity_curve['returns']
         pnl = self.equity_curve['equity_curve']
 
-        sharpe_ratio = create_sharpe_ratio(returns)
+        sharpe_ratio = create_sharpe_ratio(returns, periods=self.periods)
         drawdown, max_dd, dd_duration = create_drawdowns(pnl)
         self.equity_curve['drawdown'] = drawdown
 
@@ -256,5 +309,5 @@ class Portfolio(object):
                  ("Max Drawdown", "%0.2f%%" % (max_dd * 100.0)),
                  ("Drawdown Duration", "%d" % dd_duration)]
 
-        self.equity_curve.to_csv('equity.csv')
+        self.equity_curve.to_csv(self.equity_csv)
         return stats
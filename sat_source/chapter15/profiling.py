@@ -0,0 +1,159 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# profiling.py
+
+from __future__ import print_function
+
+import json
+try:
+    import resource
+except ImportError:
+    resource = None
+import sys
+import time
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of the process in bytes, or
+    None where the resource module is unavailable (e.g. Windows).
+    Linux reports the maximum RSS in kilobytes, macOS in bytes.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss * 1024
+
+
+class BacktestProfiler(object):
+    """
+    BacktestProfiler records the number of calls and the 
+    cumulative wall time of named sections of a backtest, such
+    as DataHandler.update_bars or the handling of each event 
+    type. Sections are timed by wrapping the bound methods of
+    the components, so there is no overhead when a backtest is
+    run without profiling.
+
+    Times are inclusive: the MARKET event section includes the
+    time spent in Strategy.calculate_signals, for example.
+    """
+
+    def __init__(self):
+        """
+        Initialises the profiler with no recorded sections.
+        """
+        self.calls = {}
+        self.times = {}
+        self.instrumented = []
+
+    def wrap(self, name, func):
+        """
+        Returns func wrapped so that its calls and wall time
+        are recorded against the section name.
+
+        Parameters:
+        name - The section name, e.g. 'Portfolio.update_fill'.
+        func - The callable to time.
+        """
+        self.calls.setdefault(name, 0)
+        self.times.setdefault(name, 0.0)
+        calls = self.calls
+        times = self.times
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += clock() - start
+                calls[name] += 1
+        return timed
+
+    def instrument(self, obj, method_name, label=None):
+        """
+        Replaces a method of a component with a timed version,
+        recorded as 'ClassName.method_name' unless a label is 
+        given. Returns the section name.
+        """
+        name = label or "%s.%s" % (type(obj).__name__, method_name)
+        setattr(obj, method_name, self.wrap(name, getattr(obj, method_name)))
+        self.instrumented.append((obj, method_name))
+        return name
+
+    def remove_instrumentation(self):
+        """
+        Restores the original methods of the instrumented 
+        components, e.g. before pickling them.
+        """
+        for obj, method_name in self.instrumented:
+            delattr(obj, method_name)
+        self.instrumented = []
+
+    def report(self, events=None, run_time=None):
+        """
+        Returns the profile as a dictionary, with the calls, 
+        cumulative and per-call seconds of each section, along 
+        with the event counts, throughput and peak memory.
+
+        Parameters:
+        events - Optional dictionary of event counts.
+        run_time - The optional wall time of the whole run.
+        """
+        sections = {}
+        for name in self.calls:
+            calls = self.calls[name]
+            sections[name] = {
+                'calls': calls,
+                'total_seconds': self.times[name],
+                'per_call_seconds': self.times[name] / calls if calls else 0.0
+            }
+        report = {'sections': sections, 'peak_memory_bytes': peak_memory()}
+        if events is not None:
+            report['events'] = events
+        if run_time is not None:
+            report['run_time_seconds'] = run_time
+            total = sum((events or {}).values())
+            report['events_per_second'] = total / run_time if run_time else 0.0
+        return report
+
+    def output_report(self, report):
+        """
+        Prints a profile report, sorted by cumulative time.
+        """
+        print("Profile:")
+        print(
+            "%-45s %10s %12s %14s" % 
+            ("Section", "Calls", "Total (s)", "Per call (us)")
+        )
+        sections = report['sections']
+        for name in sorted(
+            sections, key=lambda n: sections[n]['total_seconds'], reverse=True
+        ):
+            s = sections[name]
+            print(
+                "%-45s %10d %12.4f %14.2f" % (
+                    name, s['calls'], s['total_seconds'], 
+                    s['per_call_seconds'] * 1e6
+                )
+            )
+        if report.get('peak_memory_bytes') is not None:
+            print(
+                "Peak memory: %0.1f MiB" % 
+                (report['peak_memory_bytes'] / float(1 << 20))
+            )
+
+    def dump_json(self, report, path):
+        """
+        Writes a profile report to a JSON file, e.g. to track
+        performance regressions across commits.
+        """
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
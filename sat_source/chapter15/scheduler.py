@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# scheduler.py
+
+from __future__ import print_function
+
+import heapq
+
+import pandas as pd
+
+
+class EventScheduler(object):
+    """
+    EventScheduler holds actions that are due at a future 
+    simulated time, such as the fills of orders that are still
+    "in flight" to the exchange. It is driven by the data clock
+    rather than the wall clock: Backtest calls release() after 
+    every market update, which runs the actions that have come
+    due, in timestamp order.
+
+    The actions are kept in a binary heap keyed on integer 
+    nanosecond timestamps, so scheduling and releasing are 
+    O(log n) in the number of outstanding actions. Actions due 
+    at the same time are run in the order they were scheduled.
+    """
+
+    def __init__(self):
+        """
+        Initialises the scheduler with no outstanding actions.
+        """
+        self.heap = []
+        self.sequence = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, dt, action, *args):
+        """
+        Schedules action(now, *args) to be called on the first
+        release at or after the datetime dt, where now is the 
+        datetime of that release.
+
+        Parameters:
+        dt - The datetime (or pandas Timestamp) it is due at.
+        action - The callable to run.
+        args - Any further arguments for the action.
+        """
+        self.sequence += 1
+        heapq.heappush(
+            self.heap, (pd.Timestamp(dt).value, self.sequence, action, args)
+        )
+
+    def next_datetime(self):
+        """
+        Returns the time the next action is due, or None if there
+        are no outstanding actions.
+        """
+        if not self.heap:
+            return None
+        return pd.Timestamp(self.heap[0][0])
+
+    def release(self, now):
+        """
+        Runs every action due at or before the datetime now, 
+        including any that are scheduled for no later than now 
+        by the actions themselves. Returns the number run.
+
+        Parameters:
+        now - The current datetime of the data clock.
+        """
+        now_ns = pd.Timestamp(now).value
+        heap = self.heap
+        released = 0
+        while heap and heap[0][0] <= now_ns:
+            _, _, action, args = heapq.heappop(heap)
+            action(now, *args)
+            released += 1
+        return released
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# securities_master_data.py
+
+from __future__ import print_function
+
+import datetime
+import sqlite3
+
+import numpy as np
+import pandas as pd
+try:
+    import MySQLdb
+    import MySQLdb.connections
+    import MySQLdb.cursors
+except ImportError:
+    MySQLdb = None
+
+from data import StreamingDataHandler, YAHOO_CSV_NAMES
+from event import MARKET_EVENT
+
+
+# The daily_price columns of each bar field, in the order of
+# the Yahoo CSV fields so the bars match HistoricCSVDataHandler
+DAILY_PRICE_FIELDS = [
+    ('open', 'open_price'), ('high', 'high_price'), ('low', 'low_price'),
+    ('close', 'close_price'), ('volume', 'volume'),
+    ('adj_close', 'adj_close_price')
+]
+
+
+class SecuritiesMasterDataHandler(StreamingDataHandler):
+    """
+    SecuritiesMasterDataHandler streams daily bars straight from
+    the daily_price table of the securities master, rather than
+    from CSV files dumped out of it.
+
+    The bars of the whole symbol list are selected with a single
+    query ordered by price_date and symbol_id, and the result is
+    consumed a chunk of rows at a time, so memory use is bounded
+    by the lookback and the chunk size. One MarketEvent is
+    generated per price date. The returns are calculated from
+    the adjusted closes, as by HistoricCSVDataHandler.
+
+    The connection is passed in place of the CSV directory, so
+    the handler can be used with the Backtest as it is. With a
+    MySQLdb connection the query uses a server-side SSCursor by
+    default, as the default cursor buffers the whole result on
+    the client; the connection should not be used for other
+    queries until the backtest is done. Any DB-API connection
+    with the same schema can be used, such as an SQLite stand-in,
+    and cursor_class may be set to override the cursor.
+    """
+
+    data_vendor_id = 1
+    returns_field = 'adj_close'
+    cursor_class = None
+
+    def __init__(
+        self, events, con, symbol_list, lookback=1000, chunksize=10000,
+        start_date=None, end_date=None
+    ):
+        """
+        Initialises the data handler and executes the query.
+
+        Parameters:
+        events - The Event Queue.
+        con - The database connection to the securities master.
+        symbol_list - A list of ticker strings.
+        lookback - The maximum number of bars retained per symbol.
+        chunksize - The number of rows fetched at a time.
+        start_date - The optional first price date.
+        end_date - The optional last price date.
+        """
+        super(SecuritiesMasterDataHandler, self).__init__(
+            events, symbol_list, YAHOO_CSV_NAMES[1:] + ['returns'],
+            lookback=lookback
+        )
+        self.con = con
+        self.chunksize = chunksize
+        self.start_date = start_date
+        self.end_date = end_date
+        self.returns_col = self.fields.index(self.returns_field)
+        self.last_prices = np.full(len(self.symbol_list), np.nan)
+
+        self.cursor = self._execute_query()
+        self._fetch_chunk()
+
+    def _execute_query(self):
+        """
+        Executes the ordered query for the bars of every symbol,
+        returning the cursor.
+        """
+        p = '?' if isinstance(self.con, sqlite3.Connection) else '%s'
+        sql = (
+            "SELECT sym.ticker, dp.price_date, %s "
+            "FROM symbol AS sym "
+            "INNER JOIN daily_price AS dp ON dp.symbol_id = sym.id "
+            "WHERE dp.data_vendor_id = %s AND sym.ticker IN (%s)" % (
+                ", ".join("dp.%s" % c for f, c in DAILY_PRICE_FIELDS), p,
+                ", ".join([p] * len(self.symbol_list))
+            )
+        )
+        params = [self.data_vendor_id] + list(self.symbol_list)
+        fmt = '%Y-%m-%d %H:%M:%S'
+        if self.start_date is not None:
+            sql += " AND dp.price_date >= %s" % p
+            params.append(pd.Timestamp(self.start_date).strftime(fmt))
+        if self.end_date is not None:
+            sql += " AND dp.price_date <= %s" % p
+            params.append(pd.Timestamp(self.end_date).strftime(fmt))
+        sql += " ORDER BY dp.price_date, dp.symbol_id"
+
+        cursor_class = self.cursor_class
+        if cursor_class is None and MySQLdb is not None and \
+            isinstance(self.con, MySQLdb.connections.Connection):
+            cursor_class = MySQLdb.cursors.SSCursor
+        if cursor_class is None:
+            cur = self.con.cursor()
+        else:
+            cur = self.con.cursor(cursor_class)
+        cur.execute(sql, params)
+        return cur
+
+    def _fetch_chunk(self):
+        """
+        Fetches the next chunk of rows from the cursor into the
+        arrays of symbol rows, nanosecond timestamps and (rows x
+        fields) bar values, with the returns calculated across
+        chunk boundaries. Returns False once the result is
+        exhausted.
+        """
+        rows = self.cursor.fetchmany(self.chunksize)
+        self.chunk_pos = 0
+        if len(rows) == 0:
+            self.chunk_ts = np.zeros(0, dtype=np.int64)
+            return False
+
+        columns = list(zip(*rows))
+        self.chunk_symbols = np.array(
+            [self.symbol_index[t] for t in columns[0]], dtype=np.int64
+        )
+        self.chunk_ts = pd.to_datetime(
+            pd.Series(columns[1], dtype=object)
+        ).values.astype('datetime64[ns]').view(np.int64)
+        values = np.array([
+            [np.nan if v is None else v for v in c] for c in columns[2:]
+        ], dtype=np.float64)
+
+        # Each symbol's previous price is its last one in this
+        # chunk, or failing that its last one before the chunk
+        k = self.returns_col
+        prices = values[k]
+        prev_prices = np.empty(len(rows))
+        for j in np.unique(self.chunk_symbols):
+            idx = np.flatnonzero(self.chunk_symbols == j)
+            prev_prices[idx[0]] = self.last_prices[j]
+            prev_prices[idx[1:]] = prices[idx[:-1]]
+            self.last_prices[j] = prices[idx[-1]]
+        self.chunk_values = np.vstack(
+            [values, prices / prev_prices - 1.0]
+        ).T
+        return True
+
+    def update_bars(self):
+        """
+        Pushes the bars of every symbol for the next price date
+        to their lookback and places a single MarketEvent on the
+        queue.
+        """
+        if self.chunk_pos == len(self.chunk_ts):
+            self.continue_backtest = False
+            return
+        ts = self.chunk_ts[self.chunk_pos]
+        while True:
+            end = np.searchsorted(self.chunk_ts, ts, side='right')
+            for i in range(self.chunk_pos, end):
+                self._push_bar(
+                    self.chunk_symbols[i], ts, self.chunk_values[i]
+                )
+            self.chunk_pos = end
+            # The bars of a date may continue into the next chunk
+            if end < len(self.chunk_ts) or not self._fetch_chunk() or \
+                self.chunk_ts[0] != ts:
+                break
+        self.current_datetime = pd.Timestamp(ts)
+        self.events.put(MARKET_EVENT)
+
+
+if __name__ == "__main__":
+    from backtest import Backtest
+    from execution import SimulatedExecutionHandler
+    from mac import MovingAverageCrossStrategy
+    from portfolio import Portfolio
+
+    # The connection details of the chapter 7 securities master,
+    # as in its db_pool.py
+    db_host = 'localhost'
+    db_user = 'sec_user'
+    db_pass = 'password'
+    db_name = 'securities_master'
+
+    if MySQLdb is None:
+        raise ImportError(
+            "The MySQLdb driver (mysqlclient) is needed to connect "
+            "to the MySQL securities master."
+        )
+
+    # Backtest the MAC strategy on the securities master
+    con = MySQLdb.connect(db_host, db_user, db_pass, db_name)
+    symbol_list = ['AAPL']
+    backtest = Backtest(
+        con, symbol_list, 100000.0, 0.0,
+        datetime.datetime(1990, 1, 1, 0, 0, 0), SecuritiesMasterDataHandler,
+        SimulatedExecutionHandler, Portfolio, MovingAverageCrossStrategy
+    )
+    backtest.simulate_trading()
@@ -11,7 +11,7 @@ import pandas as pd
 from sklearn.qda import QDA
 
 from strategy import Strategy
-from event import SignalEvent
+from event import MARKET, SignalEvent
 from backtest import Backtest
 from data import HistoricCSVDataHandler
 from execution import SimulatedExecutionHandler
@@ -26,6 +26,10 @@ class SPYDailyForecastStrategy(Strategy):
     period and then generated long/exit signals based on the
     prediction.
     """
+
+    # The last three returns are read on each bar for the lags
+    max_lookback = 3
+
     def __init__(self, bars, events):
         self.bars = bars
         self.symbol_list = self.bars.symbol_list
@@ -72,7 +76,7 @@ class SPYDailyForecastStrategy(Strategy):
         sym = self.symbol_list[0]
         dt = self.datetime_now
 
-        if event.type == 'MARKET':
+        if event.kind == MARKET:
             self.bar_index += 1
             if self.bar_index > 5:
                 lags = self.bars.get_latest_bars_values(
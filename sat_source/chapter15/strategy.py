@@ -15,7 +15,7 @@ except ImportError:
 import numpy as np
 import pandas as pd
 
-from event import SignalEvent
+from event import MARKET, SignalEvent
 
 
 class Strategy(object):
@@ -34,9 +34,154 @@ class Strategy(object):
 
     __metaclass__ = ABCMeta
 
+    # The most bars the strategy reads back via get_latest_bars
+    # or get_latest_bars_values, or None if it is not declared
+    max_lookback = None
+
+    # The parameters that shape state built up over the bars,
+    # e.g. indicator windows, which cannot be changed mid-run
+    state_params = ()
+
+    @classmethod
+    def get_max_lookback(cls, **params):
+        """
+        Returns the maximum number of bars per symbol that the 
+        strategy looks back over, given the keyword parameters 
+        it will be created with. Data handlers with a bounded 
+        lookback use this to size their buffers.
+
+        Strategies whose lookback depends on their parameters
+        should override this, otherwise max_lookback is used.
+        """
+        return cls.max_lookback
+
+    def set_params(self, **params):
+        """
+        Changes the parameters of a strategy part way through a
+        run, e.g. to fork variants of a backtest from a shared
+        warm-up checkpoint. Parameters listed in state_params 
+        cannot be changed, as the state they shape is already 
+        built up.
+        """
+        for name, value in params.items():
+            if not hasattr(self, name):
+                raise ValueError(
+                    "%s has no parameter '%s'." % (type(self).__name__, name)
+                )
+            if name in self.state_params and getattr(self, name) != value:
+                raise ValueError(
+                    "The parameter '%s' of %s cannot be changed once "
+                    "its state has warmed up." % (name, type(self).__name__)
+                )
+            setattr(self, name, value)
+
     @abstractmethod
     def calculate_signals(self):
         """
         Provides the mechanisms to calculate the list of signals.
         """
         raise NotImplementedError("Should implement calculate_signals()")
+
+
+# The signal type of each direction returned by a BatchStrategy
+SIGNAL_DIRECTIONS = {1: 'LONG', 0: 'EXIT', -1: 'SHORT'}
+
+
+class BatchStrategy(Strategy):
+    """
+    BatchStrategy is an optional cross-sectional form of the 
+    Strategy interface. Rather than looping over the symbol list,
+    a subclass implements calculate_batch_signals, which receives
+    a (symbols x lookback) matrix of the latest bars for each of
+    the batch_fields in a single call and returns a vector of the
+    desired direction of every symbol: 1 for long, -1 for short
+    and 0 for out of the market.
+
+    calculate_signals compares the directions to those of the
+    previous bar and only emits SignalEvents for the symbols 
+    whose direction changed. A symbol flipping from long to 
+    short (or vice versa) is exited before the new entry.
+    """
+
+    # The bar fields and the number of bars per symbol 
+    # passed to calculate_batch_signals
+    batch_fields = ('close',)
+    batch_lookback = 1
+
+    strategy_id = 1
+
+    def __init__(self, bars, events):
+        """
+        Initialises the batch strategy with every symbol out
+        of the market.
+
+        Parameters:
+        bars - The DataHandler object that provides bar information
+        events - The Event Queue object.
+        """
+        self.bars = bars
+        self.symbol_list = self.bars.symbol_list
+        self.events = events
+        self.directions = np.zeros(len(self.symbol_list), dtype=np.int64)
+
+    @classmethod
+    def get_max_lookback(cls, **params):
+        """
+        Returns the batch lookback, unless max_lookback is set.
+        """
+        if cls.max_lookback is not None:
+            return cls.max_lookback
+        return cls.batch_lookback
+
+    @abstractmethod
+    def calculate_batch_signals(self, bars):
+        """
+        Returns the desired direction (1, 0 or -1) of every symbol
+        as an integer vector in symbol list order.
+
+        Parameters:
+        bars - Dictionary of (symbols x lookback) matrices, keyed
+            by the batch_fields. Fewer columns are passed while 
+            the lookback is filling.
+        """
+        raise NotImplementedError("Should implement calculate_batch_signals()")
+
+    def _put_signal(self, j, direction, dt):
+        """
+        Places a SignalEvent for symbol j onto the events queue.
+        """
+        signal_type = SIGNAL_DIRECTIONS[direction]
+        print("%s: %s" % (signal_type, dt))
+        self.events.put(SignalEvent(
+            self.strategy_id, self.symbol_list[j], dt, signal_type, 1.0
+        ))
+
+    def calculate_signals(self, event):
+        """
+        Passes the latest bar matrices to calculate_batch_signals
+        and emits SignalEvents for the symbols that changed.
+
+        Parameters
+        event - A MarketEvent object.
+        """
+        if event.kind == MARKET:
+            bars = dict(
+                (f, self.bars.get_latest_bars_values_matrix(
+                    f, N=self.batch_lookback
+                ))
+                for f in self.batch_fields
+            )
+            directions = np.asarray(
+                self.calculate_batch_signals(bars), dtype=np.int64
+            )
+            changed = np.flatnonzero(directions != self.directions)
+            if len(changed) == 0:
+                return
+
+            dt = self.bars.get_current_datetime()
+            for j in changed:
+                old, new = self.directions[j], directions[j]
+                if old != 0 and new != 0:
+                    self._put_signal(j, 0, dt)
+                self._put_signal(j, new, dt)
+            self.directions = directions
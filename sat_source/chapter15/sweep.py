@@ -0,0 +1,181 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# sweep.py
+
+from __future__ import print_function
+
+import datetime
+import itertools
+import multiprocessing
+import shutil
+import tempfile
+
+import pandas as pd
+
+from backtest import Backtest
+from data import BarStoreDataHandler
+from execution import SimulatedExecutionHandler
+from hft_data import HistoricCSVDataHandlerHFT
+from hft_portfolio import PortfolioHFT
+from intraday_mr import IntradayOLSMRStrategy
+
+
+def create_parameter_sets(param_grid):
+    """
+    Expands a grid of parameter values into the list of all 
+    parameter dictionaries, i.e. their Cartesian product.
+
+    Parameters:
+    param_grid - A dictionary of parameter name to a list of values.
+    """
+    names = list(param_grid.keys())
+    return [
+        dict(zip(names, values)) for values in 
+        itertools.product(*[param_grid[n] for n in names])
+    ]
+
+
+def _run_sweep_backtest(job):
+    """
+    Runs a single backtest of the sweep against the shared 
+    bar store and returns its parameters and statistics. This
+    is a module-level function so that it can be pickled for
+    the worker processes.
+    """
+    (
+        store_dir, symbol_list, initial_capital, start_date,
+        execution_handler, portfolio, strategy, strategy_params
+    ) = job
+
+    backtest = Backtest(
+        store_dir, symbol_list, initial_capital, 0.0, start_date, 
+        BarStoreDataHandler, execution_handler, portfolio, strategy,
+        strategy_params=strategy_params
+    )
+    backtest._run_backtest()
+
+    perf = backtest.portfolio.performance
+    result = dict(strategy_params)
+    result.update({
+        "total_return": perf.total_return,
+        "cagr": perf.equity ** (
+            float(backtest.portfolio.periods) / max(perf.bars, 1)
+        ) - 1.0,
+        "sharpe_ratio": perf.sharpe_ratio(backtest.portfolio.periods),
+        "max_drawdown": perf.max_drawdown,
+        "drawdown_duration": perf.max_duration,
+        "signals": backtest.signals,
+        "orders": backtest.orders,
+        "fills": backtest.fills
+    })
+    return result
+
+
+def run_parameter_sweep(
+    csv_dir, symbol_list, initial_capital, start_date,
+    data_handler, execution_handler, portfolio, strategy,
+    param_grid, processes=None
+):
+    """
+    Runs one Backtest per parameter set of the grid across a 
+    pool of worker processes.
+
+    The bar data is loaded once, by the data handler, and 
+    written to a temporary columnar bar store which the workers
+    memory-map read-only via BarStoreDataHandler, rather than 
+    each re-parsing the CSV files.
+
+    Parameters:
+    csv_dir - The hard root to the CSV data directory.
+    symbol_list - The list of symbol strings.
+    intial_capital - The starting capital for the portfolio.
+    start_date - The start datetime of the strategy.
+    data_handler - (Class) Loads the market data, once.
+    execution_handler - (Class) Handles the orders/fills for trades.
+    portfolio - (Class) Keeps track of portfolio positions.
+    strategy - (Class) Generates signals based on market data.
+    param_grid - A dictionary of strategy parameter name to a 
+        list of values to sweep over.
+    processes - The number of worker processes, defaulting
+        to the number of CPUs.
+
+    Returns:
+    A DataFrame of the parameters and statistics, one row per
+    parameter set, with the returns and drawdowns as fractions.
+    """
+    print("Loading bar data for %s symbols..." % len(symbol_list))
+    bars = data_handler(None, csv_dir, symbol_list)
+    store_dir = tempfile.mkdtemp(prefix="bar_store_")
+    try:
+        bars.save_bar_store(store_dir)
+        del bars
+
+        param_sets = create_parameter_sets(param_grid)
+        jobs = [
+            (
+                store_dir, symbol_list, initial_capital, start_date,
+                execution_handler, portfolio, strategy, sp
+            ) for sp in param_sets
+        ]
+        print(
+            "Running %s backtests across %s processes..." % 
+            (len(jobs), processes or multiprocessing.cpu_count())
+        )
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_run_sweep_backtest, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(store_dir)
+
+    columns = list(param_grid.keys()) + [
+        "total_return", "cagr", "sharpe_ratio", "max_drawdown", 
+        "drawdown_duration", "signals", "orders", "fills"
+    ]
+    return pd.DataFrame(results, columns=columns)
+
+
+def write_opt_csv(results, param_names, filename="opt.csv"):
+    """
+    Writes the sweep results in the opt.csv format read by the
+    chapter 16 heatmap scripts: the parameters followed by the
+    total return (%), CAGR (%), Sharpe ratio, maximum drawdown
+    (%) and drawdown duration, without a header. The heatmaps
+    expect the parameters to be ols_window, zscore_high and
+    zscore_low, in that order.
+
+    Parameters:
+    results - The DataFrame returned by run_parameter_sweep.
+    param_names - The list of parameter names, in column order.
+    filename - The name of the CSV file to write.
+    """
+    opt = results[list(param_names)].copy()
+    opt["total_return"] = results["total_return"] * 100.0
+    opt["cagr"] = results["cagr"] * 100.0
+    opt["sharpe_ratio"] = results["sharpe_ratio"]
+    opt["max_drawdown"] = results["max_drawdown"] * 100.0
+    opt["drawdown_duration"] = results["drawdown_duration"]
+    opt.to_csv(filename, header=False, index=False)
+
+
+if __name__ == "__main__":
+    csv_dir = '/path/to/your/csv/file'  # CHANGE THIS!
+    symbol_list = ['AREX', 'WLL']
+    initial_capital = 100000.0
+    start_date = datetime.datetime(2007, 11, 8, 10, 41, 0)
+
+    param_grid = {
+        "ols_window": [50, 100, 200],
+        "zscore_high": [2.0, 3.0, 4.0],
+        "zscore_low": [0.5, 1.0, 1.5]
+    }
+    results = run_parameter_sweep(
+        csv_dir, symbol_list, initial_capital, start_date,
+        HistoricCSVDataHandlerHFT, SimulatedExecutionHandler, 
+        PortfolioHFT, IntradayOLSMRStrategy, param_grid
+    )
+    print(results)
+    write_opt_csv(results, ["ols_window", "zscore_high", "zscore_low"])
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# tick_data.py
+
+from __future__ import print_function
+
+import numpy as np
+import pandas as pd
+
+from data import HistoricCSVMergeDataHandler
+
+
+# Trade/quote ticks, with NaN price and size on quote-only rows
+TICK_CSV_NAMES = ['datetime', 'price', 'size', 'bid', 'ask']
+
+BAR_TYPES = ('time', 'tick', 'volume', 'dollar')
+
+
+def _forward_fill(arr, last):
+    """
+    Forward fills the NaNs of a 1D array with the previous
+    valid value, starting from 'last' (carried over from the 
+    previous chunk). Returns the filled array and the new 
+    last valid value.
+    """
+    idx = np.where(np.isnan(arr), -1, np.arange(len(arr)))
+    np.maximum.accumulate(idx, out=idx)
+    filled = np.where(idx >= 0, arr[np.maximum(idx, 0)], last)
+    if len(filled) > 0:
+        last = filled[-1]
+    return filled, last
+
+
+class HistoricTickDataHandler(HistoricCSVMergeDataHandler):
+    """
+    HistoricTickDataHandler streams raw trade/quote ticks from a
+    'symbol.csv' file per symbol and aggregates them on the fly
+    into bars, which are then merged across symbols in timestamp
+    order exactly as in HistoricCSVMergeDataHandler. It therefore
+    exposes the same get_latest_bars_values interface, so that 
+    strategies written against minutely bars (such as the 
+    IntradayOLSMRStrategy) run unchanged on, e.g., ten second bars.
+
+    The bar_type class attribute selects how ticks are grouped:
+
+    'time' - Every bar_size seconds, labelled with the end time.
+    'tick' - Every bar_size trades.
+    'volume' - Every bar_size units traded.
+    'dollar' - Every bar_size of notional value traded.
+
+    Ticks are aggregated with vectorised NumPy reductions over
+    each chunk, and only the ticks of the bar in progress are 
+    carried over to the next chunk, so memory use is bounded by 
+    the chunk size rather than the length of the tick history.
+
+    Quote-only rows (NaN price and size) update the bid and ask 
+    without trading. The released fields are open, high, low, 
+    close, volume, dollar_volume, trades, the latest value of 
+    every other tick column (bid and ask) and the returns.
+    """
+
+    csv_names = TICK_CSV_NAMES
+    price_field = 'price'
+    size_field = 'size'
+    returns_field = 'close'
+    bar_type = 'time'
+    bar_size = 10
+
+    # Building the binary cache would read the whole tick
+    # file into memory, which defeats streaming it in chunks
+    use_csv_cache = False
+
+    def __init__(
+        self, events, csv_dir, symbol_list, 
+        lookback=1000, chunksize=100000, bar_type=None, bar_size=None
+    ):
+        """
+        Initialises the tick data handler by requesting the
+        location of the tick CSV files and a list of symbols.
+
+        Parameters:
+        events - The Event Queue.
+        csv_dir - Absolute directory path to the CSV files.
+        symbol_list - A list of symbol strings.
+        lookback - The maximum number of bars retained per symbol.
+        chunksize - The number of ticks read at a time.
+        bar_type - Optionally overrides the bar_type attribute.
+        bar_size - Optionally overrides the bar_size attribute.
+        """
+        if bar_type is not None:
+            self.bar_type = bar_type
+        if bar_size is not None:
+            self.bar_size = bar_size
+        if self.bar_type not in BAR_TYPES:
+            raise ValueError(
+                "Unknown bar type '%s', should be one of %s." % 
+                (self.bar_type, ", ".join(BAR_TYPES))
+            )
+        if self.bar_size <= 0:
+            raise ValueError("The bar size must be positive.")
+
+        tick_fields = self.csv_names[1:]
+        self.price_col = tick_fields.index(self.price_field)
+        self.size_col = tick_fields.index(self.size_field)
+        self.quote_cols = [
+            i for i, f in enumerate(tick_fields) 
+            if f not in (self.price_field, self.size_field)
+        ]
+        super(HistoricTickDataHandler, self).__init__(
+            events, csv_dir, symbol_list, 
+            lookback=lookback, chunksize=chunksize
+        )
+
+    def _get_bar_fields(self):
+        """
+        Returns the list of fields of the aggregated bars.
+        """
+        tick_fields = self.csv_names[1:]
+        return [
+            'open', 'high', 'low', 'close', 
+            'volume', 'dollar_volume', 'trades'
+        ] + [tick_fields[i] for i in self.quote_cols] + ['returns']
+
+    def _assign_bar_ids(self, ts, price, size, state):
+        """
+        Returns the integer bar id of each tick of a chunk. The 
+        ids are non-decreasing, with a change of id marking the
+        start of a new bar. A bar closes on the tick that takes
+        its trades, volume or notional up to the bar size.
+
+        Parameters:
+        ts - The tick timestamps as integer nanoseconds.
+        price - The forward filled trade prices.
+        size - The trade sizes, zero for quote-only ticks.
+        state - The cumulative total carried between chunks.
+        """
+        if self.bar_type == 'time':
+            return ts // int(self.bar_size * 1e9)
+        if self.bar_type == 'tick':
+            amount = (size > 0).astype(np.float64)
+        elif self.bar_type == 'volume':
+            amount = size
+        else:
+            amount = np.where(size > 0, price * size, 0.0)
+        cum = np.cumsum(amount) + state['total']
+        cum_before = cum - amount
+        state['total'] = cum[-1]
+        return np.floor(cum_before / self.bar_size).astype(np.int64)
+
+    def _aggregate(self, ts, price, size, quotes, ids, last_close):
+        """
+        Aggregates the ticks of a chunk into one bar per distinct 
+        bar id, returning the bar timestamps and the (bars x 
+        fields) values, excluding the returns.
+
+        The open, high, low and close are taken from the trades
+        alone, as the forward filled price of a quote-only tick 
+        is stale. A bar without any trades has all four set to
+        the previous close, starting from last_close.
+        """
+        n = len(ts)
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1])
+        ends = np.concatenate([starts[1:], [n]]) - 1
+        if self.bar_type == 'time':
+            bar_ts = (ids[starts] + 1) * int(self.bar_size * 1e9)
+        else:
+            bar_ts = ts[ends]
+
+        traded = size > 0
+        positions = np.arange(n)
+        trades = np.add.reduceat(traded.astype(np.float64), starts)
+        has_trades = trades > 0
+        first = np.minimum.reduceat(np.where(traded, positions, n - 1), starts)
+        last = np.maximum.reduceat(np.where(traded, positions, 0), starts)
+        trade_price = np.where(traded, price, np.nan)
+        close, _ = _forward_fill(
+            np.where(has_trades, price[last], np.nan), last_close
+        )
+        opens = np.where(has_trades, price[first], close)
+        highs = np.where(
+            has_trades, np.fmax.reduceat(trade_price, starts), close
+        )
+        lows = np.where(
+            has_trades, np.fmin.reduceat(trade_price, starts), close
+        )
+        values = np.column_stack([
+            opens, highs, lows, close,
+            np.add.reduceat(size, starts),
+            np.add.reduceat(price * size, starts),
+            trades,
+            quotes[ends]
+        ])
+        return bar_ts, values
+
+    def _add_returns(self, bars, last_close):
+        """
+        Appends the close-to-close returns to the aggregated bars,
+        given the close of the previously released bar.
+        """
+        prev_close = np.concatenate([[last_close], bars[:-1, 3]])
+        return np.column_stack([bars, bars[:, 3] / prev_close - 1.0])
+
+    def _symbol_bar_stream(self, symbol):
+        """
+        Generates (timestamp, values) tuples of the aggregated
+        bars of a single symbol, with the timestamp as integer
+        nanoseconds. The bar in progress at the end of a chunk 
+        is only released once a later tick (or the end of the 
+        file) shows that it is complete.
+        """
+        state = {'total': 0.0}
+        last_price = np.nan
+        last_quotes = np.full(len(self.quote_cols), np.nan)
+        last_close = np.nan
+        last_ts = None
+        pending = None
+
+        for ts, values in self._read_chunks(symbol):
+            if len(ts) == 0:
+                continue
+            if np.any(np.diff(ts) < 0) or (
+                last_ts is not None and ts[0] < last_ts
+            ):
+                raise ValueError(
+                    "The ticks of %s are not in ascending date order." % symbol
+                )
+            last_ts = ts[-1]
+
+            price, last_price = _forward_fill(
+                values[:, self.price_col], last_price
+            )
+            size = np.nan_to_num(values[:, self.size_col])
+            quotes = np.empty((len(ts), len(self.quote_cols)))
+            for i, col in enumerate(self.quote_cols):
+                quotes[:, i], last_quotes[i] = _forward_fill(
+                    values[:, col], last_quotes[i]
+                )
+            ids = self._assign_bar_ids(ts, price, size, state)
+
+            # Prepend the ticks of the bar in progress
+            if pending is not None:
+                ts, price, size, quotes, ids = [
+                    np.concatenate([p, c]) for p, c in 
+                    zip(pending, (ts, price, size, quotes, ids))
+                ]
+
+            # Ticks before the first trade have no price to bar
+            traded = ~np.isnan(price)
+            if not traded.all():
+                ts, price, size, quotes, ids = [
+                    a[traded] for a in (ts, price, size, quotes, ids)
+                ]
+            if len(ts) == 0:
+                pending = None
+                continue
+
+            last_start = np.searchsorted(ids, ids[-1])
+            pending = [
+                a[last_start:] for a in (ts, price, size, quotes, ids)
+            ]
+            if last_start == 0:
+                continue
+            bar_ts, bars = self._aggregate(
+                ts[:last_start], price[:last_start], size[:last_start],
+                quotes[:last_start], ids[:last_start], last_close
+            )
+            bars = self._add_returns(bars, last_close)
+            last_close = bars[-1, 3]
+            for i in range(len(bar_ts)):
+                yield bar_ts[i], bars[i]
+
+        if pending is not None:
+            bar_ts, bars = self._aggregate(*(pending + [last_close]))
+            bars = self._add_returns(bars, last_close)
+            for i in range(len(bar_ts)):
+                yield bar_ts[i], bars[i]
@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# vectorized_backtest.py
+
+from __future__ import print_function
+
+from abc import ABCMeta, abstractmethod
+import datetime
+import pprint
+
+import numpy as np
+import pandas as pd
+
+from performance import create_sharpe_ratio, create_drawdowns
+
+
+def calculate_ib_commission(quantity):
+    """
+    Vectorised form of FillEvent.calculate_ib_commission, 
+    applying the same Interactive Brokers "US API Directed 
+    Orders" fee schedule to an array of traded quantities.
+    Zero quantities (no trade) incur no commission.
+
+    Parameters:
+    quantity - A NumPy array of traded quantities (signed).
+    """
+    quantity = np.abs(quantity)
+    full_cost = np.where(
+        quantity <= 500,
+        np.maximum(1.3, 0.013 * quantity),
+        np.maximum(1.3, 0.008 * quantity)
+    )
+    return np.where(quantity > 0, full_cost, 0.0)
+
+
+class VectorizedStrategy(object):
+    """
+    VectorizedStrategy is an abstract base class providing an 
+    interface for strategies that are evaluated over the whole 
+    price history in one go, rather than bar-by-bar.
+
+    A (derived) VectorizedStrategy returns the target position,
+    in units of the instrument, that should be held at the close
+    of each bar for each symbol.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def generate_positions(self):
+        """
+        Returns a (bars x symbols) array of target positions.
+        """
+        raise NotImplementedError("Should implement generate_positions()")
+
+
+class VectorizedBacktest(object):
+    """
+    Encapsulates the settings and components for carrying out
+    a vectorised backtest. 
+
+    The positions, holdings, commissions and equity curve are
+    calculated with NumPy over the full history, using the same
+    fill conventions as the event-driven Backtest with the
+    SimulatedExecutionHandler and Portfolio:
+
+    - Target positions for bar t are filled at the bar t price.
+    - The holdings record for bar t values the positions held 
+      prior to bar t's fills at the bar t price.
+
+    This makes it suitable for screening large numbers of 
+    parameter sets, before confirming with the event-driven 
+    engine.
+    """
+
+    def __init__(
+        self, csv_dir, symbol_list, initial_capital,
+        start_date, data_handler, strategy, 
+        strategy_params=None, price_field="adj_close", periods=252
+    ):
+        """
+        Initialises the vectorised backtest.
+
+        Parameters:
+        csv_dir - The hard root to the CSV data directory.
+        symbol_list - The list of symbol strings.
+        intial_capital - The starting capital for the portfolio.
+        start_date - The start datetime of the strategy.
+        data_handler - (Class) Handles the market data feed.
+        strategy - (Class) A VectorizedStrategy generating positions.
+        strategy_params - Optional dictionary of strategy parameters.
+        price_field - The bar field used to fill and value positions.
+        periods - The number of bars per year, for the Sharpe ratio.
+        """
+        self.csv_dir = csv_dir
+        self.symbol_list = symbol_list
+        self.initial_capital = initial_capital
+        self.start_date = start_date
+        self.price_field = price_field
+        self.periods = periods
+
+        self.data_handler_cls = data_handler
+        self.strategy_cls = strategy
+        self.strategy_params = strategy_params or {}
+
+        self.fills = 0
+
+        self._generate_trading_instances()
+
+    def _generate_trading_instances(self):
+        """
+        Generates the DataHandler and VectorizedStrategy 
+        instances from their class types. No events are 
+        produced, so no events queue is attached.
+        """
+        print("Creating DataHandler and VectorizedStrategy")
+        self.data_handler = self.data_handler_cls(
+            None, self.csv_dir, self.symbol_list
+        )
+        self.strategy = self.strategy_cls(
+            self.data_handler, **self.strategy_params
+        )
+
+    def _run_backtest(self):
+        """
+        Executes the backtest, creating the positions and
+        holdings DataFrames.
+        """
+        prices = self.data_handler.get_all_bars_values(self.price_field)
+        targets = np.asarray(
+            self.strategy.generate_positions(), dtype=np.float64
+        )
+        n_bars, n_symbols = prices.shape
+
+        # Positions held going into each bar, i.e. the target
+        # of the previous bar, starting from a flat book
+        held = np.zeros((n_bars + 1, n_symbols))
+        held[1:] = targets
+        trades = np.diff(held, axis=0)
+        traded = trades != 0.0
+
+        # Cash flows from the fills at each bar's price. Only
+        # symbols that actually trade are multiplied through, so
+        # missing prices for untraded symbols are ignored
+        commission = calculate_ib_commission(trades).sum(axis=1)
+        cost = np.where(traded, trades * prices, 0.0).sum(axis=1)
+        self.fills = int(traded.sum())
+
+        # Cash and cumulative commission after the fills of
+        # the first k bars, for k = 0, ..., n_bars
+        cash = self.initial_capital - np.concatenate(
+            [[0.0], np.cumsum(cost + commission)]
+        )
+        comm = np.concatenate([[0.0], np.cumsum(commission)])
+
+        positions = held[:-1]
+        market_value = positions * prices
+
+        index = pd.Index(
+            [self.start_date] + list(self.data_handler.bar_datetimes),
+            name="datetime"
+        )
+        holdings = pd.DataFrame(
+            np.vstack([np.zeros(n_symbols), market_value]),
+            index=index, columns=self.symbol_list
+        )
+        # The start record and every bar record the cash prior
+        # to that bar's fills, as Portfolio.update_timeindex does
+        holdings["cash"] = np.concatenate([[self.initial_capital], cash[:-1]])
+        holdings["commission"] = np.concatenate([[0.0], comm[:-1]])
+        holdings["total"] = holdings["cash"] + holdings[self.symbol_list].sum(
+            axis=1, skipna=False
+        )
+        self.positions = pd.DataFrame(
+            np.vstack([np.zeros(n_symbols), positions]),
+            index=index, columns=self.symbol_list
+        )
+        self.holdings = holdings
+
+    def create_equity_curve_dataframe(self):
+        """
+        Creates the equity curve DataFrame from the holdings,
+        in the same form as Portfolio.equity_curve.
+        """
+        curve = self.holdings.copy()
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0+curve['returns']).cumprod()
+        self.equity_curve = curve
+
+    def output_summary_stats(self):
+        """
+        Creates a list of summary statistics for the portfolio.
+        """
+        total_return = self.equity_curve['equity_curve'].iloc[-1]
+        returns = self.equity_curve['returns']
+        pnl = self.equity_curve['equity_curve']
+
+        sharpe_ratio = create_sharpe_ratio(returns, periods=self.periods)
+        drawdown, max_dd, dd_duration = create_drawdowns(pnl)
+        self.equity_curve['drawdown'] = drawdown
+
+        stats = [("Total Return", "%0.2f%%" % ((total_return - 1.0) * 100.0)),
+                 ("Sharpe Ratio", "%0.2f" % sharpe_ratio),
+                 ("Max Drawdown", "%0.2f%%" % (max_dd * 100.0)),
+                 ("Drawdown Duration", "%d" % dd_duration)]
+
+        self.equity_curve.to_csv('equity.csv')
+        return stats
+
+    def _output_performance(self):
+        """
+        Outputs the strategy performance from the backtest.
+        """
+        self.create_equity_curve_dataframe()
+
+        print("Creating summary stats...")
+        stats = self.output_summary_stats()
+
+        print("Creating equity curve...")
+        print(self.equity_curve.tail(10))
+        pprint.pprint(stats)
+
+        print("Fills: %s" % self.fills)
+
+    def simulate_trading(self):
+        """
+        Simulates the backtest and outputs portfolio performance.
+        """
+        self._run_backtest()
+        self._output_performance()
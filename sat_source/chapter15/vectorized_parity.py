@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# vectorized_parity.py
+
+from __future__ import print_function
+
+import datetime
+
+import numpy as np
+
+from backtest import Backtest
+from data import HistoricCSVDataHandler
+from execution import SimulatedExecutionHandler
+from mac import MovingAverageCrossStrategy, MovingAverageCrossVectorizedStrategy
+from portfolio import Portfolio
+from vectorized_backtest import VectorizedBacktest
+
+
+def check_parity(
+    csv_dir, symbol_list, initial_capital, start_date, rtol=1e-9
+):
+    """
+    Runs the Moving Average Cross strategy through both the 
+    event-driven Backtest and the VectorizedBacktest and checks
+    that they produce the same equity curve DataFrame.
+
+    Parameters:
+    csv_dir - The hard root to the CSV data directory.
+    symbol_list - The list of symbol strings.
+    intial_capital - The starting capital for the portfolio.
+    start_date - The start datetime of the strategy.
+    rtol - The relative tolerance for the value comparison.
+
+    Returns:
+    True if the equity curves match, False otherwise.
+    """
+    event_bt = Backtest(
+        csv_dir, symbol_list, initial_capital, 0.0, 
+        start_date, HistoricCSVDataHandler, SimulatedExecutionHandler, 
+        Portfolio, MovingAverageCrossStrategy
+    )
+    event_bt._run_backtest()
+    event_bt.portfolio.create_equity_curve_dataframe()
+    event_curve = event_bt.portfolio.equity_curve
+
+    vector_bt = VectorizedBacktest(
+        csv_dir, symbol_list, initial_capital, start_date,
+        HistoricCSVDataHandler, MovingAverageCrossVectorizedStrategy
+    )
+    vector_bt._run_backtest()
+    vector_bt.create_equity_curve_dataframe()
+    vector_curve = vector_bt.equity_curve[event_curve.columns]
+
+    if not event_curve.index.equals(vector_curve.index):
+        print("Parity FAILED: the equity curve indices differ.")
+        return False
+    if event_bt.fills != vector_bt.fills:
+        print(
+            "Parity FAILED: %s event-driven fills vs %s vectorised." % 
+            (event_bt.fills, vector_bt.fills)
+        )
+        return False
+
+    a = event_curve.values.astype(np.float64)
+    b = vector_curve.values.astype(np.float64)
+    max_diff = np.nanmax(np.abs(a - b))
+    print("Maximum absolute difference: %s" % max_diff)
+    if not np.allclose(a, b, rtol=rtol, atol=0.0, equal_nan=True):
+        print("Parity FAILED: the equity curve values differ.")
+        return False
+    print("Parity OK: %s bars, %s fills." % (len(a), vector_bt.fills))
+    return True
+
+
+if __name__ == "__main__":
+    csv_dir = '/path/to/your/csv/file'  # CHANGE THIS!
+    symbol_list = ['AAPL']
+    initial_capital = 100000.0
+    start_date = datetime.datetime(1990, 1, 1, 0, 0, 0)
+
+    check_parity(csv_dir, symbol_list, initial_capital, start_date)
@@ -0,0 +1,164 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# db_pool.py
+
+from __future__ import print_function
+
+from contextlib import contextmanager
+import threading
+import time
+
+
+# Database connection details for the MySQL instance
+db_host = 'localhost'
+db_user = 'sec_user'
+db_pass = 'password'
+db_name = 'securities_master'
+
+
+def connect_securities_master():
+    """
+    Obtains a new database connection to the MySQL instance.
+    MySQLdb is imported here, so that the pool can be used
+    with other connections (e.g. the SQLite stand-in) without
+    the MySQL driver installed.
+    """
+    import MySQLdb as mdb
+    return mdb.connect(db_host, db_user, db_pass, db_name)
+
+
+class ConnectionPool(object):
+    """
+    ConnectionPool shares a bounded set of database connections
+    between threads. A connection is checked out for the
+    duration of a with block, during which no other thread uses
+    it, as MySQLdb connections are not themselves thread-safe:
+
+        with pool.connection() as con:
+            cur = con.cursor()
+            ...
+
+    Connections are opened on demand, up to the pool size, and
+    reused afterwards. If the block raises, the transaction is
+    rolled back, and a connection that cannot even be rolled
+    back is closed and replaced.
+    """
+
+    def __init__(self, connect=connect_securities_master, size=4, timeout=None):
+        """
+        Parameters:
+        connect - Function returning a new DB-API connection.
+        size - The maximum number of open connections.
+        timeout - The seconds to wait for a free connection,
+            or None to wait indefinitely.
+        """
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle = []
+        self.opened = 0
+        self.cond = threading.Condition()
+
+    def _checkout(self):
+        """
+        Returns an idle connection, opening a new one if none
+        is idle and the pool is not full, or otherwise waiting
+        until a connection is returned or a place is freed.
+        """
+        if self.timeout is not None:
+            deadline = time.time() + self.timeout
+        with self.cond:
+            while True:
+                if self.idle:
+                    return self.idle.pop()
+                if self.opened < self.size:
+                    self.opened += 1
+                    break
+                if self.timeout is None:
+                    self.cond.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError(
+                        "No database connection was free within %s seconds" %
+                        self.timeout
+                    )
+                self.cond.wait(remaining)
+        try:
+            return self.connect()
+        except Exception:
+            with self.cond:
+                self.opened -= 1
+                self.cond.notify()
+            raise
+
+    def _release(self, con):
+        """
+        Returns a connection to the idle list, waking a waiter.
+        """
+        with self.cond:
+            self.idle.append(con)
+            self.cond.notify()
+
+    def _discard(self, con):
+        """
+        Closes a broken connection, freeing its place in the pool
+        for a waiter to open a new one.
+        """
+        try:
+            con.close()
+        except Exception:
+            pass
+        with self.cond:
+            self.opened -= 1
+            self.cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a connection for the duration of a with block.
+        If the block raises, its exception is re-raised, even when
+        the rollback fails too.
+        """
+        con = self._checkout()
+        try:
+            yield con
+        except BaseException:
+            try:
+                con.rollback()
+                rolled_back = True
+            except Exception:
+                rolled_back = False
+            if rolled_back:
+                self._release(con)
+            else:
+                self._discard(con)
+            raise
+        self._release(con)
+
+    def close_all(self):
+        """
+        Closes the idle connections. Connections checked out
+        at the time are returned to the pool as usual.
+        """
+        with self.cond:
+            idle, self.idle = self.idle, []
+        for con in idle:
+            self._discard(con)
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the ConnectionPool to the securities master shared
+    by the whole process, creating it on first use.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool()
+        return _shared_pool
@@ -9,9 +9,10 @@ import datetime
 from math import ceil
 
 import bs4
-import MySQLdb as mdb
 import requests
 
+from db_pool import get_pool
+
 
 def obtain_parse_wiki_snp500():
     """
@@ -55,15 +56,6 @@ def insert_snp500_symbols(symbols):
     """
     Insert the S&P500 symbols into the MySQL database.
     """
-    # Connect to the MySQL instance
-    db_host = 'localhost'
-    db_user = 'sec_user'
-    db_pass = 'password'
-    db_name = 'securities_master'
-    con = mdb.connect(
-        host=db_host, user=db_user, passwd=db_pass, db=db_name
-    )
-
     # Create the insert strings
     column_str = """ticker, instrument, name, sector, 
                  currency, created_date, last_updated_date
@@ -72,11 +64,12 @@ def insert_snp500_symbols(symbols):
     final_str = "INSERT INTO symbol (%s) VALUES (%s)" % \
         (column_str, insert_str)
 
-    # Using the MySQL connection, carry out 
+    # Using a pooled MySQL connection, carry out 
     # an INSERT INTO for every symbol
-    with con: 
+    with get_pool().connection() as con: 
         cur = con.cursor()
         cur.executemany(final_str, symbols)
+        con.commit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+-- Adds the composite indexes of daily_price to an existing
+-- securities master, created before they were added to
+-- securities_master.sql. The (symbol_id, price_date) index
+-- serves the per-ticker date range queries and the 
+-- (data_vendor_id, symbol_id, price_date) index serves the 
+-- latest price date and multi-ticker panel queries.
+
+ALTER TABLE `daily_price`
+  ADD KEY `index_symbol_id_price_date` (`symbol_id`, `price_date`),
+  ADD KEY `index_data_vendor_id_symbol_id_price_date` (`data_vendor_id`, `symbol_id`, `price_date`);
@@ -5,78 +5,199 @@
 
 from __future__ import print_function
 
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import io
+import os
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+import sqlite3
+import tempfile
+import threading
 import warnings
 
-import MySQLdb as mdb
+import pandas as pd
 import requests
 
+from db_pool import get_pool
 
-# Obtain a database connection to the MySQL instance
-db_host = 'localhost'
-db_user = 'sec_user'
-db_pass = 'password'
-db_name = 'securities_master'
-con = mdb.connect(db_host, db_user, db_pass, db_name)
 
+YAHOO_URL = "http://ichart.finance.yahoo.com/table.csv"
 
-def obtain_list_of_db_tickers():
+# The columns of a Yahoo Finance CSV file, in order
+YAHOO_CSV_COLUMNS = [
+    'price_date', 'open_price', 'high_price', 'low_price',
+    'close_price', 'volume', 'adj_close_price'
+]
+
+# The columns of daily_price that are inserted, in order
+DAILY_PRICE_COLUMNS = [
+    'data_vendor_id', 'symbol_id', 'price_date', 'created_date',
+    'last_updated_date', 'open_price', 'high_price', 'low_price',
+    'close_price', 'volume', 'adj_close_price'
+]
+
+
+def sql_placeholder(con):
+    """
+    Returns the query parameter placeholder of the connection,
+    which is '?' for an SQLite stand-in and '%s' for MySQL.
+    """
+    return '?' if isinstance(con, sqlite3.Connection) else '%s'
+
+
+def obtain_list_of_db_tickers(con):
     """
     Obtains a list of the ticker symbols in the database.
     """
-    with con: 
-        cur = con.cursor()
-        cur.execute("SELECT id, ticker FROM symbol")
-        data = cur.fetchall()
-        return [(d[0], d[1]) for d in data]
+    cur = con.cursor()
+    cur.execute("SELECT id, ticker FROM symbol")
+    data = cur.fetchall()
+    return [(d[0], d[1]) for d in data]
 
 
-def get_daily_historic_data_yahoo(
-        ticker, start_date=(2000,1,1),
-        end_date=datetime.date.today().timetuple()[0:3]
+def obtain_latest_price_dates(con, data_vendor_id):
+    """
+    Obtains the latest price_date held for each symbol of the
+    data vendor with a single grouped query, returning a 
+    dictionary of symbol ID to pandas Timestamp. Symbols 
+    without any prices are absent.
+    """
+    p = sql_placeholder(con)
+    cur = con.cursor()
+    cur.execute(
+        "SELECT data_vendor_id, symbol_id, MAX(price_date) "
+        "FROM daily_price WHERE data_vendor_id = %s "
+        "GROUP BY data_vendor_id, symbol_id" % p, (data_vendor_id,)
+    )
+    return dict((d[1], pd.Timestamp(d[2])) for d in cur.fetchall())
+
+
+def incremental_start_dates(
+        con, tickers, data_vendor_id, start_date=(2000,1,1), end_date=None
     ):
     """
-    Obtains data from Yahoo Finance returns and a list of tuples.
+    Returns the (symbol_id, ticker, start_date) tuples of the 
+    tickers that are missing prices up to the end date, where
+    the start date is the day after the latest price held, or
+    the given start_date for tickers without any prices.
+
+    tickers: List of (symbol_id, ticker) tuples
+    data_vendor_id: The data vendor ID of the prices
+    start_date: Start date in (YYYY, M, D) format
+    end_date: End date in (YYYY, M, D) format, by default today
+    """
+    if end_date is None:
+        end_date = datetime.date.today().timetuple()[0:3]
+    end = pd.Timestamp(*end_date)
+    latest_dates = obtain_latest_price_dates(con, data_vendor_id)
+    starts = []
+    for symbol_id, ticker in tickers:
+        latest = latest_dates.get(symbol_id)
+        if latest is None:
+            starts.append((symbol_id, ticker, start_date))
+        elif latest.normalize() < end:
+            start = latest.normalize() + pd.Timedelta(days=1)
+            starts.append(
+                (symbol_id, ticker, (start.year, start.month, start.day))
+            )
+    return starts
+
+
+def yahoo_daily_url(ticker, start_date, end_date, base_url=YAHOO_URL):
+    """
+    Constructs the Yahoo URL with the correct integer query
+    parameters for start and end dates. Note that some
+    parameters are zero-based!
 
     ticker: Yahoo Finance ticker symbol, e.g. "GOOG" for Google, Inc.
     start_date: Start date in (YYYY, M, D) format
     end_date: End date in (YYYY, M, D) format
+    base_url: The vendor URL, which may be a local stand-in
     """
-    # Construct the Yahoo URL with the correct integer query parameters
-    # for start and end dates. Note that some parameters are zero-based!
     ticker_tup = (
-        ticker, start_date[1]-1, start_date[2], 
-        start_date[0], end_date[1]-1, end_date[2], 
+        ticker, start_date[1]-1, start_date[2],
+        start_date[0], end_date[1]-1, end_date[2],
         end_date[0]
     )
-    yahoo_url = "http://ichart.finance.yahoo.com/table.csv"
-    yahoo_url += "?s=%s&a=%s&b=%s&c=%s&d=%s&e=%s&f=%s"
-    yahoo_url = yahoo_url % ticker_tup
+    return (base_url + "?s=%s&a=%s&b=%s&c=%s&d=%s&e=%s&f=%s") % ticker_tup
 
+
+def parse_daily_historic_data_yahoo(text):
+    """
+    Parses the text of a Yahoo Finance CSV file in one pass,
+    returning a DataFrame with the YAHOO_CSV_COLUMNS. The text
+    must be unicode under Python 2, as response.text is, since
+    it is read through io.StringIO.
+    """
+    return pd.read_csv(
+        io.StringIO(text), header=0, names=YAHOO_CSV_COLUMNS,
+        parse_dates=['price_date']
+    )
+
+
+def download_daily_historic_data_yahoo(
+        ticker, start_date=(2000,1,1), end_date=None,
+        base_url=YAHOO_URL, session=requests
+    ):
+    """
+    Obtains data from Yahoo Finance as a DataFrame with the
+    YAHOO_CSV_COLUMNS, raising an exception on failure.
+
+    ticker: Yahoo Finance ticker symbol, e.g. "GOOG" for Google, Inc.
+    start_date: Start date in (YYYY, M, D) format
+    end_date: End date in (YYYY, M, D) format, by default today
+    base_url: The vendor URL, which may be a local stand-in
+    session: The requests session to download with
+    """
+    if end_date is None:
+        end_date = datetime.date.today().timetuple()[0:3]
+    response = session.get(
+        yahoo_daily_url(ticker, start_date, end_date, base_url)
+    )
+    response.raise_for_status()
+    return parse_daily_historic_data_yahoo(response.text)
+
+
+def get_daily_historic_data_yahoo(
+        ticker, start_date=(2000,1,1), end_date=None, base_url=YAHOO_URL
+    ):
+    """
+    Obtains data from Yahoo Finance returns and a list of tuples.
+
+    ticker: Yahoo Finance ticker symbol, e.g. "GOOG" for Google, Inc.
+    start_date: Start date in (YYYY, M, D) format
+    end_date: End date in (YYYY, M, D) format, by default today
+    base_url: The vendor URL, which may be a local stand-in
+    """
     # Try connecting to Yahoo Finance and obtaining the data
     # On failure, print an error message.
+    prices = []
     try:
-        yf_data = requests.get(yahoo_url).text.split("\n")[1:-1]
-        prices = []
-        for y in yf_data:
-            p = y.strip().split(',')
-            prices.append( 
-                (datetime.datetime.strptime(p[0], '%Y-%m-%d'),
-                p[1], p[2], p[3], p[4], p[5], p[6]) 
+        data = download_daily_historic_data_yahoo(
+            ticker, start_date, end_date, base_url
+        )
+        dates = data['price_date'].dt.to_pydatetime()
+        prices = [
+            (d,) + p for d, p in zip(
+                dates, data.iloc[:, 1:].itertuples(index=False, name=None)
             )
+        ]
     except Exception as e:
         print("Could not download Yahoo data: %s" % e)
     return prices
 
 
 def insert_daily_data_into_db(
-        data_vendor_id, symbol_id, daily_data
+        con, data_vendor_id, symbol_id, daily_data
     ):
     """
     Takes a list of tuples of daily data and adds it to the
     MySQL database. Appends the vendor ID and symbol ID to the data.
 
-    daily_data: List of tuples of the OHLC data (with 
+    daily_data: List of tuples of the OHLC data (with
     adj_close and volume)
     """
     # Create the time now
@@ -85,22 +206,238 @@ def insert_daily_data_into_db(
     # Amend the data to include the vendor ID and symbol ID
     daily_data = [
         (data_vendor_id, symbol_id, d[0], now, now,
-        d[1], d[2], d[3], d[4], d[5], d[6]) 
+        d[1], d[2], d[3], d[4], d[5], d[6])
         for d in daily_data
     ]
 
     # Create the insert strings
-    column_str = """data_vendor_id, symbol_id, price_date, created_date, 
-                 last_updated_date, open_price, high_price, low_price, 
-                 close_price, volume, adj_close_price"""
-    insert_str = ("%s, " * 11)[:-2]
+    column_str = ", ".join(DAILY_PRICE_COLUMNS)
+    insert_str = ", ".join([sql_placeholder(con)] * 11)
     final_str = "INSERT INTO daily_price (%s) VALUES (%s)" % \
         (column_str, insert_str)
 
-    # Using the MySQL connection, carry out an INSERT INTO for every symbol
-    with con: 
-        cur = con.cursor()
-        cur.executemany(final_str, daily_data)
+    # Using the connection, carry out an INSERT INTO for every symbol
+    cur = con.cursor()
+    cur.executemany(final_str, daily_data)
+    con.commit()
+
+
+def _daily_price_rows(frame):
+    """
+    Returns the rows of a DataFrame of daily data, with the
+    DAILY_PRICE_COLUMNS, as tuples of Python values for the
+    database driver. The datetimes are formatted as strings in
+    one vectorised pass, rather than by the driver per value.
+    """
+    columns = []
+    for col in DAILY_PRICE_COLUMNS:
+        values = frame[col]
+        if col in ('price_date', 'created_date', 'last_updated_date'):
+            columns.append(values.dt.strftime('%Y-%m-%d %H:%M:%S').tolist())
+        else:
+            # NaN prices are stored as NULL
+            columns.append(
+                values.astype(object).where(values.notnull(), None).tolist()
+            )
+    return list(zip(*columns))
+
+
+def _delete_daily_data_ranges(con, frame):
+    """
+    Deletes the rows of daily_price that fall within the date
+    range of each vendor and symbol in a DataFrame of daily data.
+    """
+    p = sql_placeholder(con)
+    ranges = frame.groupby(
+        ['data_vendor_id', 'symbol_id']
+    )['price_date'].agg(['min', 'max'])
+    fmt = '%Y-%m-%d %H:%M:%S'
+    cur = con.cursor()
+    cur.executemany(
+        "DELETE FROM daily_price WHERE data_vendor_id = %s AND "
+        "symbol_id = %s AND price_date BETWEEN %s AND %s" % (p, p, p, p),
+        [
+            (int(v), int(s), lo.strftime(fmt), hi.strftime(fmt))
+            for (v, s), lo, hi in zip(
+                ranges.index, ranges['min'], ranges['max']
+            )
+        ]
+    )
+
+
+def bulk_insert_daily_data(con, frame, load_data=False, replace=False):
+    """
+    Inserts a DataFrame of daily data for many symbols into
+    daily_price in a single batch and transaction.
+
+    With replace the prices are upserted: any rows already held
+    in the date range of each symbol are deleted in the same
+    transaction, so re-fetched days are not duplicated.
+
+    With load_data the rows are written to a temporary CSV file
+    and loaded with MySQL's LOAD DATA LOCAL INFILE, its bulk
+    load path, which requires the local_infile option on both
+    the server and the connection. Otherwise the rows are
+    inserted with one executemany, which MySQLdb sends as
+    multi-row INSERT statements.
+
+    con: The database connection
+    frame: DataFrame with the DAILY_PRICE_COLUMNS other than
+        the created_date and last_updated_date
+    load_data: Whether to use LOAD DATA LOCAL INFILE
+    replace: Whether to replace the rows in the date ranges
+    """
+    if len(frame) == 0:
+        return
+    now = datetime.datetime.utcnow()
+    frame = frame.assign(created_date=now, last_updated_date=now)
+    if replace:
+        _delete_daily_data_ranges(con, frame)
+    cur = con.cursor()
+    if load_data:
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w') as csv_file:
+                frame[DAILY_PRICE_COLUMNS].to_csv(
+                    csv_file, header=False, index=False, na_rep='\\N',
+                    date_format='%Y-%m-%d %H:%M:%S'
+                )
+            cur.execute(
+                "LOAD DATA LOCAL INFILE %%s INTO TABLE daily_price "
+                "FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n' "
+                "(%s)" % ", ".join(DAILY_PRICE_COLUMNS), (path,)
+            )
+        finally:
+            os.remove(path)
+    else:
+        final_str = "INSERT INTO daily_price (%s) VALUES (%s)" % (
+            ", ".join(DAILY_PRICE_COLUMNS),
+            ", ".join([sql_placeholder(con)] * len(DAILY_PRICE_COLUMNS))
+        )
+        cur.executemany(final_str, _daily_price_rows(frame))
+    con.commit()
+
+
+def load_daily_data_pipeline(
+        con, tickers, data_vendor_id=1, start_date=(2000,1,1),
+        end_date=None, base_url=YAHOO_URL, max_workers=8,
+        max_pending=32, chunk_size=50000, load_data=False, 
+        incremental=False
+    ):
+    """
+    Downloads the daily data of many tickers concurrently and
+    bulk loads it into daily_price, returning the number of
+    rows inserted.
+
+    The pipeline has two stages. A bounded pool of threads
+    downloads and parses the vendor files, handing the parsed
+    DataFrames over a queue of at most max_pending frames. The
+    calling thread takes them from the queue and inserts them
+    in chunks of at least chunk_size rows. If the database falls
+    behind, the full queue blocks the downloads (backpressure),
+    so memory use stays bounded.
+
+    In incremental mode only the prices after the latest date
+    held for each ticker are requested, found with one grouped
+    query, and they are upserted. Tickers that are up to date 
+    are not requested at all.
+
+    con: The database connection, only used by the calling thread
+    tickers: List of (symbol_id, ticker) tuples
+    data_vendor_id: The data vendor ID of the prices
+    start_date: Start date in (YYYY, M, D) format
+    end_date: End date in (YYYY, M, D) format, by default today
+    base_url: The vendor URL, which may be a local stand-in
+    max_workers: The number of download threads
+    max_pending: The maximum number of parsed files queued
+    chunk_size: The minimum number of rows per insert
+    load_data: Whether to use LOAD DATA LOCAL INFILE
+    incremental: Whether to only fetch and upsert the new prices
+    """
+    if incremental:
+        starts = incremental_start_dates(
+            con, tickers, data_vendor_id, start_date, end_date
+        )
+        print(
+            "%s out of %s tickers are up to date" %
+            (len(tickers) - len(starts), len(tickers))
+        )
+    else:
+        starts = [(s, t, start_date) for s, t in tickers]
+
+    frames = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    local = threading.local()
+
+    def download(symbol_id, ticker, start_date):
+        if stop.is_set():
+            return
+        # Sessions are not shared between threads
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        try:
+            frame = download_daily_historic_data_yahoo(
+                ticker, start_date, end_date, base_url, local.session
+            )
+        except Exception as e:
+            print("Could not download Yahoo data for %s: %s" % (ticker, e))
+            return
+        frame['data_vendor_id'] = data_vendor_id
+        frame['symbol_id'] = symbol_id
+        frames.put((ticker, frame))
+
+    def produce():
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for symbol_id, ticker, start in starts:
+                    pool.submit(download, symbol_id, ticker, start)
+        finally:
+            frames.put(None)
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+
+    pending = []
+    pending_rows = 0
+    inserted = 0
+    received = 0
+    finished = False
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                finished = True
+                break
+            ticker, frame = item
+            received += 1
+            print(
+                "Adding data for %s: %s out of %s" %
+                (ticker, received, len(starts))
+            )
+            pending.append(frame)
+            pending_rows += len(frame)
+            if pending_rows >= chunk_size:
+                bulk_insert_daily_data(
+                    con, pd.concat(pending), load_data, incremental
+                )
+                inserted += pending_rows
+                pending = []
+                pending_rows = 0
+        if pending_rows > 0:
+            bulk_insert_daily_data(
+                con, pd.concat(pending), load_data, incremental
+            )
+            inserted += pending_rows
+    except BaseException:
+        # Unblock and wind down the downloads before re-raising
+        stop.set()
+        while not finished and frames.get() is not None:
+            pass
+        raise
+    finally:
+        producer.join()
+    return inserted
 
 
 if __name__ == "__main__":
@@ -108,15 +445,14 @@ if __name__ == "__main__":
     # from the Yahoo precision to Decimal(19,4) datatypes
     warnings.filterwarnings('ignore')
 
-    # Loop over the tickers and insert the daily historical
-    # data into the database
-    tickers = obtain_list_of_db_tickers()
-    lentickers = len(tickers)
-    for i, t in enumerate(tickers):
-        print(
-            "Adding data for %s: %s out of %s" % 
-            (t[1], i+1, lentickers)
+    # Download the new daily historical data of all of the 
+    # tickers concurrently and bulk load it into the database
+    with get_pool().connection() as con:
+        tickers = obtain_list_of_db_tickers(con)
+        rows = load_daily_data_pipeline(
+            con, tickers, data_vendor_id=1, incremental=True
         )
-        yf_data = get_daily_historic_data_yahoo(t[1])
-        insert_daily_data_into_db('1', t[0], yf_data)
-    print("Successfully added Yahoo Finance pricing data to DB.")
+    print(
+        "Successfully added %s rows of Yahoo Finance pricing data to DB." %
+        rows
+    )
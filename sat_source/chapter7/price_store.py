@@ -0,0 +1,319 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# price_store.py
+
+from __future__ import print_function
+
+from abc import ABCMeta, abstractmethod
+import json
+import os
+import shutil
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+import numpy as np
+import pandas as pd
+
+from price_retrieval import sql_placeholder
+
+
+# The price fields of daily_price that can be queried
+PRICE_FIELDS = [
+    'open_price', 'high_price', 'low_price', 'close_price',
+    'adj_close_price', 'volume'
+]
+
+
+def _to_ns(dates):
+    """
+    Converts a sequence of dates to int64 nanosecond timestamps.
+    """
+    return pd.to_datetime(
+        pd.Series(dates, dtype=object)
+    ).values.astype('datetime64[ns]').view(np.int64)
+
+
+class PriceStore(object):
+    """
+    PriceStore is an abstract base class providing a single
+    query API over the daily prices of the securities master,
+    whatever the storage backend.
+
+    Subclasses read the requested columns of each ticker, while
+    this class aligns them into a wide panel.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def read_columns(self, tickers, start, end, fields):
+        """
+        Returns a dictionary of ticker to a tuple of the sorted
+        int64 nanosecond price dates and a dictionary of field
+        to the float64 array of its values, for the prices
+        between the start and end dates inclusive. Tickers
+        without prices may be absent.
+        """
+        raise NotImplementedError("Should implement read_columns()")
+
+    def get_prices(
+        self, tickers, start=None, end=None, fields='adj_close_price'
+    ):
+        """
+        Returns the prices of the tickers as a wide DataFrame,
+        indexed by the union of their price dates with a column
+        per ticker (NaN where a ticker has no price).
+
+        Parameters:
+        tickers - The list of ticker symbols.
+        start - The optional first date, e.g. '2005-01-01'.
+        end - The optional last date.
+        fields - A field name, for a DataFrame with the tickers
+            as its columns, or a list of field names, for columns
+            indexed by (field, ticker).
+        """
+        single = isinstance(fields, string_types)
+        field_list = [fields] if single else list(fields)
+        for f in field_list:
+            if f not in PRICE_FIELDS:
+                raise ValueError("Unknown price field: %s" % f)
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+
+        if len(tickers) == 0:
+            data = {}
+        else:
+            data = self.read_columns(tickers, start, end, field_list)
+        dates = np.unique(np.concatenate(
+            [np.zeros(0, dtype=np.int64)] + [d[0] for d in data.values()]
+        ))
+        panel = np.full(
+            (len(field_list), len(dates), len(tickers)), np.nan
+        )
+        for j, ticker in enumerate(tickers):
+            if ticker not in data:
+                continue
+            ticker_dates, values = data[ticker]
+            rows = np.searchsorted(dates, ticker_dates)
+            for i, f in enumerate(field_list):
+                panel[i, rows, j] = values[f]
+
+        index = pd.DatetimeIndex(
+            dates.view('datetime64[ns]'), name='price_date'
+        )
+        if single:
+            return pd.DataFrame(panel[0], index=index, columns=list(tickers))
+        columns = pd.MultiIndex.from_product([field_list, list(tickers)])
+        return pd.DataFrame(
+            panel.transpose(1, 0, 2).reshape(
+                len(dates), len(field_list) * len(tickers)
+            ),
+            index=index, columns=columns
+        )
+
+
+class MySQLPriceStore(PriceStore):
+    """
+    Reads the prices from the daily_price table of the MySQL
+    securities master, with one query for all of the tickers.
+    Any DB-API connection with the same schema can be used,
+    such as the SQLite stand-in.
+    """
+
+    def __init__(self, con, data_vendor_id=1):
+        """
+        Parameters:
+        con - The database connection.
+        data_vendor_id - The data vendor ID of the prices.
+        """
+        self.con = con
+        self.data_vendor_id = data_vendor_id
+
+    def read_columns(self, tickers, start, end, fields):
+        """
+        Reads the prices of all of the tickers with one query,
+        ordered by ticker and date.
+        """
+        p = sql_placeholder(self.con)
+        sql = (
+            "SELECT sym.ticker, dp.price_date, %s "
+            "FROM symbol AS sym "
+            "INNER JOIN daily_price AS dp ON dp.symbol_id = sym.id "
+            "WHERE dp.data_vendor_id = %s AND sym.ticker IN (%s)" % (
+                ", ".join("dp.%s" % f for f in fields), p,
+                ", ".join([p] * len(tickers))
+            )
+        )
+        params = [self.data_vendor_id] + list(tickers)
+        fmt = '%Y-%m-%d %H:%M:%S'
+        if start is not None:
+            sql += " AND dp.price_date >= %s" % p
+            params.append(start.strftime(fmt))
+        if end is not None:
+            sql += " AND dp.price_date <= %s" % p
+            params.append(end.strftime(fmt))
+        sql += " ORDER BY sym.ticker, dp.price_date"
+
+        cur = self.con.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        if len(rows) == 0:
+            return {}
+
+        # Split the columns of the result into each ticker's rows
+        columns = list(zip(*rows))
+        symbols = np.asarray(columns[0])
+        dates = _to_ns(columns[1])
+        values = [
+            np.array([np.nan if v is None else v for v in c], dtype=np.float64)
+            for c in columns[2:]
+        ]
+        starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+        ends = np.r_[starts[1:], len(symbols)]
+        return dict(
+            (symbols[a], (
+                dates[a:b], dict((f, v[a:b]) for f, v in zip(fields, values))
+            )) for a, b in zip(starts, ends)
+        )
+
+
+class PartitionedFilePriceStore(PriceStore):
+    """
+    Stores the prices in columnar files partitioned by symbol
+    and year, with a JSON manifest of the partitions.
+
+    Each partition is a directory, root/TICKER/YEAR, holding a
+    .npy file per column: the int64 nanosecond price dates and
+    a float64 array per price field. The manifest records the
+    rows and date range of each partition, so a range query
+    only opens the partitions that overlap it, and only the
+    requested fields are read, by memory mapping.
+    """
+
+    manifest_name = 'manifest.json'
+
+    def __init__(self, root):
+        """
+        Parameters:
+        root - The directory of the store, created if necessary.
+        """
+        self.root = root
+        if not os.path.exists(root):
+            os.makedirs(root)
+        path = os.path.join(root, self.manifest_name)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def _save_manifest(self):
+        """
+        Writes the manifest atomically.
+        """
+        path = os.path.join(self.root, self.manifest_name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.rename(path + '.tmp', path)
+
+    def write_prices(self, ticker, dates, values, save_manifest=True):
+        """
+        Replaces the stored prices of a ticker.
+
+        Parameters:
+        ticker - The ticker symbol.
+        dates - The sorted int64 nanosecond price dates.
+        values - Dictionary of each of the PRICE_FIELDS to its array.
+        save_manifest - Whether to write the manifest, which may
+            be deferred when writing many tickers.
+        """
+        ticker_dir = os.path.join(self.root, ticker)
+        if os.path.exists(ticker_dir):
+            shutil.rmtree(ticker_dir)
+        years = dates.view('datetime64[ns]').astype('datetime64[Y]')
+        years = years.astype(np.int64) + 1970
+        partitions = {}
+        for year in np.unique(years):
+            rows = years == year
+            part_dir = os.path.join(ticker_dir, str(year))
+            os.makedirs(part_dir)
+            np.save(os.path.join(part_dir, 'price_date.npy'), dates[rows])
+            for f in PRICE_FIELDS:
+                np.save(
+                    os.path.join(part_dir, f + '.npy'),
+                    np.asarray(values[f], dtype=np.float64)[rows]
+                )
+            part_dates = dates[rows]
+            partitions[str(year)] = {
+                'rows': int(rows.sum()),
+                'start': int(part_dates[0]), 'end': int(part_dates[-1])
+            }
+        self.manifest[ticker] = partitions
+        if save_manifest:
+            self._save_manifest()
+
+    def import_prices(self, store, tickers, start=None, end=None):
+        """
+        Copies the prices of the tickers from another PriceStore,
+        such as the MySQLPriceStore, replacing any stored here.
+        """
+        data = store.read_columns(tickers, start, end, PRICE_FIELDS)
+        for ticker, (dates, values) in data.items():
+            self.write_prices(ticker, dates, values, save_manifest=False)
+        self._save_manifest()
+
+    def read_columns(self, tickers, start, end, fields):
+        """
+        Reads the requested fields of the partitions that overlap
+        the date range, as found from the manifest.
+        """
+        lo = -np.inf if start is None else start.value
+        hi = np.inf if end is None else end.value
+        data = {}
+        for ticker in tickers:
+            parts = [
+                year for year, part in sorted(
+                    self.manifest.get(ticker, {}).items()
+                ) if part['end'] >= lo and part['start'] <= hi
+            ]
+            if len(parts) == 0:
+                continue
+            dates = []
+            values = dict((f, []) for f in fields)
+            for year in parts:
+                part_dir = os.path.join(self.root, ticker, year)
+                part_dates = np.load(
+                    os.path.join(part_dir, 'price_date.npy'), mmap_mode='r'
+                )
+                a = np.searchsorted(part_dates, lo, side='left')
+                b = np.searchsorted(part_dates, hi, side='right')
+                dates.append(part_dates[a:b])
+                for f in fields:
+                    values[f].append(np.load(
+                        os.path.join(part_dir, f + '.npy'), mmap_mode='r'
+                    )[a:b])
+            data[ticker] = (
+                np.concatenate(dates),
+                dict((f, np.concatenate(v)) for f, v in values.items())
+            )
+        return data
+
+
+if __name__ == "__main__":
+    from db_pool import get_pool
+
+    # Export the S&P500 prices from MySQL to the partitioned
+    # files and query the adjusted closes of both stores
+    files_dir = '/path/to/your/price/store'  # CHANGE THIS!
+    with get_pool().connection() as con:
+        mysql_store = MySQLPriceStore(con)
+        cur = con.cursor()
+        cur.execute("SELECT ticker FROM symbol")
+        tickers = [t[0] for t in cur.fetchall()]
+
+        file_store = PartitionedFilePriceStore(files_dir)
+        file_store.import_prices(mysql_store, tickers)
+    print(file_store.get_prices(tickers, '2010-01-01', '2010-12-31').tail())
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# price_store_bench.py
+
+from __future__ import print_function
+
+import tempfile
+import time
+
+import numpy as np
+
+from price_retrieval import load_daily_data_pipeline, obtain_list_of_db_tickers
+from price_store import MySQLPriceStore, PartitionedFilePriceStore
+from securities_master_standin import (
+    VendorStandInServer, create_sqlite_securities_master
+)
+
+
+def benchmark_price_stores(stores, queries, repeats=3):
+    """
+    Times each query against each store, printing the best time
+    of the repeats, and checks that the stores return the same
+    panels.
+
+    Parameters:
+    stores - List of (name, PriceStore) tuples.
+    queries - List of (name, tickers, start, end, fields) tuples.
+    repeats - The number of times each query is run.
+    """
+    results = []
+    for query_name, tickers, start, end, fields in queries:
+        panels = []
+        for store_name, store in stores:
+            times = []
+            for i in range(repeats):
+                begin = time.time()
+                panel = store.get_prices(tickers, start, end, fields)
+                times.append(time.time() - begin)
+            panels.append(panel)
+            results.append((query_name, store_name, min(times)))
+            print(
+                "%s, %s: %0.4fs, %s rows" %
+                (query_name, store_name, min(times), len(panel))
+            )
+        for panel in panels[1:]:
+            if not (
+                panel.index.equals(panels[0].index) and
+                np.allclose(panel.values, panels[0].values, equal_nan=True)
+            ):
+                raise ValueError("The stores disagree on %s" % query_name)
+    return results
+
+
+if __name__ == "__main__":
+    # Load 200 synthetic tickers into the SQLite stand-in for
+    # MySQL and export them to the partitioned files
+    tickers = ['T%03d' % i for i in range(200)]
+    con = create_sqlite_securities_master(tickers)
+    server = VendorStandInServer()
+    load_daily_data_pipeline(
+        con, obtain_list_of_db_tickers(con), 1, (2000,1,1), (2015,6,30),
+        base_url=server.start()
+    )
+    sql_store = MySQLPriceStore(con)
+    file_store = PartitionedFilePriceStore(tempfile.mkdtemp())
+    file_store.import_prices(sql_store, tickers)
+
+    benchmark_price_stores(
+        [("SQL", sql_store), ("Files", file_store)],
+        [
+            ("Universe, full history", tickers, None, None,
+                'adj_close_price'),
+            ("Universe, 2010", tickers, '2010-01-01', '2010-12-31',
+                'adj_close_price'),
+            ("10 tickers, OHLC, 2005-2007", tickers[:10], '2005-01-01',
+                '2007-12-31', ['open_price', 'high_price', 'low_price',
+                'close_price'])
+        ]
+    )
@@ -6,27 +6,63 @@
 from __future__ import print_function
 
 import pandas as pd
-import MySQLdb as mdb
 
+from db_pool import get_pool
+from price_retrieval import sql_placeholder
 
-if __name__ == "__main__":
-    # Connect to the MySQL instance
-    db_host = 'localhost'
-    db_user = 'sec_user'
-    db_pass = 'password'
-    db_name = 'securities_master'
-    con = mdb.connect(db_host, db_user, db_pass, db_name)
-
-    # Select all of the historic Google adjusted close data
-    sql = """SELECT dp.price_date, dp.adj_close_price
+
+def get_adj_close_prices(con, tickers, data_vendor_id=1):
+    """
+    Obtains the historic adjusted closes of many tickers in a
+    single round trip to the database, pivoted into a DataFrame
+    indexed by price_date with a column per ticker.
+
+    The query is served by the (data_vendor_id, symbol_id,
+    price_date) index of daily_price.
+
+    con: The database connection
+    tickers: The list of ticker symbols
+    data_vendor_id: The data vendor ID of the prices
+    """
+    p = sql_placeholder(con)
+    sql = """SELECT dp.price_date, sym.ticker, dp.adj_close_price
              FROM symbol AS sym
              INNER JOIN daily_price AS dp
              ON dp.symbol_id = sym.id
-             WHERE sym.ticker = 'GOOG'
-             ORDER BY dp.price_date ASC;"""
+             WHERE dp.data_vendor_id = %s AND sym.ticker IN (%s)
+             ORDER BY dp.price_date ASC, dp.id ASC;""" % (
+        p, ", ".join([p] * len(tickers))
+    )
+    prices = pd.read_sql_query(
+        sql, con=con, params=[data_vendor_id] + list(tickers),
+        parse_dates=['price_date']
+    )
+    prices['adj_close_price'] = prices['adj_close_price'].astype(float)
+    # The table has no unique key on a ticker's price date, so keep
+    # the latest inserted of any duplicates rather than failing to pivot
+    prices = prices.drop_duplicates(['price_date', 'ticker'], keep='last')
+    return prices.pivot(
+        index='price_date', columns='ticker', values='adj_close_price'
+    ).reindex(columns=tickers)
+
+
+if __name__ == "__main__":
+    # Check out a connection to the MySQL instance
+    with get_pool().connection() as con:
+        # Select all of the historic Google adjusted close data
+        sql = """SELECT dp.price_date, dp.adj_close_price
+                 FROM symbol AS sym
+                 INNER JOIN daily_price AS dp
+                 ON dp.symbol_id = sym.id
+                 WHERE sym.ticker = 'GOOG'
+                 ORDER BY dp.price_date ASC;"""
+
+        # Create a pandas dataframe from the SQL query
+        goog = pd.read_sql_query(sql, con=con, index_col='price_date')
 
-    # Create a pandas dataframe from the SQL query
-    goog = pd.read_sql_query(sql, con=con, index_col='price_date')    
+        # Select the adjusted closes of several tickers at once
+        panel = get_adj_close_prices(con, ['GOOG', 'AAPL', 'MSFT', 'IBM'])
 
-    # Output the dataframe tail
+    # Output the dataframe tails
     print(goog.tail())
+    print(panel.tail())
@@ -50,5 +50,7 @@ CREATE TABLE `daily_price` (
   `volume` bigint NULL,
   PRIMARY KEY (`id`),
   KEY `index_data_vendor_id` (`data_vendor_id`),
-  KEY `index_symbol_id` (`symbol_id`)
+  KEY `index_symbol_id` (`symbol_id`),
+  KEY `index_symbol_id_price_date` (`symbol_id`, `price_date`),
+  KEY `index_data_vendor_id_symbol_id_price_date` (`data_vendor_id`, `symbol_id`, `price_date`)
 ) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8;
\ No newline at end of file
@@ -0,0 +1,236 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# securities_master_standin.py
+
+from __future__ import print_function
+
+import datetime
+import sqlite3
+import threading
+import time
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+
+# The securities_master.sql tables in SQLite syntax
+SQLITE_SCHEMA = """
+CREATE TABLE exchange (
+  id integer PRIMARY KEY AUTOINCREMENT,
+  abbrev varchar(32) NOT NULL,
+  name varchar(255) NOT NULL,
+  city varchar(255) NULL,
+  country varchar(255) NULL,
+  currency varchar(64) NULL,
+  timezone_offset time NULL,
+  created_date datetime NOT NULL,
+  last_updated_date datetime NOT NULL
+);
+
+CREATE TABLE data_vendor (
+  id integer PRIMARY KEY AUTOINCREMENT,
+  name varchar(64) NOT NULL,
+  website_url varchar(255) NULL,
+  support_email varchar(255) NULL,
+  created_date datetime NOT NULL,
+  last_updated_date datetime NOT NULL
+);
+
+CREATE TABLE symbol (
+  id integer PRIMARY KEY AUTOINCREMENT,
+  exchange_id int NULL,
+  ticker varchar(32) NOT NULL,
+  instrument varchar(64) NOT NULL,
+  name varchar(255) NULL,
+  sector varchar(255) NULL,
+  currency varchar(32) NULL,
+  created_date datetime NOT NULL,
+  last_updated_date datetime NOT NULL
+);
+CREATE INDEX index_exchange_id ON symbol (exchange_id);
+
+CREATE TABLE daily_price (
+  id integer PRIMARY KEY AUTOINCREMENT,
+  data_vendor_id int NOT NULL,
+  symbol_id int NOT NULL,
+  price_date datetime NOT NULL,
+  created_date datetime NOT NULL,
+  last_updated_date datetime NOT NULL,
+  open_price decimal(19,4) NULL,
+  high_price decimal(19,4) NULL,
+  low_price decimal(19,4) NULL,
+  close_price decimal(19,4) NULL,
+  adj_close_price decimal(19,4) NULL,
+  volume bigint NULL
+);
+CREATE INDEX index_data_vendor_id ON daily_price (data_vendor_id);
+CREATE INDEX index_symbol_id ON daily_price (symbol_id);
+CREATE INDEX index_symbol_id_price_date ON daily_price (symbol_id, price_date);
+CREATE INDEX index_data_vendor_id_symbol_id_price_date
+  ON daily_price (data_vendor_id, symbol_id, price_date);
+"""
+
+
+# Store datetimes as MySQL-style text, which also sorts correctly
+sqlite3.register_adapter(
+    datetime.datetime, lambda d: d.strftime('%Y-%m-%d %H:%M:%S')
+)
+
+
+def create_sqlite_securities_master(tickers, path=':memory:'):
+    """
+    Creates an SQLite stand-in for the MySQL securities master,
+    with the Yahoo Finance data vendor (ID 1) and the given
+    tickers in the symbol table (with IDs 1, 2, ...).
+
+    The connection may be used from other threads, although
+    only by one thread at a time.
+
+    tickers: The list of ticker symbols
+    path: The database file, by default in memory
+    """
+    con = sqlite3.connect(path, check_same_thread=False)
+    con.executescript(SQLITE_SCHEMA)
+    now = datetime.datetime.utcnow()
+    con.execute(
+        "INSERT INTO data_vendor (name, website_url, created_date, "
+        "last_updated_date) VALUES (?, ?, ?, ?)",
+        ('Yahoo Finance', 'http://finance.yahoo.com', now, now)
+    )
+    con.executemany(
+        "INSERT INTO symbol (ticker, instrument, currency, created_date, "
+        "last_updated_date) VALUES (?, 'stock', 'USD', ?, ?)",
+        [(t, now, now) for t in tickers]
+    )
+    con.commit()
+    return con
+
+
+def make_yahoo_csv(ticker, start_date, end_date):
+    """
+    Returns the text of a Yahoo Finance CSV file of synthetic
+    daily prices for the business days between the dates,
+    newest first as Yahoo provides them. The prices of a day
+    depend only on the ticker and the date, so overlapping
+    requests agree.
+
+    ticker: The ticker symbol
+    start_date: The first datetime.date
+    end_date: The last datetime.date
+    """
+    dates = pd.bdate_range(start_date, end_date)[::-1]
+    days = (dates - pd.Timestamp('1990-01-01')).days.values
+    seed = sum(ord(c) for c in ticker)
+    close = 50.0 + seed % 50 + 10.0 * np.sin(days / (20.0 + seed % 30))
+    data = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'), 'Open': close - 0.5,
+        'High': close + 1.0, 'Low': close - 1.0, 'Close': close,
+        'Volume': 1000000 + 1000 * (days % 97), 'Adj Close': close * 0.9
+    }, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Adj Close'])
+    return data.to_csv(index=False, float_format='%0.2f')
+
+
+class VendorStandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the table.csv query of the Yahoo Finance URL with
+    synthetic prices from make_yahoo_csv.
+    """
+
+    def do_GET(self):
+        """Responds to a table.csv query."""
+        query = dict(
+            (k, v[0]) for k, v in parse_qs(urlparse(self.path).query).items()
+        )
+        start_date = datetime.date(
+            int(query['c']), int(query['a']) + 1, int(query['b'])
+        )
+        end_date = datetime.date(
+            int(query['f']), int(query['d']) + 1, int(query['e'])
+        )
+        body = make_yahoo_csv(query['s'], start_date, end_date).encode('ascii')
+
+        # Emulate the round trip time of the vendor
+        time.sleep(self.server.delay)
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Does not log the requests."""
+        pass
+
+
+class VendorStandInServer(ThreadingMixIn, HTTPServer):
+    """
+    A local HTTP server standing in for the Yahoo Finance
+    download service, so the price retrieval can be run and
+    timed offline.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        """
+        host: The interface to listen on
+        port: The port to listen on, or 0 for any free port
+        delay: The seconds to wait before each response
+        """
+        HTTPServer.__init__(self, (host, port), VendorStandInHandler)
+        self.delay = delay
+        self.requests = 0
+
+    def start(self):
+        """
+        Serves on a background thread, returning the base URL
+        to pass to the price retrieval functions.
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return "http://%s:%s/table.csv" % self.server_address
+
+
+if __name__ == "__main__":
+    from price_retrieval import (
+        get_daily_historic_data_yahoo, insert_daily_data_into_db,
+        load_daily_data_pipeline, obtain_list_of_db_tickers
+    )
+
+    # Load 100 synthetic tickers from a stand-in vendor with a
+    # 50ms round trip, one at a time and then with the pipeline
+    tickers = ['T%03d' % i for i in range(100)]
+    server = VendorStandInServer(delay=0.05)
+    base_url = server.start()
+    start_date, end_date = (2000,1,1), (2015,6,30)
+
+    con = create_sqlite_securities_master(tickers)
+    start = time.time()
+    for symbol_id, ticker in obtain_list_of_db_tickers(con):
+        data = get_daily_historic_data_yahoo(
+            ticker, start_date, end_date, base_url
+        )
+        insert_daily_data_into_db(con, 1, symbol_id, data)
+    serial_time = time.time() - start
+
+    con = create_sqlite_securities_master(tickers)
+    start = time.time()
+    rows = load_daily_data_pipeline(
+        con, obtain_list_of_db_tickers(con), 1, start_date, end_date,
+        base_url=base_url
+    )
+    pipeline_time = time.time() - start
+
+    print("Rows: %s" % rows)
+    print("Serial: %0.2fs, Pipeline: %0.2fs" % (serial_time, pipeline_time))